@@ -1,18 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-import PyPDF2
-import io
-import google.generativeai as genai
+from typing import List, Optional
 from datetime import datetime
 
 from core.config import settings
-from core.database import get_db, get_vector_db
+from core.database import get_db, get_vector_db, pool_status
 from core.auth import get_current_admin
+from core.retrieval import get_retrieval_backend
+from core.lexical import lexical_index
+from core.embeddings import embedding_cache
+from core.answer_cache import answer_cache
+from core.retrieval_cache import retrieval_cache
+from core.rerank import reranker
+from core.corpus import corpus_version
+from core.ingestion import ingestion_queue, store_upload, remove_upload
+from core.pagination import keyset_page, estimate_count, encode_cursor
+from core.export import export_ndjson, export_csv
 from models.database import AdminUser, ChatMessage, IndexedDocument, DocumentChunk
 from schemas.api import (
     DocumentUploadResponse, 
     DocumentResponse, 
+    DocumentStatusResponse,
     DocumentListResponse,
     ChatHistoryResponse,
     ChatMessageResponse
@@ -20,151 +29,174 @@ from schemas.api import (
 
 router = APIRouter()
 
-# Configure Gemini API
-genai.configure(api_key=settings.gemini_api_key)
-
-
-def get_embeddings(text: str) -> list:
-    """Get embeddings from Gemini API"""
-    try:
-        model = genai.GenerativeModel('embedding-001')
-        result = model.embed_content(text)
-        return result['embedding']
-    except Exception as e:
-        print(f"Error getting embeddings: {e}")
-        return []
-
-
-def extract_text_from_pdf(file_content: bytes) -> str:
-    """Extract text from PDF file"""
-    pdf_file = io.BytesIO(file_content)
-    pdf_reader = PyPDF2.PdfReader(pdf_file)
-    text = ""
-    
-    for page in pdf_reader.pages:
-        text += page.extract_text() + "\n"
-    
-    return text
-
-
-def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
-    """Split text into chunks with overlap"""
-    chunks = []
-    start = 0
-    
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start = end - overlap
-    
-    return chunks
-
 
 @router.get("/chat-history", response_model=ChatHistoryResponse)
 async def get_chat_history(
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    exact_count: bool = Query(False, description="Count rows exactly instead of using the planner estimate"),
+    since: Optional[datetime] = Query(None, description="Only messages created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only messages created before this time"),
     current_admin: AdminUser = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """Get chat history with pagination"""
-    offset = (page - 1) * size
-    
-    messages = db.query(ChatMessage).order_by(ChatMessage.created_at.desc()).offset(offset).limit(size).all()
-    total = db.query(ChatMessage).count()
+    """Get chat history, newest first, with keyset pagination"""
+    # created_at bounds let PostgreSQL prune monthly partitions outside the range
+    query = db.query(ChatMessage)
+    if since:
+        query = query.filter(ChatMessage.created_at >= since)
+    if until:
+        query = query.filter(ChatMessage.created_at < until)
+    if cursor or page == 1:
+        messages, next_cursor = keyset_page(query, ChatMessage, size, cursor)
+    else:
+        # Legacy page numbers: OFFSET scan, kept for old clients
+        messages = query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).offset((page - 1) * size).limit(size).all()
+        next_cursor = encode_cursor(messages[-1].created_at, messages[-1].id) if len(messages) == size else None
+    total, estimated = estimate_count(query, ChatMessage, exact=exact_count)
     
     return ChatHistoryResponse(
         messages=messages,
         total=total,
+        total_is_estimate=estimated,
         page=page,
-        size=size
+        size=size,
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/chat-history/export")
+async def export_chat_history(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = Query(None, description="Only messages created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only messages created before this time"),
+    session_id: Optional[str] = Query(None),
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """Stream chat messages, oldest first, as NDJSON or CSV"""
+    if format == "csv":
+        body, media_type = export_csv(since, until, session_id), "text/csv; charset=utf-8"
+    else:
+        body, media_type = export_ndjson(since, until, session_id), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="chat_messages.{format}"'}
     )
 
 
-@router.post("/documents/upload", response_model=DocumentUploadResponse)
+@router.post("/documents/upload", response_model=DocumentUploadResponse, status_code=202)
 async def upload_document(
+    response: Response,
     file: UploadFile = File(...),
     current_admin: AdminUser = Depends(get_current_admin),
-    db: Session = Depends(get_db),
-    vector_db: Session = Depends(get_vector_db)
+    db: Session = Depends(get_db)
 ):
-    """Upload and index PDF document"""
+    """Store PDF document and queue it for background indexing"""
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
     try:
-        # Read file content
-        file_content = await file.read()
+        # Store file for the ingestion workers
+        file_path, content_hash = await store_upload(file)
         
-        # Create document record
-        document = IndexedDocument(
-            file_name=file.filename,
-            status='indexing'
-        )
-        db.add(document)
+        # Same file already uploaded: nothing to do
+        duplicate = db.query(IndexedDocument).filter(
+            IndexedDocument.content_hash == content_hash,
+            IndexedDocument.status.notin_(('error', 'deleting'))
+        ).first()
+        if duplicate:
+            remove_upload(file_path)
+            response.status_code = 200
+            return DocumentUploadResponse(
+                message="Document already indexed",
+                document_id=duplicate.id
+            )
+        
+        # New version of an existing document: re-index it in place so only changed chunks are embedded
+        document = db.query(IndexedDocument).filter(
+            IndexedDocument.file_name == file.filename
+        ).order_by(IndexedDocument.id.desc()).first()
+        if document and document.status in ('queued', 'indexing'):
+            remove_upload(file_path)
+            raise HTTPException(status_code=409, detail="Previous version is still being indexed")
+        if document and document.status == 'deleting':
+            remove_upload(file_path)
+            raise HTTPException(status_code=409, detail="Previous version is being deleted")
+        
+        if document:
+            remove_upload(document.file_path)
+            document.file_path = file_path
+            document.content_hash = content_hash
+            document.status = 'queued'
+            message = "New document version queued for re-indexing"
+        else:
+            # Create document record
+            document = IndexedDocument(
+                file_name=file.filename,
+                status='queued',
+                file_path=file_path,
+                content_hash=content_hash
+            )
+            db.add(document)
+            message = "Document uploaded and queued for indexing"
         db.commit()
         db.refresh(document)
         
-        try:
-            # Extract text from PDF
-            text = extract_text_from_pdf(file_content)
-            
-            # Chunk the text
-            chunks = chunk_text(text)
-            
-            # Process each chunk
-            for chunk_text in chunks:
-                # Get embedding
-                embedding = get_embeddings(chunk_text)
-                
-                # Create chunk record
-                chunk = DocumentChunk(
-                    document_id=document.id,
-                    content=chunk_text,
-                    embedding=str(embedding)  # Store as string for now
-                )
-                vector_db.add(chunk)
-            
-            vector_db.commit()
-            
-            # Update document status
-            document.status = 'ready'
-            db.commit()
-            
-            return DocumentUploadResponse(
-                message="Document uploaded and indexed successfully",
-                document_id=document.id
-            )
-            
-        except Exception as e:
-            # Update document status to error
-            document.status = 'error'
-            db.commit()
-            raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
-            
+        ingestion_queue.submit(document.id)
+        
+        return DocumentUploadResponse(
+            message=message,
+            document_id=document.id
+        )
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading document: {str(e)}")
 
 
+@router.get("/documents/{doc_id}/status", response_model=DocumentStatusResponse)
+async def get_document_status(
+    doc_id: int,
+    current_admin: AdminUser = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Get indexing progress of a document"""
+    document = db.query(IndexedDocument).filter(IndexedDocument.id == doc_id).first()
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    return document
+
+
 @router.get("/documents", response_model=DocumentListResponse)
 async def get_documents(
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    exact_count: bool = Query(False, description="Count rows exactly instead of using the planner estimate"),
     current_admin: AdminUser = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """Get list of indexed documents"""
-    offset = (page - 1) * size
-    
-    documents = db.query(IndexedDocument).order_by(IndexedDocument.created_at.desc()).offset(offset).limit(size).all()
-    total = db.query(IndexedDocument).count()
+    """Get list of indexed documents, newest first, with keyset pagination"""
+    query = db.query(IndexedDocument)
+    if cursor or page == 1:
+        documents, next_cursor = keyset_page(query, IndexedDocument, size, cursor)
+    else:
+        # Legacy page numbers: OFFSET scan, kept for old clients
+        documents = query.order_by(IndexedDocument.created_at.desc(), IndexedDocument.id.desc()).offset((page - 1) * size).limit(size).all()
+        next_cursor = encode_cursor(documents[-1].created_at, documents[-1].id) if len(documents) == size else None
+    total, estimated = estimate_count(query, IndexedDocument, exact=exact_count)
     
     return DocumentListResponse(
         documents=documents,
         total=total,
+        total_is_estimate=estimated,
         page=page,
-        size=size
+        size=size,
+        next_cursor=next_cursor
     )
 
 
@@ -176,21 +208,49 @@ async def delete_document(
     vector_db: Session = Depends(get_vector_db)
 ):
     """Delete document and its chunks"""
-    # Find document
+    # Claim the document atomically so an ingestion worker cannot start indexing it meanwhile
+    claimed = db.query(IndexedDocument).filter(
+        IndexedDocument.id == doc_id,
+        IndexedDocument.status.in_(('queued', 'ready', 'error', 'deleting'))
+    ).update({"status": 'deleting'}, synchronize_session=False)
+    db.commit()
     document = db.query(IndexedDocument).filter(IndexedDocument.id == doc_id).first()
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
+    if not claimed:
+        raise HTTPException(status_code=409, detail="Document is being indexed")
     
     try:
         # Delete chunks from vector database
         vector_db.query(DocumentChunk).filter(DocumentChunk.document_id == doc_id).delete()
         vector_db.commit()
+        get_retrieval_backend(vector_db).remove_document(doc_id)
+        lexical_index.remove_document(doc_id)
+        corpus_version.bump(f"deleted {document.file_name}")
         
-        # Delete document
+        # Delete document and any upload still waiting for ingestion
+        remove_upload(document.file_path)
         db.delete(document)
         db.commit()
         
         return {"message": "Document deleted successfully"}
         
     except Exception as e:
+        db.rollback()
+        db.query(IndexedDocument).filter(IndexedDocument.id == doc_id).update(
+            {"status": 'error', "error_message": f"Delete failed: {str(e)}"[:1000]}, synchronize_session=False
+        )
+        db.commit()
         raise HTTPException(status_code=500, detail=f"Error deleting document: {str(e)}")
+
+
+@router.get("/cache-stats")
+async def get_cache_stats(current_admin: AdminUser = Depends(get_current_admin)):
+    """Get cache hit/miss statistics"""
+    return {"embedding": embedding_cache.stats(), "answer": answer_cache.stats(), "retrieval": retrieval_cache.stats(), "rerank": reranker.stats()}
+
+
+@router.get("/pool-stats")
+async def get_pool_stats(current_admin: AdminUser = Depends(get_current_admin)):
+    """Get database connection pool occupancy and checkout-wait statistics"""
+    return pool_status()
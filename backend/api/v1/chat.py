@@ -1,58 +1,140 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from typing import Generator
-import google.generativeai as genai
+from sqlalchemy import exc as sa_exc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from typing import AsyncGenerator, Tuple
+import asyncio
 import json
+import time
 import uuid
-from datetime import datetime
 
 from core.config import settings
-from core.database import get_db, get_vector_db
-from models.database import ChatMessage, DocumentChunk
+from core.database import get_async_db, get_async_vector_db
+from models.database import DocumentChunk
 from schemas.api import ChatRequest
 from core.auth import get_current_admin
+from core.retrieval import aget_retrieval_backend, reciprocal_rank_fusion
+from core.lexical import lexical_index
+from core.context import build_context
+from core.sessions import session_store
+from core.message_writer import message_writer
+from core.embeddings import aget_embeddings
+from core.answer_cache import answer_cache
+from core.retrieval_cache import retrieval_cache
+from core.corpus import corpus_version
+from core.metrics import span, record_stage, chat_ttft_seconds
+from core.providers import provider
+from core.admission import chat_admission, client_ip, AdmissionRejected
+from core.rerank import reranker
 
 router = APIRouter()
 
-# Configure Gemini API
-genai.configure(api_key=settings.gemini_api_key)
+ERROR_MESSAGE = '죄송합니다. 답변을 생성하는 중 오류가 발생했습니다.'
 
 
-def get_embeddings(text: str) -> list:
-    """Get embeddings from Gemini API"""
-    try:
-        model = genai.GenerativeModel('embedding-001')
-        result = model.embed_content(text)
-        return result['embedding']
-    except Exception as e:
-        print(f"Error getting embeddings: {e}")
-        return []
+def sse_event(content: str, error: bool = False) -> str:
+    """SSE data event; `error` marks the message that replaces or ends a failed generation"""
+    payload = {'content': content, 'error': True} if error else {'content': content}
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+async def hybrid_search(query: str, db: AsyncSession, limit: int, query_embedding: list) -> Tuple[list, bool]:
+    """Embedding similarity and BM25 run concurrently, fused by reciprocal rank
+
+    Returns the chunks and whether every search leg succeeded.
+    """
+    backend = await aget_retrieval_backend(db)
+    if not settings.hybrid_search_enabled:
+        if not query_embedding:
+            return [], False
+        return await backend.asearch(db, query_embedding, limit), True
+    
+    candidates = max(limit, settings.retrieval_candidates)
+    
+    async def vector_search():
+        if not query_embedding:
+            return []
+        with span("retrieval_vector"):
+            return await backend.asearch(db, query_embedding, candidates)
+    
+    async def lexical_search():
+        with span("retrieval_lexical"):
+            return await lexical_index.asearch(query, candidates)
+    
+    vector_chunks, lexical_hits = await asyncio.gather(
+        vector_search(),
+        lexical_search(),
+        return_exceptions=True
+    )
+    # Either leg alone still gives usable results
+    complete = bool(query_embedding)
+    if isinstance(vector_chunks, Exception):
+        print(f"Error in vector search: {vector_chunks}")
+        vector_chunks = []
+        complete = False
+    if isinstance(lexical_hits, Exception):
+        print(f"Error in lexical search: {lexical_hits}")
+        lexical_hits = []
+        complete = False
+    
+    ranked = reciprocal_rank_fusion(
+        [[chunk.id for chunk in vector_chunks], [chunk_id for chunk_id, _ in lexical_hits]],
+        k=settings.rrf_k
+    )[:limit]
+    
+    # Load chunks that only the lexical leg found
+    chunks = {chunk.id: chunk for chunk in vector_chunks}
+    missing = [chunk_id for chunk_id in ranked if chunk_id not in chunks]
+    if missing:
+        result = await db.execute(select(DocumentChunk).where(DocumentChunk.id.in_(missing)))
+        chunks.update({chunk.id: chunk for chunk in result.scalars()})
+    return [chunks[chunk_id] for chunk_id in ranked if chunk_id in chunks], complete
+
+
+async def load_cached_chunks(chunk_ids: list, db: AsyncSession, generation: int) -> list:
+    """Chunks of a cached result from the chunk cache, reading only the uncached ones (without embeddings)"""
+    found, missing = retrieval_cache.get_chunks(chunk_ids)
+    if missing:
+        result = await db.execute(
+            select(DocumentChunk).options(defer(DocumentChunk.embedding)).where(DocumentChunk.id.in_(missing))
+        )
+        found.update(retrieval_cache.put_chunks(result.scalars().all(), generation))
+    return [found[chunk_id] for chunk_id in chunk_ids if chunk_id in found]
 
 
-def search_similar_chunks(query: str, db: Session, limit: int = 5) -> list:
-    """Search for similar chunks using simple text search"""
+async def search_similar_chunks(query: str, db: AsyncSession, limit: int = 5, query_embedding: list = None) -> list:
+    """Hybrid search, served from the retrieval cache when this query was searched against the current corpus"""
     try:
-        # Simple text search for development
-        chunks = db.query(DocumentChunk).filter(
-            DocumentChunk.content.contains(query)
-        ).limit(limit).all()
-        
-        # If no chunks found, return any chunks
-        if not chunks:
-            chunks = db.query(DocumentChunk).limit(limit).all()
-        
-        return chunks
+        with span("retrieval"):
+            use_cache = settings.retrieval_cache_enabled
+            generation = corpus_version.generation
+            chunk_ids = retrieval_cache.get_ids(query, limit) if use_cache else None
+            if chunk_ids is not None:
+                return await load_cached_chunks(chunk_ids, db, generation)
+            
+            if query_embedding is None:
+                query_embedding = await aget_embeddings(query)
+            chunks, complete = await hybrid_search(query, db, limit, query_embedding)
+            # Results degraded by a failed search leg are not kept
+            if use_cache and complete:
+                retrieval_cache.put(query, limit, chunks, generation)
+            return chunks
+    except sa_exc.TimeoutError:
+        raise
     except Exception as e:
         print(f"Error searching chunks: {e}")
         return []
 
 
-def generate_chat_response(query: str, context_chunks: list) -> Generator[str, None, None]:
-    """Generate streaming response from Gemini"""
+async def generate_chat_response(query: str, context_chunks: list, history: str = "") -> AsyncGenerator[str, None]:
+    """Generate streaming response from the LLM provider"""
+    started = time.perf_counter()
+    first_token = True
     try:
-        # Prepare context from chunks
-        context = "\n".join([chunk.content[:500] for chunk in context_chunks[:3]])  # Limit context length
+        # Prepare context from chunks within the token budget
+        context = build_context(context_chunks)
+        history_section = f"이전 대화:\n{history}\n" if history else ""
         
         # Create prompt
         prompt = f"""
@@ -60,72 +142,135 @@ def generate_chat_response(query: str, context_chunks: list) -> Generator[str, N
         
         {context}
         
+        {history_section}
         사용자 질문: {query}
         
         위 문서 내용을 바탕으로 정확하고 도움이 되는 답변을 제공해주세요. 
         문서에 없는 내용은 추측하지 말고, 문서 내용만을 바탕으로 답변해주세요.
         """
         
-        model = genai.GenerativeModel('gemini-pro')
-        response = model.generate_content(prompt, stream=True)
-        
-        for chunk in response:
-            if chunk.text:
-                yield f"data: {json.dumps({'content': chunk.text})}\n\n"
+        async for text in provider.stream(prompt):
+            if first_token:
+                record_stage("generation_ttft", time.perf_counter() - started)
+                first_token = False
+            yield sse_event(text)
         
         yield "data: [DONE]\n\n"
     except Exception as e:
         print(f"Error generating response: {e}")
-        yield f"data: {json.dumps({'content': '죄송합니다. 답변을 생성하는 중 오류가 발생했습니다.'})}\n\n"
+        yield sse_event(ERROR_MESSAGE, error=True)
         yield "data: [DONE]\n\n"
+    finally:
+        record_stage("generation", time.perf_counter() - started)
+
+
+async def replay_cached_answer(answer: str) -> AsyncGenerator[str, None]:
+    """Replay a cached answer in the same SSE format as a generated one"""
+    yield sse_event(answer)
+    yield "data: [DONE]\n\n"
 
 
 @router.post("/chat")
-async def chat(request: ChatRequest, db: Session = Depends(get_db), vector_db: Session = Depends(get_vector_db)):
+async def chat(
+    request: ChatRequest,
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    vector_db: AsyncSession = Depends(get_async_vector_db)
+):
     """Chat endpoint with RAG"""
+    started = time.perf_counter()
+    slot = None
+    handed_off = False
     try:
-        # Generate session ID
-        session_id = str(uuid.uuid4())
+        # Per-client request rate (IP and session)
+        peer = http_request.client.host if http_request.client else None
+        address = client_ip(peer, http_request.headers.get("x-forwarded-for"), settings.trusted_proxy_hops)
+        chat_admission.check_rate(address, request.session_id)
         
-        # Search for similar chunks
-        similar_chunks = search_similar_chunks(request.message, vector_db)
+        # Continue the client's conversation, or start a new one
+        session_id = request.session_id or str(uuid.uuid4())
+        with span("session_load"):
+            session = await session_store.load(db, session_id)
+        history = session_store.render_history(session)
+        generation = corpus_version.generation
         
-        # Save user message
-        user_message = ChatMessage(
-            session_id=session_id,
-            role="user",
-            content=request.message
-        )
-        db.add(user_message)
-        db.commit()
+        # Answer from the semantic cache when an equivalent question was answered
+        # against the current corpus; otherwise retrieve and generate.
+        # Follow-up questions depend on the conversation, so they are never served from cache.
+        use_answer_cache = settings.answer_cache_enabled and not session.has_history
+        query_embedding = await aget_embeddings(request.message)
+        cached = answer_cache.get(request.message, query_embedding) if use_answer_cache else None
+        if cached:
+            similar_chunks = []
+            stream = replay_cached_answer(cached.answer)
+        else:
+            # Bound the generations open against the LLM provider; waits in a short queue
+            slot = await chat_admission.acquire()
+            # With a reranker, retrieve a wider candidate set and keep only the best few for the prompt
+            if reranker.name == "none":
+                similar_chunks = await search_similar_chunks(request.message, vector_db, query_embedding=query_embedding)
+            else:
+                candidates = await search_similar_chunks(
+                    request.message, vector_db, limit=settings.rerank_candidates, query_embedding=query_embedding
+                )
+                similar_chunks = await reranker.rerank(request.message, candidates, settings.rerank_top_n)
+            stream = generate_chat_response(request.message, similar_chunks, history)
+        
+        # Save user message (written behind the request in a batch)
+        saved = await message_writer.add(session_id, "user", request.message)
+        session_store.append(session, saved, "user", request.message)
         
         # Generate streaming response
-        def response_generator():
+        async def response_generator():
             full_response = ""
-            for chunk in generate_chat_response(request.message, similar_chunks):
-                if chunk.startswith("data: ") and not chunk.startswith("data: [DONE]"):
-                    try:
-                        data = json.loads(chunk[6:])
-                        full_response += data['content']
-                    except:
-                        pass
-                yield chunk
+            failed = False
+            try:
+                async for chunk in stream:
+                    if chunk.startswith("data: ") and not chunk.startswith("data: [DONE]"):
+                        if not full_response:
+                            chat_ttft_seconds.observe(time.perf_counter() - started)
+                        try:
+                            data = json.loads(chunk[6:])
+                            full_response += data['content']
+                            failed = failed or data.get('error', False)
+                        except:
+                            pass
+                    yield chunk
+            finally:
+                if slot:
+                    slot.release()
+            
+            if cached:
+                answer_cache.record_saved(cached, time.perf_counter() - started)
+            elif use_answer_cache and similar_chunks and full_response and not failed:
+                answer_cache.put(
+                    request.message,
+                    query_embedding,
+                    full_response,
+                    generation=generation,
+                    latency=time.perf_counter() - started
+                )
             
             # Save AI response
-            ai_message = ChatMessage(
-                session_id=session_id,
-                role="ai",
-                content=full_response
-            )
-            db.add(ai_message)
-            db.commit()
+            saved = await message_writer.add(session_id, "ai", full_response)
+            session_store.append(session, saved, "ai", full_response)
         
+        body = response_generator()
+        if slot:
+            slot.release_with(body)
+        handed_off = True
         return StreamingResponse(
-            response_generator(),
+            body,
             media_type="text/plain",
-            headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
+            headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Session-Id": session_id}
         )
         
+    except (sa_exc.TimeoutError, AdmissionRejected):
+        # Pool exhausted or client/queue over its limit: answered with 503/429 by the app-level handlers
+        raise
     except Exception as e:
         print(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if slot and not handed_off:
+            slot.release()
@@ -0,0 +1,107 @@
+"""
+/chat 종단간 동시성 벤치마크
+동시 요청 수별로 첫 토큰까지의 시간(TTFT)과 전체 응답 시간, 초당 처리 요청 수 측정
+--url을 지정하지 않으면 앱을 같은 프로세스의 uvicorn으로 띄워서 측정합니다.
+"""
+
+import asyncio
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.common import QUERIES, summarize
+
+STARTUP_TIMEOUT_SECONDS = 60
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_local_server():
+    """Serve main.app on a free local port from a background thread; returns (base_url, server, thread)"""
+    import uvicorn
+    from main import app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while not server.started:
+        if time.monotonic() > deadline or not thread.is_alive():
+            raise RuntimeError("Local server did not start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server, thread
+
+
+async def _chat(client: httpx.AsyncClient, message: str) -> Tuple[Optional[float], float, bool]:
+    """Send one /chat request; returns (time to first content, total time, ok)"""
+    started = time.perf_counter()
+    first = None
+    ok = False
+    async with client.stream("POST", "/api/v1/chat", json={"message": message}) as response:
+        async for text in response.aiter_text():
+            if first is None and "\"content\"" in text:
+                first = time.perf_counter() - started
+            if "[DONE]" in text:
+                ok = response.status_code == 200
+    return first, time.perf_counter() - started, ok
+
+
+async def _run_level(base_url: str, concurrency: int, requests: int) -> List[Dict]:
+    ttft, totals = [], []
+    errors = 0
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(f"{QUERIES[i % len(QUERIES)]} ({i})")
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while not queue.empty():
+            message = queue.get_nowait()
+            try:
+                first, total, ok = await _chat(client, message)
+            except httpx.HTTPError as e:
+                print(f"Request failed: {e}")
+                errors += 1
+                continue
+            # Rejected or failed requests (e.g. 429) would skew the latency percentiles
+            if not ok:
+                errors += 1
+                continue
+            totals.append(total)
+            if first is not None:
+                ttft.append(first)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return [
+        summarize(f"chat/c{concurrency}/ttft", ttft, elapsed, items=len(ttft), unit="requests"),
+        summarize(f"chat/c{concurrency}/total", totals, elapsed, unit="requests", errors=errors),
+    ]
+
+
+def run(args) -> List[Dict]:
+    server = thread = None
+    base_url = args.url
+    if not base_url:
+        base_url, server, thread = start_local_server()
+    try:
+        results = []
+        for concurrency in args.concurrency:
+            results.extend(asyncio.run(_run_level(base_url, concurrency, args.requests)))
+        return results
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join()
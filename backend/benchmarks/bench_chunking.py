@@ -0,0 +1,26 @@
+"""
+청킹 벤치마크
+합성 약관 문서를 chunk_document로 분할하는 시간과 페이지 처리량 측정
+"""
+
+import time
+from typing import Dict, List
+
+from benchmarks.common import summarize, synthetic_policy_pages
+from core.chunking import chunk_document
+
+
+def run(args) -> List[Dict]:
+    samples = []
+    chunks = 0
+    started = time.perf_counter()
+    for document in range(args.documents):
+        pages = list(enumerate(synthetic_policy_pages(args.pages, seed=document), start=1))
+        document_started = time.perf_counter()
+        chunks += sum(1 for _ in chunk_document(pages))
+        samples.append(time.perf_counter() - document_started)
+    elapsed = time.perf_counter() - started
+    return [summarize(
+        f"chunking/{args.pages}p-document", samples, sum(samples),
+        items=args.documents * args.pages, unit="pages", chunks=chunks, wall_seconds=round(elapsed, 3)
+    )]
@@ -0,0 +1,36 @@
+"""
+PDF 텍스트 추출 벤치마크
+합성 PDF에서 iter_pdf_pages(프로세스 풀)로 페이지를 추출하는 지연시간과 처리량 측정
+"""
+
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.common import summarize, synthetic_ascii_pages, write_pdf
+from core.pdf import iter_pdf_pages, shutdown_executor
+
+
+def run(args) -> List[Dict]:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark.pdf")
+        write_pdf(path, synthetic_ascii_pages(args.pages))
+
+        document_samples = []
+        page_samples = []
+        started = time.perf_counter()
+        for _ in range(args.documents):
+            document_started = last = time.perf_counter()
+            for _ in iter_pdf_pages(path):
+                now = time.perf_counter()
+                page_samples.append(now - last)
+                last = now
+            document_samples.append(time.perf_counter() - document_started)
+        elapsed = time.perf_counter() - started
+        shutdown_executor()
+
+    return [
+        summarize(f"pdf_extract/{args.pages}p-document", document_samples, elapsed, unit="documents"),
+        summarize("pdf_extract/page", page_samples, elapsed, unit="pages"),
+    ]
@@ -0,0 +1,86 @@
+"""
+검색 벤치마크
+10k/100k/1M 청크 규모에서 NumPy 벡터 인덱스와 BM25 인덱스의 질의 지연시간 측정
+(1M 청크 x 768차원 float32 행렬은 약 3GB 메모리가 필요합니다)
+"""
+
+import random
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.common import QUERIES, SENTENCES, summarize
+from core.config import settings
+from core.lexical import LexicalIndex
+from core.retrieval import NumpyVectorIndex
+
+BUILD_BLOCK_ROWS = 65536
+CHUNKS_PER_DOCUMENT = 1000
+
+
+def build_vector_index(size: int, dimension: int, seed: int = 0) -> NumpyVectorIndex:
+    """Index of `size` random unit vectors, filled in place to avoid copies at 1M rows"""
+    rng = np.random.default_rng(seed)
+    matrix = np.empty((size, dimension), dtype=np.float32)
+    for start in range(0, size, BUILD_BLOCK_ROWS):
+        block = rng.standard_normal((min(BUILD_BLOCK_ROWS, size - start), dimension), dtype=np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        matrix[start:start + len(block)] = block
+    index = NumpyVectorIndex(dimension)
+    index._matrix = matrix
+    index._ids = np.arange(1, size + 1, dtype=np.int64)
+    index._document_ids = index._ids // CHUNKS_PER_DOCUMENT
+    index._loaded = True
+    return index
+
+
+def build_lexical_index(size: int, seed: int = 0) -> LexicalIndex:
+    rng = random.Random(seed)
+    index = LexicalIndex(k1=settings.bm25_k1, b=settings.bm25_b, syllable_max_df=settings.bm25_syllable_max_df)
+    for chunk_id in range(1, size + 1):
+        content = " ".join(rng.choice(SENTENCES) for _ in range(4))
+        index._add(chunk_id, chunk_id // CHUNKS_PER_DOCUMENT, content)
+    index._max_id = size
+    index._loaded = True
+    return index
+
+
+def _time_queries(search, queries) -> List[float]:
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        search(query)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def run(args) -> List[Dict]:
+    results = []
+    rng = np.random.default_rng(1)
+    for size in args.sizes:
+        started = time.perf_counter()
+        index = build_vector_index(size, settings.embedding_dimension)
+        build_seconds = time.perf_counter() - started
+        queries = [rng.standard_normal(settings.embedding_dimension).astype(np.float32) for _ in range(args.queries)]
+        index.top_k(queries[0], args.limit)  # warm-up
+        samples = _time_queries(lambda query: index.top_k(query, args.limit), queries)
+        results.append(summarize(
+            f"retrieval/vector/{size}", samples, sum(samples), unit="queries",
+            build_seconds=round(build_seconds, 3)
+        ))
+        del index
+
+        if size > args.lexical_max_size:
+            continue
+        started = time.perf_counter()
+        lexical = build_lexical_index(size)
+        build_seconds = time.perf_counter() - started
+        queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+        samples = _time_queries(lambda query: lexical.top_k(query, args.limit), queries)
+        results.append(summarize(
+            f"retrieval/bm25/{size}", samples, sum(samples), unit="queries",
+            build_seconds=round(build_seconds, 3)
+        ))
+        del lexical
+    return results
@@ -0,0 +1,149 @@
+"""
+벤치마크 공통 유틸리티
+지연시간 백분위수(p50/p95/p99)와 처리량 집계, 합성 약관 텍스트와 PDF 생성
+"""
+
+import math
+import random
+from typing import Dict, List, Optional, Sequence
+
+ARTICLE_TITLES = ["목적", "정의", "보험금의 지급사유", "보험금을 지급하지 않는 사유", "계약의 해지", "보험료의 납입", "청약의 철회"]
+SENTENCES = [
+    "회사는 피보험자가 보험기간 중 상해를 입은 경우 보험가입금액을 보험금으로 지급합니다.",
+    "계약자는 보험기간 중 언제든지 계약을 해지할 수 있으며 이 경우 해약환급금을 지급합니다.",
+    "피보험자가 고의로 자신을 해친 경우에는 보험금을 지급하지 않습니다.",
+    "보험료는 계약에서 정한 납입기일까지 납입하여야 합니다.",
+    "암으로 진단이 확정된 경우 진단비를 최초 1회에 한하여 지급합니다.",
+    "입원일수 1일당 입원급여금을 지급하며 최대 180일을 한도로 합니다.",
+    "질병으로 인하여 수술을 받은 경우 수술 1회당 수술비를 지급합니다.",
+]
+QUERIES = [
+    "보험금 지급사유는 무엇인가요?",
+    "계약을 해지하면 환급금을 받을 수 있나요?",
+    "암 진단비는 몇 번 지급되나요?",
+    "입원급여금 한도는 며칠인가요?",
+    "보험료를 늦게 내면 어떻게 되나요?",
+    "수술비는 어떤 경우에 지급되나요?",
+]
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of `samples` (q in 0..100)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(
+    name: str,
+    samples: Sequence[float],
+    elapsed: float,
+    items: Optional[int] = None,
+    unit: str = "ops",
+    **extra
+) -> Dict:
+    """Latency percentiles (ms) of `samples` (seconds) and throughput of `items` over `elapsed` seconds"""
+    items = len(samples) if items is None else items
+    result = {
+        "name": name,
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+        "throughput": round(items / elapsed, 3) if elapsed > 0 else 0.0,
+        "unit": f"{unit}/s",
+    }
+    result.update(extra)
+    return result
+
+
+def print_result(result: Dict) -> None:
+    extra = {
+        key: value for key, value in result.items()
+        if key not in ("name", "count", "p50_ms", "p95_ms", "p99_ms", "mean_ms", "throughput", "unit")
+    }
+    print(
+        f"  {result['name']:<40} n={result['count']:<6} "
+        f"p50={result['p50_ms']:>9.2f}ms p95={result['p95_ms']:>9.2f}ms p99={result['p99_ms']:>9.2f}ms "
+        f"{result['throughput']:>10.1f} {result['unit']}"
+        + (f"  {extra}" if extra else "")
+    )
+
+
+def synthetic_policy_pages(page_count: int, lines_per_page: int = 30, seed: int = 0) -> List[str]:
+    """Korean policy-like page texts with numbered articles"""
+    rng = random.Random(seed)
+    pages = []
+    article = 1
+    for _ in range(page_count):
+        lines = []
+        while len(lines) < lines_per_page:
+            if rng.random() < 0.15:
+                lines.append(f"제{article}조 ({rng.choice(ARTICLE_TITLES)})")
+                article += 1
+            else:
+                lines.append(" ".join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 3))))
+        pages.append("\n".join(lines))
+    return pages
+
+
+def synthetic_ascii_pages(page_count: int, lines_per_page: int = 40, seed: int = 0) -> List[List[str]]:
+    """English policy-like lines per page; the minimal PDF writer below only embeds ASCII text"""
+    rng = random.Random(seed)
+    words = (
+        "the insurer pays the insured amount when the insured person is injured during the coverage "
+        "period unless the injury was caused intentionally premiums are due on the agreed date"
+    ).split()
+    pages = []
+    article = 1
+    for _ in range(page_count):
+        lines = []
+        for _ in range(lines_per_page):
+            if rng.random() < 0.1:
+                lines.append(f"Article {article} (Payment of benefits)")
+                article += 1
+            else:
+                lines.append(" ".join(rng.choice(words) for _ in range(12)))
+        pages.append(lines)
+    return pages
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: List[List[str]]) -> None:
+    """Write a minimal text PDF (Helvetica, one line per text row) without extra dependencies"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 50 800 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        data = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(data), data))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_refs))
+
+    with open(path, "wb") as out:
+        out.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(out.tell())
+            out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref = out.tell()
+        out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            out.write(b"%010d 00000 n \n" % offset)
+        out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+벤치마크 실행 스크립트
+청킹, PDF 추출, 검색(10k/100k/1M 청크), 문서 인덱싱 처리량, /chat 동시성 벤치마크를 실행하고
+p50/p95/p99 지연시간과 처리량을 출력합니다.
+
+기본적으로 LLM_PROVIDER=fake(로컬 가짜 Gemini)와 벤치마크 전용 SQLite 데이터베이스를 사용하므로
+Gemini 할당량을 소모하지 않습니다. --json으로 결과를 저장하고 --baseline으로 이전 결과와 비교하면
+기준보다 느려진 항목을 회귀로 표시합니다.
+
+사용 예:
+    python -m benchmarks.run
+    python -m benchmarks.run chunking retrieval --sizes 10000,100000
+    python -m benchmarks.run --json results.json --baseline baseline.json
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SUITES = ("chunking", "pdf", "retrieval", "ingest", "chat")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Insurance RAG backend benchmarks")
+    parser.add_argument("suites", nargs="*", choices=SUITES, help="suites to run (default: all)")
+    parser.add_argument("--pages", type=int, default=50, help="pages per synthetic document")
+    parser.add_argument("--documents", type=int, default=5, help="documents per chunking/pdf/ingest run")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="retrieval index sizes in chunks")
+    parser.add_argument("--lexical-max-size", type=int, default=100000, help="largest BM25 index to build")
+    parser.add_argument("--queries", type=int, default=100, help="queries per retrieval index size")
+    parser.add_argument("--limit", type=int, default=20, help="results per retrieval query")
+    parser.add_argument("--url", help="benchmark /chat on a running server instead of an in-process one")
+    parser.add_argument("--concurrency", default="1,8,32", help="/chat concurrency levels")
+    parser.add_argument("--requests", type=int, default=64, help="/chat requests per concurrency level")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare with results saved by an earlier --json run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+    args.suites = args.suites or list(SUITES)
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+    return args
+
+
+def find_regressions(results, baseline, tolerance: float):
+    """Names of results whose p95 grew or throughput fell by more than `tolerance` against the baseline"""
+    previous = {result["name"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result["name"])
+        if not before:
+            continue
+        slower = before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + tolerance)
+        less_throughput = before["throughput"] and result["throughput"] < before["throughput"] * (1 - tolerance)
+        if slower or less_throughput:
+            regressions.append(
+                f"{result['name']}: p95 {before['p95_ms']} -> {result['p95_ms']} ms, "
+                f"throughput {before['throughput']} -> {result['throughput']} {result['unit']}"
+            )
+    return regressions
+
+
+def main() -> int:
+    args = parse_args()
+
+    # Never spend Gemini quota or touch the configured database unless asked to
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.db")
+    os.environ.setdefault("UPLOAD_DIR", "benchmark_uploads")
+    os.environ.setdefault("EMBEDDING_CACHE_PERSIST", "false")
+    # Measure the full retrieval + generation path rather than answer cache replays
+    os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+    # All benchmark requests come from one client; the per-client rate limit would reject most of them
+    os.environ.setdefault("CHAT_CLIENT_RATE_PER_MINUTE", "0")
+    from benchmarks.common import print_result
+
+    results = []
+    for suite in args.suites:
+        print(f"🏁 {suite}")
+        module = importlib.import_module(f"benchmarks.bench_{suite}")
+        for result in module.run(args):
+            print_result(result)
+            results.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as out:
+            json.dump(results, out, indent=2, ensure_ascii=False)
+        print(f"✅ Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = find_regressions(results, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"   {regression}")
+            return 1
+        print(f"✅ No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
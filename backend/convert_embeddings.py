@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+임베딩 저장 형식 변환 스크립트
+document_chunks / embedding_cache 의 embedding 컬럼을 EMBEDDING_STORAGE 형식
+(vector: float32, halfvec: float16, int8: 벡터별 스케일을 붙인 8비트 양자화)으로 변환합니다.
+
+사용법: python convert_embeddings.py [vector|halfvec|int8]
+인자를 생략하면 EMBEDDING_STORAGE 설정값으로 변환합니다. 변환 후에는 같은 EMBEDDING_STORAGE 값으로 서버를 시작하세요.
+"""
+
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from sqlalchemy import text
+from core.config import settings
+from core.database import vector_engine, init_vector_extension
+from core.vector_storage import EMBEDDING_STORAGE_FORMATS, decode_embedding, encode_embedding, uses_pgvector
+from models.database import HNSW_OPS
+
+BATCH_SIZE = 1000
+
+# Table → primary key columns (rows are rewritten in key order)
+TABLES = {
+    "document_chunks": ("id",),
+    "embedding_cache": ("model", "text_hash"),
+}
+
+
+def get_column_type(conn, table: str):
+    """Return the current data type of <table>.embedding (None when the table does not exist)"""
+    return conn.execute(text("""
+        SELECT udt_name FROM information_schema.columns
+        WHERE table_name = :table AND column_name = 'embedding'
+    """), {"table": table}).scalar()
+
+
+def average_size(conn, table: str) -> float:
+    """Average stored bytes per embedding"""
+    size = "pg_column_size(embedding)" if conn.dialect.name == "postgresql" else "length(embedding)"
+    return float(conn.execute(text(f"SELECT avg({size}) FROM {table}")).scalar() or 0)
+
+
+def to_array(value) -> np.ndarray:
+    """Stored embedding in any supported format ('[...]' text, float32/float16/int8 bytes) → float32 array"""
+    if isinstance(value, str):
+        return np.asarray(json.loads(value), dtype=np.float32)
+    return decode_embedding(bytes(value), settings.embedding_dimension, "vector")
+
+
+def column_sql(storage: str) -> str:
+    dimension = settings.embedding_dimension
+    return {"vector": f"vector({dimension})", "halfvec": f"halfvec({dimension})", "int8": "bytea"}[storage]
+
+
+def rewrite_rows(conn, table: str, target: str, source_column: str, target_column: str) -> int:
+    """Read every embedding from source_column and write it to target_column in the target format"""
+    keys = TABLES[table]
+    key_list = ", ".join(keys)
+    key_params = ", ".join(f":last_{key}" for key in keys)
+    on_pg = uses_pgvector(target, conn.dialect.name)
+    value_sql = f"CAST(:embedding AS {column_sql(target)})" if on_pg else ":embedding"
+    match = " AND ".join(f"{key} = :{key}" for key in keys)
+
+    converted = 0
+    last = None
+    while True:
+        after = f"WHERE ({key_list}) > ({key_params})" if last else ""
+        rows = conn.execute(
+            text(f"SELECT {key_list}, {source_column} AS embedding FROM {table} {after} ORDER BY {key_list} LIMIT :limit"),
+            {**(last or {}), "limit": BATCH_SIZE}
+        ).mappings().all()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            vector = to_array(row["embedding"])
+            value = json.dumps(vector.tolist()) if on_pg else encode_embedding(vector, target)
+            updates.append({**{key: row[key] for key in keys}, "embedding": value})
+        conn.execute(text(f"UPDATE {table} SET {target_column} = {value_sql} WHERE {match}"), updates)
+
+        converted += len(rows)
+        last = {f"last_{key}": rows[-1][key] for key in keys}
+        print(f"   {table}: {converted}개 변환")
+
+    return converted
+
+
+def convert_postgresql(conn, table: str, target: str) -> None:
+    dimension = settings.embedding_dimension
+    current = get_column_type(conn, table)
+    if table == "document_chunks":
+        conn.execute(text("DROP INDEX IF EXISTS idx_chunk_embedding_hnsw"))
+
+    if current in ("vector", "halfvec") and target in ("vector", "halfvec"):
+        # pgvector casts between vector and halfvec itself
+        conn.execute(text(f"""
+            ALTER TABLE {table}
+            ALTER COLUMN embedding TYPE {target}({dimension})
+            USING embedding::{target}({dimension})
+        """))
+    else:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN embedding_converted {column_sql(target)}"))
+        rewrite_rows(conn, table, target, "embedding", "embedding_converted")
+        conn.execute(text(f"ALTER TABLE {table} DROP COLUMN embedding"))
+        conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN embedding_converted TO embedding"))
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN embedding SET NOT NULL"))
+
+    if table == "document_chunks" and target in HNSW_OPS:
+        print("🔄 HNSW 인덱스 재생성 중...")
+        conn.execute(text(f"""
+            CREATE INDEX idx_chunk_embedding_hnsw
+            ON document_chunks USING hnsw (embedding {HNSW_OPS[target]})
+            WITH (m = {settings.hnsw_m}, ef_construction = {settings.hnsw_ef_construction})
+        """))
+
+
+def convert_embeddings(target: str):
+    """embedding 컬럼을 target 형식으로 변환"""
+    if target not in EMBEDDING_STORAGE_FORMATS:
+        print(f"❌ 알 수 없는 형식: {target} (vector, halfvec, int8 중 하나)")
+        return
+
+    init_vector_extension(vector_engine)
+    on_postgresql = vector_engine.dialect.name == "postgresql"
+
+    for table in TABLES:
+        with vector_engine.begin() as conn:
+            if on_postgresql:
+                if get_column_type(conn, table) is None:
+                    print(f"ℹ️  {table} 테이블이 없습니다. 서버 시작 시 {target} 형식으로 생성됩니다.")
+                    continue
+            elif not conn.dialect.has_table(conn, table):
+                print(f"ℹ️  {table} 테이블이 없습니다. 서버 시작 시 {target} 형식으로 생성됩니다.")
+                continue
+
+            before = average_size(conn, table)
+            print(f"🔄 {table}.embedding → {target} 변환 중...")
+            if on_postgresql:
+                convert_postgresql(conn, table, target)
+            else:
+                rewrite_rows(conn, table, target, "embedding", "embedding")
+            after = average_size(conn, table)
+            print(f"✅ {table}: 임베딩당 평균 {before:.0f} → {after:.0f} bytes")
+
+    if target == "int8":
+        print("ℹ️  int8 형식은 pgvector로 검색할 수 없어 numpy 검색 백엔드가 사용됩니다.")
+    if settings.vector_index_path:
+        print(f"ℹ️  저장된 numpy 인덱스({settings.vector_index_path}.*)를 삭제하면 다음 시작 시 새 값으로 다시 만듭니다.")
+    print(f"✅ 변환 완료. EMBEDDING_STORAGE={target} 로 서버를 시작하세요.")
+
+
+if __name__ == "__main__":
+    convert_embeddings(sys.argv[1] if len(sys.argv) > 1 else settings.embedding_storage)
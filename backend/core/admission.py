@@ -0,0 +1,198 @@
+import asyncio
+import math
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from core.config import settings
+from core.metrics import registry
+
+chat_rejections_total = registry.counter(
+    "rag_chat_rejections_total", "Chat requests rejected by admission control", labels=("reason",)
+)
+chat_queue_wait_seconds = registry.histogram(
+    "rag_chat_queue_wait_seconds", "Time chat requests waited for a generation slot"
+)
+
+
+class AdmissionRejected(Exception):
+    """Request turned away; the client should retry after `retry_after` seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def client_ip(peer: Optional[str], forwarded_for: Optional[str], trusted_hops: int) -> Optional[str]:
+    """Client address for rate limiting
+
+    Each of the `trusted_hops` reverse proxies in front of the app appends the
+    address it received the request from to X-Forwarded-For, so the entry
+    `trusted_hops` from the right is the last one a trusted proxy wrote.
+    Entries further left come from the client and are ignored.
+    """
+    if trusted_hops <= 0 or not forwarded_for:
+        return peer
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    if not hops:
+        return peer
+    return hops[-min(trusted_hops, len(hops))]
+
+
+class TokenBucket:
+    """Non-blocking token bucket: `rate_per_minute` refill up to `burst` tokens"""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 when one is available now)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class GenerationSlot:
+    """One admitted generation; give it back with release(), which is idempotent"""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._acquired_at = time.perf_counter()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(time.perf_counter() - self._acquired_at)
+
+    def release_with(self, owner) -> None:
+        """Also release when `owner` is garbage collected, e.g. a response stream
+        that was never iterated because the client disconnected first"""
+        weakref.finalize(owner, self.release)
+
+
+class AdmissionController:
+    """Admission control for /chat
+
+    Each client (IP address, and session when one is given) has a token
+    bucket limiting its request rate. Requests that need generation then take
+    one of `max_concurrent` slots, bounding the streams open to the LLM
+    provider; up to `queue_size` requests wait for a slot for at most
+    `queue_timeout` seconds. Anything beyond that is rejected right away with
+    a Retry-After estimate instead of piling onto the provider's rate limits.
+    """
+
+    # Weight of the latest slot hold time in the moving average used for Retry-After
+    HOLD_TIME_SMOOTHING = 0.1
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        queue_size: int,
+        queue_timeout: float,
+        client_rate_per_minute: float,
+        client_burst: int,
+        max_clients: int,
+    ):
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.client_rate_per_minute = client_rate_per_minute
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._hold_seconds = 5.0
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+
+    def _reject(self, reason: str, retry_after: float) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        chat_rejections_total.inc(reason=reason)
+        return AdmissionRejected(reason, retry_after)
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.client_rate_per_minute, self.client_burst)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def check_rate(self, client_ip: Optional[str], session_id: Optional[str] = None) -> None:
+        """Take a token from the client's buckets, or raise AdmissionRejected"""
+        if self.client_rate_per_minute <= 0:
+            return
+        keys = [f"ip:{client_ip}" if client_ip else None, f"session:{session_id}" if session_id else None]
+        buckets = [self._bucket(key) for key in keys if key]
+        # Only spend tokens when every bucket has one
+        wait = max((bucket.wait_time() for bucket in buckets), default=0.0)
+        if wait > 0:
+            raise self._reject("rate_limited", wait)
+        for bucket in buckets:
+            bucket.take()
+
+    def _retry_after(self) -> float:
+        """Rough time until a slot frees up for a newly queued request"""
+        return self._hold_seconds * (self.waiting + 1) / self.max_concurrent
+
+    async def acquire(self) -> GenerationSlot:
+        """Wait for a generation slot, or raise AdmissionRejected"""
+        if self._semaphore.locked() and self.waiting >= self.queue_size:
+            raise self._reject("queue_full", self._retry_after())
+
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("queue_timeout", self._retry_after())
+        finally:
+            self.waiting -= 1
+            chat_queue_wait_seconds.observe(time.perf_counter() - started)
+
+        self.in_flight += 1
+        self.admitted += 1
+        return GenerationSlot(self)
+
+    def _release(self, held: float) -> None:
+        self._hold_seconds += self.HOLD_TIME_SMOOTHING * (held - self._hold_seconds)
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": self.waiting,
+            "queue_size": self.queue_size,
+            "clients_tracked": len(self._buckets),
+            "admitted": self.admitted,
+            "rejected_rate_limited": self.rejected["rate_limited"],
+            "rejected_queue_full": self.rejected["queue_full"],
+            "rejected_queue_timeout": self.rejected["queue_timeout"],
+            "avg_generation_seconds": round(self._hold_seconds, 3),
+        }
+
+
+chat_admission = AdmissionController(
+    max_concurrent=settings.chat_max_concurrent,
+    queue_size=settings.chat_queue_size,
+    queue_timeout=settings.chat_queue_timeout_seconds,
+    client_rate_per_minute=settings.chat_client_rate_per_minute,
+    client_burst=settings.chat_client_burst,
+    max_clients=settings.chat_client_buckets
+)
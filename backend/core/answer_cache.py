@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+import numpy as np
+
+from core.config import settings
+from core.corpus import corpus_version
+from core.embeddings import text_hash
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    embedding: np.ndarray  # unit-length query embedding
+    generation: int
+    latency: float  # seconds the original retrieval + generation took
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class AnswerCache:
+    """Semantic cache of chat answers keyed by query embedding
+
+    A query hits when its normalized text was seen before, or when the cosine
+    similarity of its embedding to a cached query reaches `threshold`. Entries
+    are only valid for the corpus generation they were generated against, so
+    indexing or deleting any document invalidates all of them: a new document
+    can change the best answer to a question that never retrieved it.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: float):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None  # stacked embeddings, rebuilt after changes
+        self._keys: list = []
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+        corpus_version.subscribe(lambda generation: self.clear())
+
+    def _is_fresh(self, entry: CachedAnswer) -> bool:
+        return (
+            entry.generation == corpus_version.generation
+            and time.monotonic() - entry.created_at < self.ttl_seconds
+        )
+
+    def _similar(self, query: np.ndarray) -> Optional[str]:
+        if self._matrix is None:
+            if not self._entries:
+                return None
+            self._keys = list(self._entries)
+            self._matrix = np.stack([self._entries[key].embedding for key in self._keys])
+        scores = self._matrix @ query
+        best = int(np.argmax(scores))
+        return self._keys[best] if scores[best] >= self.threshold else None
+
+    def get(self, query: str, query_embedding: Sequence[float]) -> Optional[CachedAnswer]:
+        """Return a fresh cached answer for this or a semantically equivalent query"""
+        key = text_hash(query)
+        vector = _unit(query_embedding)
+        with self._lock:
+            entry = self._entries.get(key)
+            exact = entry is not None
+            if entry is None and vector is not None:
+                similar = self._similar(vector)
+                entry = self._entries.get(similar) if similar else None
+            if entry is None or not self._is_fresh(entry):
+                self.misses += 1
+                return None
+            if exact:
+                self.exact_hits += 1
+            else:
+                self.semantic_hits += 1
+            self._entries.move_to_end(key if exact else similar)
+            return entry
+
+    def put(
+        self,
+        query: str,
+        query_embedding: Sequence[float],
+        answer: str,
+        generation: int,
+        latency: float,
+    ) -> None:
+        vector = _unit(query_embedding)
+        if vector is None or generation != corpus_version.generation:
+            return
+        with self._lock:
+            self._entries[text_hash(query)] = CachedAnswer(
+                answer=answer,
+                embedding=vector,
+                generation=generation,
+                latency=latency,
+            )
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def record_saved(self, entry: CachedAnswer, elapsed: float) -> None:
+        """Account the time a hit saved compared with generating the answer"""
+        with self._lock:
+            self.latency_saved += max(entry.latency - elapsed, 0.0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "corpus_generation": corpus_version.generation,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "latency_saved_seconds": round(self.latency_saved, 3),
+            "avg_latency_saved_seconds": round(self.latency_saved / hits, 3) if hits else 0.0,
+        }
+
+
+def _unit(embedding: Sequence[float]) -> Optional[np.ndarray]:
+    if embedding is None or not len(embedding):
+        return None
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+answer_cache = AnswerCache(
+    threshold=settings.answer_cache_similarity,
+    max_entries=settings.answer_cache_max_entries,
+    ttl_seconds=settings.answer_cache_ttl_seconds
+)
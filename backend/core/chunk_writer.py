@@ -0,0 +1,126 @@
+import io
+import struct
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.vector_storage import encode_embedding
+from models.database import DocumentChunk
+
+# Columns written for each chunk row (the id is allocated separately)
+CHUNK_COLUMNS = (
+    "document_id", "content", "content_hash", "embedding",
+    "page_number", "clause_id", "char_start", "char_end",
+)
+
+# PostgreSQL binary COPY framing
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+PGCOPY_TRAILER = struct.pack("!h", -1)
+PGCOPY_NULL = struct.pack("!i", -1)
+
+
+def _encode_int4(value: int) -> bytes:
+    return struct.pack("!ii", 4, value)
+
+
+def _encode_text(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return struct.pack("!i", len(data)) + data
+
+
+def _encode_vector(value) -> bytes:
+    """pgvector binary format: int16 dimension, int16 unused, big-endian float32 values"""
+    values = np.asarray(value, dtype=">f4")
+    payload = struct.pack("!hh", len(values), 0) + values.tobytes()
+    return struct.pack("!i", len(payload)) + payload
+
+
+def _encode_halfvec(value) -> bytes:
+    """pgvector halfvec binary format: int16 dimension, int16 unused, big-endian float16 values"""
+    values = np.asarray(value, dtype=">f2")
+    payload = struct.pack("!hh", len(values), 0) + values.tobytes()
+    return struct.pack("!i", len(payload)) + payload
+
+
+def _encode_bytea(value) -> bytes:
+    data = encode_embedding(value, settings.embedding_storage)
+    return struct.pack("!i", len(data)) + data
+
+
+EMBEDDING_COPY_ENCODERS: Dict[str, Callable] = {
+    "vector": _encode_vector,
+    "halfvec": _encode_halfvec,
+    "int8": _encode_bytea,
+}
+
+COPY_ENCODERS: Dict[str, Callable] = {
+    "id": _encode_int4,
+    "document_id": _encode_int4,
+    "content": _encode_text,
+    "content_hash": _encode_text,
+    "embedding": EMBEDDING_COPY_ENCODERS[settings.embedding_storage],
+    "page_number": _encode_int4,
+    "clause_id": _encode_text,
+    "char_start": _encode_int4,
+    "char_end": _encode_int4,
+}
+
+
+def _use_copy(db: Session) -> bool:
+    method = settings.chunk_write_method
+    if method == "auto":
+        return db.bind.dialect.name == "postgresql" and db.bind.dialect.driver == "psycopg2"
+    return method == "copy"
+
+
+def _copy_batch(db: Session, rows: Sequence[dict]) -> List[int]:
+    """Stream rows with COPY ... FROM STDIN (FORMAT binary); ids come from the serial sequence"""
+    ids = db.execute(
+        text("SELECT nextval(pg_get_serial_sequence('document_chunks', 'id')) FROM generate_series(1, :n)"),
+        {"n": len(rows)}
+    ).scalars().all()
+
+    columns = ("id",) + CHUNK_COLUMNS
+    field_count = struct.pack("!h", len(columns))
+    buffer = io.BytesIO()
+    buffer.write(PGCOPY_HEADER)
+    for chunk_id, row in zip(ids, rows):
+        buffer.write(field_count)
+        for column in columns:
+            value = chunk_id if column == "id" else row.get(column)
+            buffer.write(PGCOPY_NULL if value is None else COPY_ENCODERS[column](value))
+    buffer.write(PGCOPY_TRAILER)
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {DocumentChunk.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT binary)",
+            buffer
+        )
+    finally:
+        cursor.close()
+    return ids
+
+
+def _insert_batch(db: Session, rows: Sequence[dict]) -> List[int]:
+    """Multi-row INSERT ... VALUES ... RETURNING id"""
+    result = db.execute(
+        insert(DocumentChunk).returning(DocumentChunk.id, sort_by_parameter_order=True),
+        [{column: row.get(column) for column in CHUNK_COLUMNS} for row in rows]
+    )
+    return result.scalars().all()
+
+
+def write_chunks(db: Session, rows: Sequence[dict], batch_size: int = None) -> List[int]:
+    """Bulk insert chunk rows, committing after every batch; returns the new ids in row order"""
+    batch_size = batch_size or settings.chunk_write_batch_size
+    write_batch = _copy_batch if _use_copy(db) else _insert_batch
+    ids: List[int] = []
+    for start in range(0, len(rows), batch_size):
+        ids.extend(write_batch(db, rows[start:start + batch_size]))
+        db.commit()
+    return ids
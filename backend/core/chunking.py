@@ -0,0 +1,195 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional
+
+from core.config import settings
+from core.pdf import PageText
+
+# Article heading at the start of a line: "제3조 (보험금의 지급사유)", "제3조의2(...)".
+# References such as "제3조에 따라" are not headings.
+ARTICLE_HEADING = re.compile(r"^제\s*(\d+)\s*조(?:\s*의\s*(\d+))?(?=\s*[(（【\[]|\s*$)")
+# Chapter/section headings ("제2장", "제1관", "제3절") also close the current chunk
+SECTION_HEADING = re.compile(r"^제\s*\d+\s*(?:장|관|절)(?=\s|$)")
+# 항: circled numbers ① .. ⑳
+PARAGRAPH_MARK = re.compile(r"^([①-⑳])")
+# 호: "1. ", "12. " at the start of a line
+ITEM_MARK = re.compile(r"^(\d{1,2})\.\s")
+# Sentence end: terminal punctuation after a letter (not "1." or "3.5") followed by whitespace
+SENTENCE_END = re.compile(r"(?<=[가-힣A-Za-z)\]\"'’”])[.?!。](?=\s)")
+HANGUL = re.compile(r"[가-힣]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about one token per Hangul syllable, four characters per token otherwise"""
+    hangul = len(HANGUL.findall(text))
+    other = len(text) - hangul - text.count(" ")
+    return hangul + (max(other, 0) + 3) // 4
+
+
+@dataclass
+class Chunk:
+    content: str
+    page_number: int
+    clause_id: Optional[str]
+    char_start: int
+    char_end: int
+
+
+@dataclass
+class _Unit:
+    text: str
+    page_number: int
+    clause_id: Optional[str]
+    char_start: int
+    char_end: int
+    tokens: int
+    starts_section: bool
+
+
+class _ClauseState:
+    """Tracks the current 조/항/호 while scanning a document"""
+
+    def __init__(self):
+        self.article: Optional[str] = None
+        self.paragraph: Optional[int] = None
+        self.item: Optional[int] = None
+
+    def update(self, text: str, line_start: bool) -> bool:
+        """Consume a heading at the start of `text`; returns True on an article/section boundary"""
+        stripped = text.lstrip()
+        if line_start:
+            match = ARTICLE_HEADING.match(stripped)
+            if match:
+                self.article = f"제{match.group(1)}조" + (f"의{match.group(2)}" if match.group(2) else "")
+                self.paragraph = self.item = None
+                return True
+            if SECTION_HEADING.match(stripped):
+                self.article = self.paragraph = self.item = None
+                return True
+            match = ITEM_MARK.match(stripped)
+            if match and self.article:
+                self.item = int(match.group(1))
+                return False
+        match = PARAGRAPH_MARK.match(stripped)
+        if match and self.article:
+            self.paragraph = ord(match.group(1)) - 0x2460 + 1
+            self.item = None
+        return False
+
+    @property
+    def clause_id(self) -> Optional[str]:
+        if not self.article:
+            return None
+        parts = [self.article]
+        if self.paragraph:
+            parts.append(f"제{self.paragraph}항")
+        if self.item:
+            parts.append(f"제{self.item}호")
+        return " ".join(parts)
+
+
+def _split_sentences(line: str) -> List[str]:
+    pieces, start = [], 0
+    for match in SENTENCE_END.finditer(line):
+        pieces.append(line[start:match.end()])
+        start = match.end()
+    if start < len(line):
+        pieces.append(line[start:])
+    return pieces
+
+
+def _iter_units(pages: Iterable[PageText]) -> Iterator[_Unit]:
+    """Break pages into sentence/line units annotated with clause and document offsets"""
+    state = _ClauseState()
+    offset = 0
+    for page_number, text in pages:
+        for line in (text + "\n").splitlines(keepends=True):
+            for index, piece in enumerate(_split_sentences(line)):
+                boundary = state.update(piece, line_start=index == 0)
+                yield _Unit(
+                    text=piece,
+                    page_number=page_number,
+                    clause_id=state.clause_id,
+                    char_start=offset,
+                    char_end=offset + len(piece),
+                    tokens=estimate_tokens(piece),
+                    starts_section=boundary,
+                )
+                offset += len(piece)
+
+
+def _common_clause(units: List[_Unit]) -> Optional[str]:
+    """Longest clause id prefix shared by all units (e.g. '제3조' when a chunk spans several 항)"""
+    ids = [unit.clause_id.split(" ") for unit in units if unit.clause_id]
+    if not ids:
+        return None
+    common = ids[0]
+    for parts in ids[1:]:
+        size = 0
+        while size < min(len(common), len(parts)) and common[size] == parts[size]:
+            size += 1
+        common = common[:size]
+    return " ".join(common) or None
+
+
+def _split_oversized(unit: _Unit, budget: int) -> Iterator[_Unit]:
+    """Cut a unit longer than the budget into budget-sized pieces"""
+    size = max(1, len(unit.text) * budget // max(unit.tokens, 1))
+    for start in range(0, len(unit.text), size):
+        piece = unit.text[start:start + size]
+        yield _Unit(
+            text=piece,
+            page_number=unit.page_number,
+            clause_id=unit.clause_id,
+            char_start=unit.char_start + start,
+            char_end=unit.char_start + start + len(piece),
+            tokens=estimate_tokens(piece),
+            starts_section=unit.starts_section and start == 0,
+        )
+
+
+def chunk_document(pages: Iterable[PageText], token_budget: Optional[int] = None) -> Iterator[Chunk]:
+    """Split a stream of page texts on clause headings and sentence ends, packed up to a token budget
+
+    Articles (조) and chapters never share a chunk; paragraphs (항), items (호)
+    and sentences of the same article are packed together until the budget is
+    reached. Chunks do not overlap.
+    """
+    budget = token_budget or settings.chunk_token_budget
+    buffer: List[_Unit] = []
+    tokens = 0
+    body_tokens = 0  # tokens outside heading lines; a lone chapter heading joins the next article
+
+    def flush() -> Optional[Chunk]:
+        nonlocal buffer, tokens, body_tokens
+        content = "".join(unit.text for unit in buffer).strip()
+        chunk = None
+        if content:
+            chunk = Chunk(
+                content=content,
+                page_number=buffer[0].page_number,
+                clause_id=_common_clause(buffer),
+                char_start=buffer[0].char_start,
+                char_end=buffer[-1].char_end,
+            )
+        buffer, tokens, body_tokens = [], 0, 0
+        return chunk
+
+    for unit in _iter_units(pages):
+        if not buffer and not unit.text.strip():
+            continue
+        pieces = _split_oversized(unit, budget) if unit.tokens > budget else (unit,)
+        for piece in pieces:
+            if buffer and ((piece.starts_section and body_tokens) or tokens + piece.tokens > budget):
+                chunk = flush()
+                if chunk:
+                    yield chunk
+            buffer.append(piece)
+            tokens += piece.tokens
+            if not piece.starts_section:
+                body_tokens += piece.tokens
+
+    if buffer:
+        chunk = flush()
+        if chunk:
+            yield chunk
@@ -0,0 +1,151 @@
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from core.chunking import estimate_tokens
+from core.config import settings
+from core.embeddings import text_hash
+
+# Chunks of the same document at most this many characters apart are merged into one passage
+ADJACENT_GAP_CHARS = 8
+# Legacy chunks were cut with a fixed character overlap; look this far for a shared suffix/prefix
+MAX_OVERLAP_CHARS = 400
+MIN_OVERLAP_CHARS = 20
+PASSAGE_SEPARATOR = "\n\n"
+
+
+@dataclass
+class _Passage:
+    document_id: int
+    content: str
+    rank: int  # best retrieval rank among the merged chunks
+    char_start: Optional[int]
+    char_end: Optional[int]
+    clause_id: Optional[str]
+
+
+def _text_overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`"""
+    for size in range(min(len(left), len(right), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _follows(left: _Passage, right: _Passage) -> Optional[int]:
+    """Characters of `right` already in `left` when `right` continues `left`, else None"""
+    if left.document_id != right.document_id:
+        return None
+    if left.char_end is not None and right.char_start is not None:
+        if 0 <= right.char_start - left.char_end <= ADJACENT_GAP_CHARS:
+            return 0
+        if right.char_start < left.char_end <= right.char_end:
+            return _text_overlap(left.content, right.content)
+        return None
+    overlap = _text_overlap(left.content, right.content)
+    return overlap or None
+
+
+def _contains(outer: _Passage, inner: _Passage) -> bool:
+    if outer.document_id != inner.document_id:
+        return False
+    if None not in (outer.char_start, outer.char_end, inner.char_start, inner.char_end):
+        return outer.char_start <= inner.char_start and inner.char_end <= outer.char_end
+    return inner.content in outer.content
+
+
+def _merge(left: _Passage, right: _Passage, overlap: int) -> _Passage:
+    separator = "" if overlap else "\n"
+    return _Passage(
+        document_id=left.document_id,
+        content=left.content + separator + right.content[overlap:],
+        rank=min(left.rank, right.rank),
+        char_start=left.char_start,
+        char_end=right.char_end if right.char_end is not None else left.char_end,
+        clause_id=left.clause_id if left.clause_id == right.clause_id else None,
+    )
+
+
+def _header(clause_id: Optional[str]) -> str:
+    return f"[{clause_id}]\n" if clause_id else ""
+
+
+def _truncate(content: str, budget: int) -> str:
+    """Cut content to roughly `budget` tokens, preferring the last line break inside the cut"""
+    size = max(1, len(content) * budget // max(estimate_tokens(content), 1))
+    cut = content[:size]
+    newline = cut.rfind("\n")
+    return cut[:newline] if newline > size // 2 else cut
+
+
+def _merge_passages(passages: List[_Passage]) -> List[_Passage]:
+    """Join passages that continue one another, repeatedly, until nothing merges"""
+    merged = True
+    while merged:
+        merged = False
+        for i, left in enumerate(passages):
+            for j, right in enumerate(passages):
+                if i == j:
+                    continue
+                overlap = _follows(left, right)
+                if overlap is not None:
+                    passages[i] = _merge(left, right, overlap)
+                    del passages[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return passages
+
+
+def build_context(chunks: Sequence, token_budget: Optional[int] = None) -> str:
+    """Assemble retrieved chunks (best first) into prompt context within a token budget
+
+    Duplicates and chunks contained in an already selected one are dropped,
+    the rest are taken in retrieval order while they fit the budget, and
+    neighbouring chunks of the same document are merged into one passage so
+    overlapping text is only sent once. Each chunk's clause header and
+    separator count against the budget as if it stayed a passage of its own.
+    """
+    budget = token_budget or settings.context_token_budget
+    selected: List[_Passage] = []
+    seen_hashes = set()
+    used = 0
+
+    for rank, chunk in enumerate(chunks):
+        content = (chunk.content or "").strip()
+        content_hash = getattr(chunk, "content_hash", None) or text_hash(content)
+        if not content or content_hash in seen_hashes:
+            continue
+        passage = _Passage(
+            document_id=chunk.document_id,
+            content=content,
+            rank=rank,
+            char_start=getattr(chunk, "char_start", None),
+            char_end=getattr(chunk, "char_end", None),
+            clause_id=getattr(chunk, "clause_id", None),
+        )
+        if any(_contains(other, passage) for other in selected):
+            continue
+
+        # Only the text not already covered by a neighbouring selected chunk costs tokens
+        overlap = max(
+            [_follows(other, passage) or 0 for other in selected]
+            + [_follows(passage, other) or 0 for other in selected],
+            default=0
+        )
+        framing = estimate_tokens(_header(passage.clause_id) + (PASSAGE_SEPARATOR if selected else ""))
+        cost = estimate_tokens(content) - estimate_tokens(content[:overlap]) + framing
+        if used + cost > budget:
+            if not selected:
+                # Always send something: the best chunk, cut to the budget
+                passage.content = _truncate(content, max(budget - framing, 1))
+                passage.char_start = passage.char_end = None
+                selected.append(passage)
+                break
+            continue
+        seen_hashes.add(content_hash)
+        selected.append(passage)
+        used += cost
+
+    passages = sorted(_merge_passages(selected), key=lambda passage: passage.rank)
+    return PASSAGE_SEPARATOR.join(_header(passage.clause_id) + passage.content for passage in passages)
@@ -0,0 +1,41 @@
+import threading
+from typing import Callable, List
+
+
+class CorpusVersion:
+    """Generation counter of the indexed corpus
+
+    Bumped whenever searchable chunks change (an ingestion finishes or fails
+    after inserting chunks, a document is deleted). Caches of answers or
+    retrieval results tag entries with the generation they were built
+    against and treat older entries as stale.
+    """
+
+    def __init__(self):
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[int], None]] = []
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def subscribe(self, listener: Callable[[int], None]) -> None:
+        """Call `listener(new_generation)` after every bump"""
+        self._listeners.append(listener)
+
+    def bump(self, reason: str = "") -> int:
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        for listener in self._listeners:
+            try:
+                listener(generation)
+            except Exception as e:
+                print(f"Error in corpus change listener: {e}")
+        if reason:
+            print(f"🔁 Corpus changed ({reason}); generation {generation}")
+        return generation
+
+
+corpus_version = CorpusVersion()
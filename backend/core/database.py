@@ -1,23 +1,189 @@
-from sqlalchemy import create_engine
+import threading
+import time
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from core.config import settings
 
 # PostgreSQL 연결을 위해 URL 변환 (Railway는 postgres:// 형식을 사용)
 database_url = settings.database_url.replace("postgres://", "postgresql://")
 vector_database_url = settings.vector_database_url.replace("postgres://", "postgresql://")
 
+# One engine (and pool) per database when both URLs point to the same one
+shared_engine = vector_database_url == database_url
+
+
+class PoolStats:
+    """Checkout-wait statistics of one connection pool"""
+
+    SLOW_CHECKOUT_SECONDS = 0.1
+
+    def __init__(self, name: str, pool_size: int, max_overflow: int):
+        self.name = name
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.checkouts = 0
+        self.slow_checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, waited: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            if waited >= self.SLOW_CHECKOUT_SECONDS:
+                self.slow_checkouts += 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "slow_checkouts": self.slow_checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+            "wait_seconds_max": round(self.wait_seconds_max, 3),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 4) if self.checkouts else 0.0,
+        }
+
+
+pool_stats = {}
+
+
+def _instrumented_pool(pool_class, stats: PoolStats):
+    """Subclass of a queue pool that times every checkout, including waits for a free connection"""
+
+    class InstrumentedPool(pool_class):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except sa_exc.TimeoutError:
+                stats.record_timeout()
+                raise
+            stats.record(time.perf_counter() - started)
+            return connection
+
+    return InstrumentedPool
+
+
+def _engine_options(url: str, name: str, pool_class, pool_size: int, max_overflow: int) -> dict:
+    options = {"pool_pre_ping": True}
+    if make_url(url).get_backend_name() == "sqlite":
+        # SQLite pools are per-file/thread; sizing does not apply
+        return options
+    stats = pool_stats.setdefault(name, PoolStats(name, pool_size, max_overflow))
+    options.update(
+        poolclass=_instrumented_pool(pool_class, stats),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=settings.db_pool_recycle,
+        pool_timeout=settings.db_pool_timeout,
+    )
+    return options
+
+
+def _sync_engine_options(url: str, name: str) -> dict:
+    return _engine_options(url, name, QueuePool, settings.db_sync_pool_size, settings.db_sync_max_overflow)
+
+
 # Create database engine
-engine = create_engine(database_url, pool_pre_ping=True)
+engine = create_engine(database_url, **_sync_engine_options(database_url, "main"))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Create vector database engine for pgvector
-vector_engine = create_engine(vector_database_url, pool_pre_ping=True)
+if shared_engine:
+    vector_engine = engine
+else:
+    vector_engine = create_engine(vector_database_url, **_sync_engine_options(vector_database_url, "vector"))
 VectorSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=vector_engine)
 
+
+def to_async_url(url: str):
+    """Map a sync database URL to its asyncio driver (asyncpg / aiosqlite)"""
+    url = make_url(url)
+    if url.get_backend_name() == "postgresql":
+        query = dict(url.query)
+        # asyncpg takes 'ssl' instead of libpq's 'sslmode'
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+def _create_async_engine(url: str, name: str):
+    # No pgvector asyncpg codec: the SQLAlchemy vector types already bind and parse the text
+    # form, and the codec fails to register on databases without the vector extension
+    return create_async_engine(
+        to_async_url(url),
+        **_engine_options(url, name, AsyncAdaptedQueuePool, settings.db_pool_size, settings.db_max_overflow)
+    )
+
+
+# Async engines for the request path (/chat)
+async_engine = _create_async_engine(database_url, "async_main")
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+async_vector_engine = async_engine if shared_engine else _create_async_engine(vector_database_url, "async_vector")
+AsyncVectorSessionLocal = async_sessionmaker(async_vector_engine, class_=AsyncSession, expire_on_commit=False)
+
 Base = declarative_base()
 
 
+def init_vector_extension(bind):
+    """Enable the pgvector extension (no-op for non-PostgreSQL databases)"""
+    if bind.dialect.name != "postgresql":
+        return
+    with bind.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+
+
+def sync_schema(bind, metadata):
+    """Add columns and indexes that create_all() skips on tables that already exist"""
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+            if column.server_default is not None and isinstance(column.server_default.arg, str):
+                ddl += f" DEFAULT '{column.server_default.arg}'"
+            try:
+                with bind.begin() as conn:
+                    conn.execute(text(ddl))
+                print(f"✅ Added column {table.name}.{column.name}")
+            except Exception as e:
+                print(f"⚠️  Warning: could not add column {table.name}.{column.name}: {e}")
+        
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            try:
+                index.create(bind=bind, checkfirst=True)
+            except Exception as e:
+                print(f"⚠️  Warning: could not create index {index.name}: {e}")
+
+
 def get_db():
     """Dependency to get database session"""
     db = SessionLocal()
@@ -27,7 +193,7 @@ def get_db():
         db.close()
 
 
-def get_vector_db():
+def _get_vector_db():
     """Dependency to get vector database session"""
     db = VectorSessionLocal()
     try:
@@ -35,3 +201,41 @@ def get_vector_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    """Dependency to get async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def _get_async_vector_db():
+    """Dependency to get async vector database session"""
+    async with AsyncVectorSessionLocal() as db:
+        yield db
+
+
+# With a shared engine the vector dependencies are the main ones; FastAPI resolves a
+# dependency once per request, so an endpoint using both gets a single session/connection
+get_vector_db = get_db if shared_engine else _get_vector_db
+get_async_vector_db = get_async_db if shared_engine else _get_async_vector_db
+
+
+def pool_status() -> dict:
+    """Current occupancy and checkout-wait statistics of every instrumented pool"""
+    engines = {"main": engine, "vector": vector_engine, "async_main": async_engine, "async_vector": async_vector_engine}
+    status = {}
+    for name, bind in engines.items():
+        stats = pool_stats.get(name)
+        if stats is None:
+            continue
+        pool = bind.pool
+        status[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": stats.max_overflow,
+            "max_connections": stats.pool_size + stats.max_overflow,
+            "timeout_seconds": settings.db_pool_timeout,
+            **stats.snapshot(),
+        }
+    return status
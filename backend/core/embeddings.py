@@ -0,0 +1,446 @@
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from google.api_core import exceptions as google_exceptions
+from sqlalchemy import func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from core.config import settings
+from core.database import VectorSessionLocal
+from core.metrics import span
+from core.providers import provider
+from models.database import EmbeddingCacheEntry
+
+# Errors worth retrying: rate limiting and transient upstream failures
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+
+ProgressCallback = Callable[[int, int], None]
+
+
+CacheKey = Tuple[str, str]
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(content: str) -> str:
+    """Normalize text before hashing so trivially different copies share a cache entry"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", content)).strip()
+
+
+def text_hash(content: str) -> str:
+    """SHA-256 of the normalized text"""
+    return hashlib.sha256(normalize_text(content).encode("utf-8")).hexdigest()
+
+
+def cache_key(content: str, task_type: str) -> CacheKey:
+    """(model, normalized-text hash); the task type is part of the model key"""
+    return f"{settings.embedding_model}:{task_type}", text_hash(content)
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: in-memory LRU bounded by bytes, backed by the embedding_cache table
+
+    The table is capped at `max_rows`: every `max_rows // 20` inserts the least
+    recently read rows beyond the cap are deleted.
+    """
+
+    # Approximate per-entry overhead of the key tuple and OrderedDict node
+    ENTRY_OVERHEAD_BYTES = 200
+    # Rows read from the table again within this window keep their last_used_at (saves a write per lookup)
+    TOUCH_INTERVAL = timedelta(hours=1)
+
+    def __init__(self, max_bytes: int, persist: bool = True, max_rows: int = 0):
+        self.max_bytes = max_bytes
+        self.persist = persist
+        self.max_rows = max_rows
+        self.prune_every = max(1, max_rows // 20)
+        self._entries: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._inserted_since_prune = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db_evictions = 0
+
+    def _entry_size(self, vector: np.ndarray) -> int:
+        return vector.nbytes + self.ENTRY_OVERHEAD_BYTES
+
+    def _remember(self, key: CacheKey, vector: np.ndarray) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = vector
+            self._bytes += self._entry_size(vector)
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._entry_size(evicted)
+                self.evictions += 1
+
+    def _load_persisted(self, keys: Sequence[CacheKey]) -> Dict[CacheKey, np.ndarray]:
+        if not self.persist or not keys:
+            return {}
+        found = {}
+        db = VectorSessionLocal()
+        try:
+            by_model: Dict[str, List[str]] = {}
+            for model, text_hash in keys:
+                by_model.setdefault(model, []).append(text_hash)
+            for model, hashes in by_model.items():
+                rows = db.query(EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.embedding).filter(
+                    EmbeddingCacheEntry.model == model,
+                    EmbeddingCacheEntry.text_hash.in_(hashes)
+                ).all()
+                for row in rows:
+                    found[(model, row.text_hash)] = np.asarray(row.embedding, dtype=np.float32)
+                if rows:
+                    self._touch(db, model, [row.text_hash for row in rows])
+        except Exception as e:
+            print(f"Error reading embedding cache: {e}")
+        finally:
+            db.close()
+        return found
+
+    def _touch(self, db, model: str, hashes: List[str]) -> None:
+        """Mark rows as used now, skipping those already marked within TOUCH_INTERVAL"""
+        now = datetime.now(timezone.utc)
+        db.query(EmbeddingCacheEntry).filter(
+            EmbeddingCacheEntry.model == model,
+            EmbeddingCacheEntry.text_hash.in_(hashes),
+            or_(EmbeddingCacheEntry.last_used_at.is_(None), EmbeddingCacheEntry.last_used_at < now - self.TOUCH_INTERVAL)
+        ).update({"last_used_at": now}, synchronize_session=False)
+        db.commit()
+
+    def _prune_persisted(self, db) -> int:
+        """Delete the least recently used rows beyond max_rows; returns the number deleted"""
+        excess = db.query(func.count()).select_from(EmbeddingCacheEntry).scalar() - self.max_rows
+        if excess <= 0:
+            return 0
+        # Rows never read since the column was added go first; the key breaks ties within a batch
+        stale = db.query(EmbeddingCacheEntry.model, EmbeddingCacheEntry.text_hash).order_by(
+            EmbeddingCacheEntry.last_used_at.asc().nullsfirst(),
+            EmbeddingCacheEntry.model,
+            EmbeddingCacheEntry.text_hash
+        ).limit(excess).all()
+        by_model: Dict[str, List[str]] = {}
+        for model, text_hash in stale:
+            by_model.setdefault(model, []).append(text_hash)
+        deleted = 0
+        for model, hashes in by_model.items():
+            for start in range(0, len(hashes), 1000):
+                deleted += db.query(EmbeddingCacheEntry).filter(
+                    EmbeddingCacheEntry.model == model,
+                    EmbeddingCacheEntry.text_hash.in_(hashes[start:start + 1000])
+                ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def _store_persisted(self, items: Dict[CacheKey, np.ndarray]) -> None:
+        if not self.persist or not items:
+            return
+        db = VectorSessionLocal()
+        try:
+            now = datetime.now(timezone.utc)
+            rows = [
+                {"model": model, "text_hash": text_hash, "embedding": vector, "last_used_at": now}
+                for (model, text_hash), vector in items.items()
+            ]
+            dialect = db.bind.dialect.name
+            if dialect == "postgresql":
+                stmt = postgresql.insert(EmbeddingCacheEntry).on_conflict_do_nothing()
+            elif dialect == "sqlite":
+                stmt = sqlite.insert(EmbeddingCacheEntry).on_conflict_do_nothing()
+            else:
+                stmt = EmbeddingCacheEntry.__table__.insert()
+            db.execute(stmt, rows)
+            db.commit()
+            
+            with self._lock:
+                self._inserted_since_prune += len(rows)
+                prune = self.max_rows > 0 and self._inserted_since_prune >= self.prune_every
+                if prune:
+                    self._inserted_since_prune = 0
+            if prune:
+                deleted = self._prune_persisted(db)
+                with self._lock:
+                    self.db_evictions += deleted
+        except Exception as e:
+            db.rollback()
+            print(f"Error writing embedding cache: {e}")
+        finally:
+            db.close()
+
+    def get_many(self, keys: Sequence[CacheKey]) -> Dict[CacheKey, np.ndarray]:
+        """Look keys up in memory, then in the persistent table; missing keys are absent from the result"""
+        found = {}
+        pending = []
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+                    self.memory_hits += 1
+                else:
+                    pending.append(key)
+
+        persisted = self._load_persisted(pending)
+        for key, vector in persisted.items():
+            self._remember(key, vector)
+        found.update(persisted)
+        with self._lock:
+            self.db_hits += len(persisted)
+            self.misses += len(pending) - len(persisted)
+        return found
+
+    def put_many(self, items: Dict[CacheKey, np.ndarray]) -> None:
+        for key, vector in items.items():
+            self._remember(key, vector)
+        self._store_persisted(items)
+
+    def get_cached(self, key: CacheKey) -> Optional[np.ndarray]:
+        """Memory-tier lookup only; never touches the database"""
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+            return vector
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "db_evictions": self.db_evictions,
+                "hit_rate": (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            }
+
+
+embedding_cache = EmbeddingCache(
+    max_bytes=int(settings.embedding_cache_max_mb * 1024 * 1024),
+    persist=settings.embedding_cache_persist,
+    max_rows=settings.embedding_cache_max_rows
+)
+
+
+class RateLimiter:
+    """Token bucket limiting request starts to `rate_per_minute`
+
+    Callers reserve a start time under a thread lock and then sleep until it,
+    so one limiter can be shared by the request path and the ingestion
+    workers, which each run their own event loop in a separate thread.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(self.rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take the next token, borrowing against future refills; returns seconds to wait before using it"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_blocking(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# One provider quota per process: shared by queries, ingestion workers and scripts
+embedding_rate_limiter = RateLimiter(settings.embedding_requests_per_minute, burst=settings.embedding_concurrency)
+
+
+def embed_batch(texts: Sequence[str], task_type: str = "retrieval_document") -> List[List[float]]:
+    """Embed a batch of texts with a single provider batch request (uncached)"""
+    return provider.embed(texts, task_type)
+
+
+def get_embeddings(content: str, task_type: str = "retrieval_query") -> list:
+    """Get an embedding for a single text through the cache"""
+    try:
+        with span("embedding"):
+            key = cache_key(content, task_type)
+            cached = embedding_cache.get_many([key])
+            if key in cached:
+                return cached[key].tolist()
+            
+            embedding_rate_limiter.acquire_blocking()
+            embedding = provider.embed([content], task_type)[0]
+            embedding_cache.put_many({key: np.asarray(embedding, dtype=np.float32)})
+            return embedding
+    except Exception as e:
+        print(f"Error getting embeddings: {e}")
+        return []
+
+
+async def aget_embeddings(content: str, task_type: str = "retrieval_query") -> list:
+    """Async variant of get_embeddings() for the request path"""
+    try:
+        with span("embedding"):
+            key = cache_key(content, task_type)
+            vector = embedding_cache.get_cached(key)
+            if vector is not None:
+                return vector.tolist()
+            
+            cached = await asyncio.to_thread(embedding_cache.get_many, [key])
+            if key in cached:
+                return cached[key].tolist()
+            
+            await embedding_rate_limiter.acquire()
+            embedding = (await provider.aembed([content], task_type))[0]
+            await asyncio.to_thread(
+                embedding_cache.put_many, {key: np.asarray(embedding, dtype=np.float32)}
+            )
+            return embedding
+    except Exception as e:
+        print(f"Error getting embeddings: {e}")
+        return []
+
+
+class EmbeddingPipeline:
+    """Embed many texts in batches with bounded concurrency, retries and progress reporting"""
+
+    def __init__(
+        self,
+        batch_size: int = settings.embedding_batch_size,
+        concurrency: int = settings.embedding_concurrency,
+        max_retries: int = settings.embedding_max_retries,
+        limiter: Optional[RateLimiter] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        skip_failed_batches: bool = False,
+    ):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.limiter = limiter or embedding_rate_limiter
+        self.on_progress = on_progress
+        # When set, a batch that still fails after retries yields None embeddings instead of aborting
+        self.skip_failed_batches = skip_failed_batches
+
+    async def _embed_with_retry(self, texts: Sequence[str], task_type: str) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            try:
+                # The Gemini client is blocking; keep the event loop free
+                return await asyncio.to_thread(embed_batch, texts, task_type)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                # Exponential backoff with full jitter
+                delay = random.uniform(0, min(60.0, 2 ** attempt))
+                print(f"Embedding batch failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def embed(self, texts: Sequence[str], task_type: str = "retrieval_document") -> List[Optional[List[float]]]:
+        """Return embeddings for `texts`, in order; only cache misses hit the API"""
+        if not texts:
+            return []
+
+        keys = [cache_key(content, task_type) for content in texts]
+        vectors = await asyncio.to_thread(embedding_cache.get_many, list(set(keys)))
+
+        # Embed each distinct missing text once
+        missing: Dict[CacheKey, str] = {}
+        occurrences: Dict[CacheKey, int] = {}
+        for key, content in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, content)
+                occurrences[key] = occurrences.get(key, 0) + 1
+        cached = len(texts) - sum(occurrences.values())
+        if self.on_progress:
+            self.on_progress(cached, len(texts))
+
+        if missing:
+            weights = [occurrences[key] for key in missing]
+            embedded = await self._embed_uncached(list(missing.values()), weights, task_type, cached, len(texts))
+            fresh = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(missing, embedded)
+                if vector is not None
+            }
+            await asyncio.to_thread(embedding_cache.put_many, fresh)
+            vectors.update(fresh)
+
+        return [vectors[key].tolist() if key in vectors else None for key in keys]
+
+    async def _embed_uncached(
+        self,
+        texts: Sequence[str],
+        weights: Sequence[int],
+        task_type: str,
+        done: int,
+        total: int,
+    ) -> List[List[float]]:
+        """Embed texts through the API; `weights` counts how many input texts each one stands for"""
+        batches = [
+            (texts[i:i + self.batch_size], sum(weights[i:i + self.batch_size]))
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        results: List[Optional[List[List[float]]]] = [None] * len(batches)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(index: int, batch: Sequence[str], weight: int) -> None:
+            nonlocal done
+            async with semaphore:
+                try:
+                    results[index] = await self._embed_with_retry(batch, task_type)
+                except Exception as e:
+                    if not self.skip_failed_batches:
+                        raise
+                    print(f"Skipping embedding batch of {len(batch)} texts: {e}")
+                    results[index] = [None] * len(batch)
+            done += weight
+            if self.on_progress:
+                self.on_progress(done, total)
+
+        tasks = [asyncio.create_task(run(i, batch, weight)) for i, (batch, weight) in enumerate(batches)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return [embedding for batch in results for embedding in batch]
@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Optional
+
+from core.database import SessionLocal
+from models.database import ChatMessage
+
+EXPORT_BATCH_ROWS = 1000
+EXPORT_COLUMNS = ("id", "session_id", "role", "content", "created_at")
+
+
+def _iter_rows(since: Optional[datetime], until: Optional[datetime], session_id: Optional[str]):
+    """Stream chat message rows oldest first through a server-side cursor
+
+    Uses its own session: the response body is produced after the request's
+    dependencies have been closed.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(*(getattr(ChatMessage, column) for column in EXPORT_COLUMNS))
+        if since:
+            query = query.filter(ChatMessage.created_at >= since)
+        if until:
+            query = query.filter(ChatMessage.created_at < until)
+        if session_id:
+            query = query.filter(ChatMessage.session_id == session_id)
+        # yield_per turns on stream_results: a named cursor on PostgreSQL, so rows
+        # arrive in batches instead of being buffered by the driver
+        query = query.order_by(ChatMessage.created_at, ChatMessage.id).yield_per(EXPORT_BATCH_ROWS)
+        yield from query
+    finally:
+        db.close()
+
+
+def export_ndjson(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    session_id: Optional[str] = None
+) -> Iterator[str]:
+    buffer = []
+    for row in _iter_rows(since, until, session_id):
+        record = dict(zip(EXPORT_COLUMNS, row))
+        record["created_at"] = record["created_at"].isoformat() if record["created_at"] else None
+        buffer.append(json.dumps(record, ensure_ascii=False))
+        if len(buffer) >= EXPORT_BATCH_ROWS:
+            yield "\n".join(buffer) + "\n"
+            buffer = []
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+
+def export_csv(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    session_id: Optional[str] = None
+) -> Iterator[str]:
+    buffer = io.StringIO()
+    buffer.write("\ufeff")  # BOM so spreadsheet tools read the Korean text as UTF-8
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    rows = 0
+    for row in _iter_rows(since, until, session_id):
+        writer.writerow(row[:-1] + (row[-1].isoformat() if row[-1] else "",))
+        rows += 1
+        if rows % EXPORT_BATCH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,344 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy import update
+
+from core.config import settings
+from core.database import SessionLocal, VectorSessionLocal
+from core.embeddings import EmbeddingPipeline, text_hash
+from core.retrieval import get_retrieval_backend
+from core.lexical import lexical_index
+from core.pdf import PageText, count_pdf_pages, iter_pdf_pages, shutdown_executor
+from core.chunking import Chunk, chunk_document
+from core.chunk_writer import write_chunks
+from core.corpus import corpus_version
+from core.metrics import span, timed_iter
+from models.database import IndexedDocument, DocumentChunk
+
+UPLOAD_READ_SIZE = 1024 * 1024
+PROGRESS_WRITE_INTERVAL = 1.0
+
+
+class IngestionCancelled(Exception):
+    """Raised inside a job when the queue is shutting down"""
+
+
+async def store_upload(file: UploadFile) -> Tuple[str, str]:
+    """Stream an upload to the upload directory; returns (path, SHA-256 of the file)"""
+    os.makedirs(settings.upload_dir, exist_ok=True)
+    path = os.path.join(settings.upload_dir, f"{uuid.uuid4().hex}.pdf")
+    digest = hashlib.sha256()
+    with open(path, "wb") as out:
+        while True:
+            block = await file.read(UPLOAD_READ_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            out.write(block)
+    return path, digest.hexdigest()
+
+
+def remove_upload(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class IngestionQueue:
+    """Background PDF indexing backed by the IndexedDocument.status lifecycle
+
+    queued -> indexing -> ready | error. The queue itself is just the set of
+    'queued' rows plus their stored files, so jobs survive restarts: start()
+    re-enqueues them, along with 'indexing' rows whose worker stopped
+    reporting progress.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stopping = threading.Event()
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest")
+        for document_id in self._recover_pending():
+            self.submit(document_id)
+
+    def shutdown(self) -> None:
+        """Stop workers; unfinished jobs go back to 'queued' and resume on next start"""
+        self._stopping.set()
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        shutdown_executor()
+
+    def submit(self, document_id: int) -> None:
+        if self._executor is None:
+            raise RuntimeError("Ingestion queue is not running")
+        self._executor.submit(self._run, document_id)
+
+    def _recover_pending(self) -> List[int]:
+        db = SessionLocal()
+        try:
+            stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.ingestion_stale_seconds)
+            db.query(IndexedDocument).filter(
+                IndexedDocument.status == 'indexing',
+                IndexedDocument.updated_at < stale_before
+            ).update({"status": 'queued'}, synchronize_session=False)
+            db.commit()
+
+            pending = db.query(IndexedDocument.id).filter(
+                IndexedDocument.status == 'queued'
+            ).order_by(IndexedDocument.id).all()
+            if pending:
+                print(f"🔄 Resuming {len(pending)} queued document(s)")
+            return [row.id for row in pending]
+        except Exception as e:
+            print(f"Error recovering ingestion jobs: {e}")
+            return []
+        finally:
+            db.close()
+
+    def _claim(self, db, document_id: int) -> bool:
+        """Atomically move a document from 'queued' to 'indexing'"""
+        claimed = db.query(IndexedDocument).filter(
+            IndexedDocument.id == document_id,
+            IndexedDocument.status == 'queued'
+        ).update({"status": 'indexing'}, synchronize_session=False)
+        db.commit()
+        return claimed == 1
+
+    def _run(self, document_id: int) -> None:
+        db = SessionLocal()
+        vector_db = VectorSessionLocal()
+        try:
+            if not self._claim(db, document_id):
+                return
+            document = db.query(IndexedDocument).filter(IndexedDocument.id == document_id).first()
+            self._process(db, vector_db, document)
+        except IngestionCancelled:
+            db.rollback()
+            db.query(IndexedDocument).filter(IndexedDocument.id == document_id).update(
+                {"status": 'queued'}, synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            print(f"Error indexing document {document_id}: {e}")
+            db.rollback()
+            db.query(IndexedDocument).filter(IndexedDocument.id == document_id).update(
+                {"status": 'error', "error_message": str(e)[:1000]}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            vector_db.close()
+            db.close()
+
+    def _progress_writer(self, db, document: IndexedDocument):
+        """Return a callback that records progress at most once per interval"""
+        last_write = 0.0
+
+        def update(force: bool = False, **fields) -> None:
+            nonlocal last_write
+            if self._stopping.is_set():
+                raise IngestionCancelled()
+            for name, value in fields.items():
+                setattr(document, name, value)
+            now = time.monotonic()
+            if force or now - last_write >= PROGRESS_WRITE_INTERVAL:
+                db.commit()
+                last_write = now
+
+        return update
+
+    def _existing_chunks(self, vector_db, document_id: int) -> Dict[str, List[int]]:
+        """Map content hash -> chunk ids already stored for the document"""
+        existing: Dict[str, List[int]] = {}
+        rows = vector_db.query(DocumentChunk.id, DocumentChunk.content_hash).filter(
+            DocumentChunk.document_id == document_id
+        ).all()
+        unhashed = [row.id for row in rows if row.content_hash is None]
+        for row in rows:
+            if row.content_hash is not None:
+                existing.setdefault(row.content_hash, []).append(row.id)
+
+        # Chunks stored before hashing was introduced: hash their content once
+        for start in range(0, len(unhashed), settings.chunk_write_batch_size):
+            legacy = vector_db.query(DocumentChunk.id, DocumentChunk.content).filter(
+                DocumentChunk.id.in_(unhashed[start:start + settings.chunk_write_batch_size])
+            ).all()
+            for row in legacy:
+                existing.setdefault(text_hash(row.content), []).append(row.id)
+        return existing
+
+    def _delete_chunks(self, vector_db, document_id: int, chunk_ids: List[int]) -> None:
+        for start in range(0, len(chunk_ids), settings.chunk_write_batch_size):
+            vector_db.query(DocumentChunk).filter(
+                DocumentChunk.id.in_(chunk_ids[start:start + settings.chunk_write_batch_size])
+            ).delete(synchronize_session=False)
+            vector_db.commit()
+        get_retrieval_backend(vector_db).remove_chunks(document_id, chunk_ids)
+        lexical_index.remove_chunks(document_id, chunk_ids)
+
+    def _process(self, db, vector_db, document: IndexedDocument) -> None:
+        progress = self._progress_writer(db, document)
+        document.error_message = None
+        page_count = count_pdf_pages(document.file_path)
+        progress(
+            force=True,
+            pages_total=page_count,
+            pages_parsed=0,
+            chunks_total=0,
+            chunks_embedded=0,
+            chunks_reused=0,
+            chunks_failed=0
+        )
+
+        def tracked_pages() -> Iterator[PageText]:
+            pages = iter_pdf_pages(document.file_path, page_count)
+            for page_number, text in timed_iter(pages, "pdf_extract"):
+                yield page_number, text
+                progress(pages_parsed=page_number)
+
+        # Chunks of the previous version; whatever is not matched again is dropped at the end
+        previous = self._existing_chunks(vector_db, document.id)
+        inserted: List[int] = []
+        counts = {"produced": 0, "embedded": 0, "reused": 0, "failed": 0}
+
+        try:
+            # Pages stream from the extractor into the chunker; chunks are embedded
+            # and written one window at a time so memory stays flat for long PDFs.
+            # Chunking is timed without the extraction it waits on.
+            chunks = timed_iter(chunk_document(tracked_pages()), "chunking", exclusive=True)
+            for window in batched(chunks, settings.ingestion_window_chunks):
+                counts["produced"] += len(window)
+                progress(chunks_total=counts["produced"])
+                self._index_window(vector_db, document, window, previous, inserted, counts, progress)
+
+            if not counts["produced"]:
+                # Scanned or empty PDFs yield no text; never replace a working version with nothing
+                kept = " (previous version kept)" if previous else ""
+                raise ValueError(f"No text could be extracted from the PDF{kept}")
+            if not (counts["embedded"] or counts["reused"]):
+                raise ValueError("Failed to embed any chunk")
+
+            removed = [chunk_id for chunk_ids in previous.values() for chunk_id in chunk_ids]
+            self._delete_chunks(vector_db, document.id, removed)
+        except BaseException:
+            # Keep the previous version intact; drop only what this run inserted
+            vector_db.rollback()
+            self._delete_chunks(vector_db, document.id, inserted)
+            if inserted:
+                corpus_version.bump(f"rolled back {document.file_name}")
+            raise
+
+        corpus_version.bump(f"indexed {document.file_name}")
+
+        # Update document status
+        remove_upload(document.file_path)
+        document.file_path = None
+        failed = counts["failed"]
+        progress(
+            force=True,
+            status='ready',
+            chunks_total=counts["produced"],
+            chunks_embedded=counts["embedded"],
+            chunks_reused=counts["reused"],
+            chunks_failed=failed,
+            error_message=f"{failed} chunk(s) could not be embedded" if failed else None
+        )
+        print(
+            f"✅ Indexed {document.file_name}: {counts['embedded']} new, {counts['reused']} unchanged, "
+            f"{len(removed)} removed, {failed} failed chunks"
+        )
+
+    def _index_window(
+        self,
+        vector_db,
+        document: IndexedDocument,
+        window: List[Chunk],
+        previous: Dict[str, List[int]],
+        inserted: List[int],
+        counts: Dict[str, int],
+        progress,
+    ) -> None:
+        """Store one window of chunks: reuse unchanged ones, embed and insert the rest"""
+        hashes = [text_hash(chunk.content) for chunk in window]
+
+        # Unchanged chunks keep their row and embedding; only position metadata is refreshed
+        kept = []
+        changed = []
+        for chunk, content_hash in zip(window, hashes):
+            if previous.get(content_hash):
+                kept.append({
+                    "id": previous[content_hash].pop(),
+                    "page_number": chunk.page_number,
+                    "clause_id": chunk.clause_id,
+                    "char_start": chunk.char_start,
+                    "char_end": chunk.char_end,
+                })
+            else:
+                changed.append((chunk, content_hash))
+        if kept:
+            with span("chunk_write"):
+                vector_db.execute(update(DocumentChunk), kept)
+                vector_db.commit()
+            counts["reused"] += len(kept)
+
+        # Embed chunks in concurrent batches; a failing batch is skipped, not fatal
+        embedded_before = counts["embedded"]
+        pipeline = EmbeddingPipeline(
+            on_progress=lambda done, total: progress(chunks_embedded=embedded_before + done),
+            skip_failed_batches=True
+        )
+        with span("embedding_batch"):
+            embeddings = asyncio.run(pipeline.embed([chunk.content for chunk, _ in changed]))
+
+        # Bulk write chunk rows (COPY on PostgreSQL), committed per batch
+        rows = []
+        new_embeddings = []
+        for (chunk, content_hash), embedding in zip(changed, embeddings):
+            if embedding is None:
+                continue
+            rows.append({
+                "document_id": document.id,
+                "content": chunk.content,
+                "content_hash": content_hash,
+                "embedding": embedding,
+                "page_number": chunk.page_number,
+                "clause_id": chunk.clause_id,
+                "char_start": chunk.char_start,
+                "char_end": chunk.char_end,
+            })
+            new_embeddings.append(embedding)
+
+        with span("chunk_write"):
+            chunk_ids = write_chunks(vector_db, rows)
+        inserted.extend(chunk_ids)
+        get_retrieval_backend(vector_db).add_chunks(document.id, chunk_ids, new_embeddings)
+        lexical_index.add_chunks(document.id, chunk_ids, [row["content"] for row in rows])
+
+        counts["embedded"] += len(rows)
+        counts["failed"] += len(changed) - len(rows)
+        progress(
+            force=True,
+            chunks_embedded=counts["embedded"],
+            chunks_reused=counts["reused"],
+            chunks_failed=counts["failed"]
+        )
+
+
+ingestion_queue = IngestionQueue(workers=settings.ingestion_workers)
@@ -0,0 +1,253 @@
+import asyncio
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.database import VectorSessionLocal
+from core.embeddings import normalize_text
+from models.database import DocumentChunk
+
+# Hangul runs and ASCII alphanumeric runs ("C73", "2024", "CI"); everything else separates tokens
+WORD = re.compile(r"[가-힣]+|[A-Za-z0-9]+")
+HANGUL_START = re.compile(r"[가-힣]")
+
+
+def tokenize(content: str) -> List[str]:
+    """Korean-aware tokens: the first syllable plus syllable bigrams of each Hangul word, lowercased ASCII words
+
+    Particles and endings attach to Korean nouns ("암진단금은"), so whole
+    words rarely match between a question and a clause. Bigrams ("암진",
+    "진단", "단금", "금은") match across inflections and compounds, and the
+    word-initial syllable keeps one-syllable nouns such as "암" searchable.
+    """
+    tokens = []
+    for match in WORD.finditer(normalize_text(content)):
+        word = match.group()
+        if HANGUL_START.match(word):
+            tokens.append(word[0])
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word.lower())
+    return tokens
+
+
+class LexicalIndex:
+    """In-process BM25 inverted index over DocumentChunk.content
+
+    Kept in sync with document_chunks the same way as the NumPy vector index:
+    ingestion reports inserted/deleted chunks directly, and a periodic check
+    of the row count and max id picks up changes made by other processes
+    (appending new rows, rebuilding after deletes).
+
+    Queries are scored with NumPy over per-term posting arrays, accumulated in
+    a dense array indexed by each chunk's slot (slots of removed chunks are
+    reused). The arrays are built on first use and replaced (never modified)
+    when a term's postings change, so a query snapshots them under the lock
+    and scores outside it.
+    Single-syllable terms found in more than `syllable_max_df` of the chunks
+    are skipped: their postings span most of the corpus and barely move the
+    ranking.
+    """
+
+    LOAD_BATCH_SIZE = 2000
+
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        refresh_interval: float = 30.0,
+        syllable_max_df: float = 0.1,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.refresh_interval = refresh_interval
+        self.syllable_max_df = syllable_max_df
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, int]] = {}  # term -> {chunk id: term frequency}
+        # term -> (slots, chunk ids, term frequencies, chunk lengths), built lazily from _postings
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._slots: Dict[int, int] = {}  # chunk id -> dense slot
+        self._free_slots: List[int] = []
+        self._slot_count = 0
+        self._terms: Dict[int, Tuple[str, ...]] = {}  # chunk id -> distinct terms, for removal
+        self._lengths: Dict[int, int] = {}
+        self._document_ids: Dict[int, int] = {}
+        self._total_length = 0
+        self._max_id = 0
+        self._loaded = False
+        self._last_sync = 0.0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    # -- building ---------------------------------------------------------
+
+    def _add(self, chunk_id: int, document_id: int, content: str) -> None:
+        if chunk_id in self._lengths:
+            self._remove(chunk_id)
+        counts = Counter(tokenize(content))
+        if self._free_slots:
+            self._slots[chunk_id] = self._free_slots.pop()
+        else:
+            self._slots[chunk_id] = self._slot_count
+            self._slot_count += 1
+        for term, frequency in counts.items():
+            self._postings.setdefault(term, {})[chunk_id] = frequency
+            self._arrays.pop(term, None)
+        self._terms[chunk_id] = tuple(counts)
+        length = sum(counts.values())
+        self._lengths[chunk_id] = length
+        self._document_ids[chunk_id] = document_id
+        self._total_length += length
+        self._max_id = max(self._max_id, chunk_id)
+
+    def _remove(self, chunk_id: int) -> None:
+        for term in self._terms.pop(chunk_id, ()):
+            self._arrays.pop(term, None)
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(chunk_id, 0)
+        self._document_ids.pop(chunk_id, None)
+        slot = self._slots.pop(chunk_id, None)
+        if slot is not None:
+            self._free_slots.append(slot)
+
+    def _load_rows(self, db: Session, after_id: int = 0) -> None:
+        query = db.query(
+            DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.content
+        ).filter(DocumentChunk.id > after_id).order_by(DocumentChunk.id)
+        for row in query.yield_per(self.LOAD_BATCH_SIZE):
+            self._add(row.id, row.document_id, row.content)
+
+    def _rebuild(self, db: Session) -> None:
+        self._postings, self._terms, self._lengths, self._document_ids = {}, {}, {}, {}
+        self._arrays, self._slots, self._free_slots, self._slot_count = {}, {}, [], 0
+        self._total_length = 0
+        self._max_id = 0
+        self._load_rows(db)
+
+    def _sync(self, db: Session, force: bool = False) -> None:
+        """Bring the index up to date with document_chunks"""
+        now = time.monotonic()
+        if not force and self._loaded and now - self._last_sync < self.refresh_interval:
+            return
+
+        with self._lock:
+            if not self._loaded:
+                self._rebuild(db)
+                self._loaded = True
+
+            count, max_id = db.query(func.count(DocumentChunk.id), func.max(DocumentChunk.id)).one()
+            if (max_id or 0) > self._max_id:
+                self._load_rows(db, after_id=self._max_id)
+            if (count or 0) != len(self._lengths):
+                self._rebuild(db)
+            self._last_sync = now
+
+    def warm_up(self, db: Session) -> None:
+        self._sync(db, force=True)
+        print(f"✅ Lexical index loaded ({len(self)} chunks, {len(self._postings)} terms)")
+
+    def add_chunks(self, document_id: int, chunk_ids: Sequence[int], contents: Sequence[str]) -> None:
+        if not self._loaded:
+            return
+        with self._lock:
+            for chunk_id, content in zip(chunk_ids, contents):
+                self._add(chunk_id, document_id, content)
+
+    def remove_document(self, document_id: int) -> None:
+        if not self._loaded:
+            return
+        with self._lock:
+            for chunk_id in [cid for cid, did in self._document_ids.items() if did == document_id]:
+                self._remove(chunk_id)
+
+    def remove_chunks(self, document_id: int, chunk_ids: Sequence[int]) -> None:
+        if not self._loaded:
+            return
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._remove(chunk_id)
+
+    # -- search -----------------------------------------------------------
+
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Posting arrays of a term; call with the lock held"""
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            size = len(postings)
+            arrays = (
+                np.fromiter((self._slots[chunk_id] for chunk_id in postings), dtype=np.int64, count=size),
+                np.fromiter(postings.keys(), dtype=np.int64, count=size),
+                np.fromiter(postings.values(), dtype=np.float64, count=size),
+                np.fromiter((self._lengths[chunk_id] for chunk_id in postings), dtype=np.float64, count=size),
+            )
+            self._arrays[term] = arrays
+        return arrays
+
+    def top_k(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        """Return (chunk_id, BM25 score) of the best matching chunks, best first"""
+        terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._lengths)
+            if not count or not terms or limit <= 0:
+                return []
+            average_length = self._total_length / count
+            slot_count = self._slot_count
+            max_syllable_postings = self.syllable_max_df * count
+            postings = [
+                self._term_arrays(term) for term in terms
+                if term in self._postings
+                and (len(term) > 1 or len(self._postings[term]) <= max_syllable_postings)
+            ]
+        if not postings:
+            return []
+
+        scores = np.zeros(slot_count)
+        chunk_ids = np.zeros(slot_count, dtype=np.int64)
+        for slots, ids, frequencies, lengths in postings:
+            idf = math.log(1 + (count - len(slots) + 0.5) / (len(slots) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths / average_length)
+            scores[slots] += idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+            chunk_ids[slots] = ids
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        best = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(chunk_ids[slot]), float(scores[slot])) for slot in best]
+
+    def search(self, db: Session, query: str, limit: int) -> List[Tuple[int, float]]:
+        self._sync(db)
+        return self.top_k(query, limit)
+
+    async def asearch(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        """Search in a worker thread with its own session, so it can run alongside the vector search"""
+        def run():
+            db = VectorSessionLocal()
+            try:
+                return self.search(db, query, limit)
+            finally:
+                db.close()
+
+        return await asyncio.to_thread(run)
+
+
+lexical_index = LexicalIndex(
+    k1=settings.bm25_k1,
+    b=settings.bm25_b,
+    syllable_max_df=settings.bm25_syllable_max_df,
+    refresh_interval=settings.vector_index_refresh_seconds
+)
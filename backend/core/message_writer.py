@@ -0,0 +1,132 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from core.config import settings
+from core.database import AsyncSessionLocal
+from core.metrics import span
+from models.database import ChatMessage
+
+FLUSH_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 0.5  # doubled after each failed attempt
+
+
+class ChatMessageWriter:
+    """Write-behind buffer for ChatMessage rows
+
+    /chat hands messages to add() and moves on; a background task inserts
+    them in multi-row batches when `batch_size` messages are pending or
+    `flush_interval` seconds after the first one arrived, whichever comes
+    first. add() returns a future resolving to the row id once the batch is
+    committed (None if it could not be written). shutdown() drains everything
+    still buffered.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_pending: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.written = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self) -> None:
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        print(f"✅ Chat message buffer drained ({self.written} written, {self.failed} failed)")
+
+    async def add(self, session_id: str, role: str, content: str) -> asyncio.Future:
+        row = {
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            # Stamped on arrival: rows of one batch must not share the flush time
+            "created_at": datetime.now(timezone.utc),
+        }
+        future = asyncio.get_running_loop().create_future()
+        if self._task is None:
+            # Not running (e.g. outside the app lifespan): write through
+            await self._flush([(row, future)])
+        else:
+            # Blocks only when max_pending messages are already waiting
+            await self._queue.put((row, future))
+        return future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+        # Drain whatever arrived after the shutdown marker
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[start:start + self.batch_size])
+
+    async def _flush(self, batch: List[Tuple[dict, asyncio.Future]]) -> None:
+        rows = [row for row, _ in batch]
+        for attempt in range(FLUSH_RETRIES):
+            try:
+                with span("message_flush"):
+                    async with AsyncSessionLocal() as db:
+                        result = await db.execute(
+                            insert(ChatMessage).returning(ChatMessage.id, sort_by_parameter_order=True),
+                            rows
+                        )
+                        ids = result.scalars().all()
+                        await db.commit()
+                break
+            except Exception as e:
+                if attempt == FLUSH_RETRIES - 1:
+                    print(f"Error writing {len(rows)} chat message(s): {e}")
+                    self.failed += len(rows)
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_result(None)
+                    return
+                await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+        self.flushes += 1
+        self.written += len(rows)
+        for (_, future), message_id in zip(batch, ids):
+            if not future.done():
+                future.set_result(message_id)
+
+
+message_writer = ChatMessageWriter(
+    batch_size=settings.message_write_batch_size,
+    flush_interval=settings.message_flush_interval_seconds,
+    max_pending=settings.message_write_max_pending
+)
@@ -0,0 +1,64 @@
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import text, tuple_
+from sqlalchemy.orm import Query
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(query: Query, model, size: int, cursor: Optional[str] = None) -> Tuple[List, Optional[str]]:
+    """Newest-first page of `query` after `cursor`, ordered by (created_at, id)
+
+    Uses the (created_at, id) index to seek directly to the cursor, so the
+    cost of a page does not grow with its depth the way OFFSET does.
+    Returns the rows and the cursor of the next page (None on the last page).
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(size + 1).all()
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def estimate_count(query: Query, model, exact: bool = False) -> Tuple[int, bool]:
+    """Row count of `query`; returns (count, is_estimate)
+
+    For an unfiltered query on PostgreSQL the planner statistic
+    pg_class.reltuples is read instead of scanning the table (summed over
+    partitions for a partitioned table). Filtered queries, tables that were
+    never analyzed (reltuples < 0) and other databases are counted exactly.
+    """
+    db = query.session
+    if not exact and query.whereclause is None and db.bind.dialect.name == "postgresql":
+        estimate = db.execute(
+            text("""
+                SELECT CASE WHEN c.relkind = 'p' THEN (
+                    SELECT sum(GREATEST(p.reltuples, 0))::bigint
+                    FROM pg_inherits i JOIN pg_class p ON p.oid = i.inhrelid
+                    WHERE i.inhparent = c.oid
+                ) ELSE c.reltuples::bigint END
+                FROM pg_class c WHERE c.oid = to_regclass(:table)
+            """),
+            {"table": model.__tablename__}
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return int(estimate), True
+    return query.order_by(None).count(), False
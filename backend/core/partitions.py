@@ -0,0 +1,221 @@
+import asyncio
+import gzip
+import json
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from core.config import settings
+from models.database import ChatMessage
+
+TABLE = ChatMessage.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})(\d{{2}})$")
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    relkind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": TABLE}
+    ).scalar()
+    return relkind == "p"
+
+
+def create_partitioned_table(conn: Connection) -> None:
+    """Create chat_messages range-partitioned by month on created_at, with a default partition
+
+    The primary key has to include the partition key, so it is (id, created_at);
+    ids still come from the chat_messages_id_seq sequence and stay unique.
+    """
+    conn.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {TABLE}_id_seq"))
+    conn.execute(text(f"""
+        CREATE TABLE {TABLE} (
+            id INTEGER NOT NULL DEFAULT nextval('{TABLE}_id_seq'),
+            session_id VARCHAR(255) NOT NULL,
+            role VARCHAR(10) NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """))
+    conn.execute(text(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id"))
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+    for index in ChatMessage.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _create_partition(conn: Connection, month: date) -> None:
+    """Create the partition for `month`, taking over that month's rows from the default partition
+
+    PostgreSQL refuses to create a partition while the default partition
+    holds rows in its range, so those rows are moved into a standalone table
+    that is then attached.
+    """
+    name = partition_name(month)
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    has_default = conn.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar() is not None
+    if not has_default:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES {bounds}"))
+        return
+
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)"))
+    moved = conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION}
+            WHERE created_at >= :start AND created_at < :end
+            RETURNING id, session_id, role, content, created_at
+        )
+        INSERT INTO {name} (id, session_id, role, content, created_at)
+        SELECT id, session_id, role, content, created_at FROM moved
+    """), {"start": month, "end": add_months(month, 1)}).rowcount
+    conn.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    if moved:
+        print(f"🔀 Moved {moved} chat messages from {DEFAULT_PARTITION} into {name}")
+
+
+def ensure_partitions(conn: Connection, first_month: date, last_month: date) -> int:
+    """Create the monthly partitions from first_month to last_month (inclusive) that are missing"""
+    created = 0
+    month = month_start(first_month)
+    while month <= last_month:
+        exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": partition_name(month)}).scalar()
+        if exists is None:
+            _create_partition(conn, month)
+            created += 1
+        month = add_months(month, 1)
+    return created
+
+
+def drain_default_partition(conn: Connection) -> int:
+    """Give every month that has rows in the default partition its own partition
+
+    Rows land in the default partition when no monthly partition existed for
+    them (e.g. the server was down past a month boundary). Once moved out,
+    they are subject to the retention policy like any other month.
+    """
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar() is None:
+        return 0
+    months = conn.execute(text(
+        f"SELECT DISTINCT date_trunc('month', created_at)::date FROM {DEFAULT_PARTITION}"
+    )).scalars().all()
+    for month in sorted(months):
+        _create_partition(conn, month)
+    return len(months)
+
+
+def init_chat_partitions(engine: Engine) -> None:
+    """On PostgreSQL, create chat_messages as a partitioned table when it does not exist yet"""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(text("SELECT to_regclass(:table)"), {"table": TABLE}).scalar()
+        if exists is None:
+            create_partitioned_table(conn)
+            print("✅ Created partitioned chat_messages table")
+        if is_partitioned(conn):
+            this_month = month_start(datetime.now(timezone.utc).date())
+            ensure_partitions(conn, this_month, add_months(this_month, settings.chat_partition_months_ahead))
+
+
+def _partition_tables(conn: Connection) -> List[Tuple[str, date, bool]]:
+    """(name, month, attached) of every monthly partition table, attached or detached"""
+    rows = conn.execute(text("""
+        SELECT c.relname, EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid) AS attached
+        FROM pg_class c
+        WHERE c.relkind = 'r' AND c.relname LIKE :pattern
+    """), {"pattern": f"{TABLE}_p%"}).all()
+    partitions = []
+    for name, attached in rows:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1), attached))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def _export_partition(engine: Engine, name: str, archive_dir: str) -> str:
+    """Stream a partition's rows into {archive_dir}/{name}.jsonl.gz"""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.jsonl.gz")
+    tmp_path = f"{path}.tmp"
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=1000).execute(
+            text(f"SELECT id, session_id, role, content, created_at FROM {name} ORDER BY created_at, id")
+        )
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as out:
+            for row in result:
+                out.write(json.dumps({
+                    "id": row.id,
+                    "session_id": row.session_id,
+                    "role": row.role,
+                    "content": row.content,
+                    "created_at": row.created_at.isoformat(),
+                }, ensure_ascii=False))
+                out.write("\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+def archive_old_partitions(engine: Engine, retention_months: int, archive_dir: str) -> List[str]:
+    """Detach, archive to JSONL.gz and drop monthly partitions older than the retention window"""
+    if engine.dialect.name != "postgresql" or retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(datetime.now(timezone.utc).date()), -retention_months)
+    archived = []
+    # Rows stranded in the default partition get their monthly partition first, so they expire too
+    with engine.begin() as conn:
+        drain_default_partition(conn)
+    with engine.connect() as conn:
+        expired = [partition for partition in _partition_tables(conn) if partition[1] < cutoff]
+
+    for name, month, attached in expired:
+        try:
+            if attached:
+                # Detached first so queries and vacuum stop touching it; a failed export is retried next run
+                with engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+            path = _export_partition(engine, name, archive_dir)
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE {name}"))
+            archived.append(path)
+            print(f"📦 Archived {name} to {path}")
+        except Exception as e:
+            print(f"Error archiving partition {name}: {e}")
+    return archived
+
+
+def run_partition_maintenance(engine: Engine) -> None:
+    """Create upcoming monthly partitions and apply the retention policy"""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return
+        this_month = month_start(datetime.now(timezone.utc).date())
+        ensure_partitions(conn, this_month, add_months(this_month, settings.chat_partition_months_ahead))
+    archive_old_partitions(engine, settings.chat_retention_months, settings.chat_archive_dir)
+
+
+async def partition_maintenance_loop(engine: Engine) -> None:
+    """Run partition maintenance now and then every chat_partition_maintenance_hours"""
+    while True:
+        try:
+            await asyncio.to_thread(run_partition_maintenance, engine)
+        except Exception as e:
+            print(f"Error in partition maintenance: {e}")
+        await asyncio.sleep(settings.chat_partition_maintenance_hours * 3600)
@@ -0,0 +1,87 @@
+import mmap
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import PyPDF2
+
+from core.config import settings
+
+PageText = Tuple[int, str]  # (1-based page number, text)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _open_reader(file) -> PyPDF2.PdfReader:
+    """Open a PDF through a read-only memory map so pages are paged in lazily"""
+    mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return PyPDF2.PdfReader(mapped)
+
+
+def count_pdf_pages(path: str) -> int:
+    with open(path, "rb") as file:
+        return len(_open_reader(file).pages)
+
+
+def extract_page_range(path: str, start: int, end: int) -> List[PageText]:
+    """Extract text of pages [start, end) (0-based); runs inside a worker process"""
+    with open(path, "rb") as file:
+        reader = _open_reader(file)
+        return [
+            (number + 1, reader.pages[number].extract_text() or "")
+            for number in range(start, min(end, len(reader.pages)))
+        ]
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: the server process is multi-threaded, so forking it is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.pdf_extract_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def iter_pdf_pages(path: str, page_count: Optional[int] = None) -> Iterator[PageText]:
+    """Yield (page_number, text) in page order
+
+    Page ranges are extracted in a process pool with a bounded number of
+    ranges in flight, so memory stays proportional to the window rather than
+    the document.
+    """
+    if page_count is None:
+        page_count = count_pdf_pages(path)
+    pages_per_task = settings.pdf_pages_per_task
+
+    if page_count <= pages_per_task or settings.pdf_extract_workers <= 1:
+        for start in range(0, page_count, pages_per_task):
+            yield from extract_page_range(path, start, start + pages_per_task)
+        return
+
+    executor = _get_executor()
+    ranges = deque(range(0, page_count, pages_per_task))
+    in_flight = deque()
+    window = settings.pdf_extract_workers * 2
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < window:
+                start = ranges.popleft()
+                in_flight.append(executor.submit(extract_page_range, path, start, start + pages_per_task))
+            yield from in_flight.popleft().result()
+    finally:
+        for future in in_flight:
+            future.cancel()
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import random
+import time
+from typing import AsyncIterator, List, Sequence
+
+import numpy as np
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from core.config import settings
+
+GENERATION_MODEL = 'gemini-pro'
+
+
+class LLMProvider:
+    """Embedding and text generation backend used by the chat and ingestion paths"""
+
+    name = "base"
+
+    def embed(self, texts: Sequence[str], task_type: str = "retrieval_document") -> List[List[float]]:
+        """Embed a batch of texts in one request (blocking)"""
+        raise NotImplementedError
+
+    async def aembed(self, texts: Sequence[str], task_type: str = "retrieval_query") -> List[List[float]]:
+        raise NotImplementedError
+
+    async def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the answer to `prompt` in pieces as they are generated"""
+        raise NotImplementedError
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: str, embedding_model: str, generation_model: str = GENERATION_MODEL):
+        genai.configure(api_key=api_key)
+        self.embedding_model = embedding_model
+        self.generation_model = generation_model
+
+    def embed(self, texts: Sequence[str], task_type: str = "retrieval_document") -> List[List[float]]:
+        result = genai.embed_content(model=self.embedding_model, content=list(texts), task_type=task_type)
+        return result['embedding']
+
+    async def aembed(self, texts: Sequence[str], task_type: str = "retrieval_query") -> List[List[float]]:
+        result = await genai.embed_content_async(model=self.embedding_model, content=list(texts), task_type=task_type)
+        return result['embedding']
+
+    async def generate(self, prompt: str) -> str:
+        model = genai.GenerativeModel(self.generation_model)
+        response = await model.generate_content_async(prompt)
+        return response.text
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        model = genai.GenerativeModel(self.generation_model)
+        response = await model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeProvider(LLMProvider):
+    """Deterministic local stand-in for Gemini, for load tests and benchmarks
+
+    Embeddings hash the same Korean bigram tokens as the BM25 index into a
+    fixed-size vector, so texts sharing terms land close together and
+    retrieval behaves plausibly. Answers are built from the prompt's words and
+    streamed at `tokens_per_second`. Every call waits `latency` seconds first
+    and fails with a retryable ServiceUnavailable at `error_rate`.
+    """
+
+    name = "fake"
+
+    HASHES_PER_TOKEN = 2
+
+    def __init__(
+        self,
+        dimension: int,
+        latency: float = 0.05,
+        tokens_per_second: float = 50.0,
+        error_rate: float = 0.0,
+        answer_tokens: int = 64,
+        seed: int = 0,
+    ):
+        self.dimension = dimension
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.answer_tokens = answer_tokens
+        self._random = random.Random(seed)
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise google_exceptions.ServiceUnavailable("Fake provider injected error")
+
+    def _vector(self, content: str) -> List[float]:
+        # Imported here: core.lexical depends on core.embeddings, which depends on this module
+        from core.lexical import tokenize
+
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in tokenize(content) or [content]:
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8 * self.HASHES_PER_TOKEN).digest()
+            for i in range(self.HASHES_PER_TOKEN):
+                value = int.from_bytes(digest[i * 8:(i + 1) * 8], "little")
+                vector[value % self.dimension] += 1.0 if value >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def _answer_tokens(self, prompt: str) -> List[str]:
+        words = prompt.split() or ["답변"]
+        return [words[i % len(words)] for i in range(self.answer_tokens)]
+
+    def embed(self, texts: Sequence[str], task_type: str = "retrieval_document") -> List[List[float]]:
+        time.sleep(self.latency)
+        self._maybe_fail()
+        return [self._vector(content) for content in texts]
+
+    async def aembed(self, texts: Sequence[str], task_type: str = "retrieval_query") -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        return [self._vector(content) for content in texts]
+
+    async def generate(self, prompt: str) -> str:
+        await asyncio.sleep(self.latency + self.answer_tokens / self.tokens_per_second)
+        self._maybe_fail()
+        return " ".join(self._answer_tokens(prompt))
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        for token in self._answer_tokens(prompt):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            yield token + " "
+
+
+def create_provider(name: str) -> LLMProvider:
+    if name == "gemini":
+        return GeminiProvider(api_key=settings.gemini_api_key, embedding_model=settings.embedding_model)
+    if name == "fake":
+        return FakeProvider(
+            dimension=settings.embedding_dimension,
+            latency=settings.fake_llm_latency_ms / 1000,
+            tokens_per_second=settings.fake_llm_tokens_per_second,
+            error_rate=settings.fake_llm_error_rate,
+            answer_tokens=settings.fake_llm_answer_tokens,
+            seed=settings.fake_llm_seed,
+        )
+    raise ValueError(f"Unknown LLM_PROVIDER: {name}")
+
+
+provider = create_provider(settings.llm_provider)
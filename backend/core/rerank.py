@@ -0,0 +1,166 @@
+import asyncio
+import re
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+from core.config import settings
+from core.embeddings import text_hash
+from core.metrics import registry, span
+from core.providers import provider
+
+# Characters of each passage shown to the LLM scorer
+PASSAGE_CHARS = 600
+_SCORE_LINE = re.compile(r"\[?(\d+)\]?\s*[:：]\s*(\d+(?:\.\d+)?)")
+
+rerank_fallbacks_total = registry.counter(
+    "rag_rerank_fallbacks_total", "Reranks that fell back to first-stage order", labels=("reason",)
+)
+
+
+class Reranker:
+    """Reorders first-stage retrieval candidates by relevance to the query
+
+    Candidates are scored in batches of `batch_size`, concurrently. Scores are
+    cached per (query hash, chunk id); chunk ids change whenever chunk text
+    changes, so cached scores never go stale. If scoring fails or does not
+    finish within `timeout` seconds, the first-stage order is kept.
+    """
+
+    name = "base"
+
+    def __init__(self, batch_size: int = 10, timeout: float = 2.0, cache_size: int = 10000):
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, int], float]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.fallbacks = 0
+
+    async def score(self, query: str, passages: Sequence[str]) -> List[float]:
+        """Relevance of each passage to `query`, higher is better"""
+        raise NotImplementedError
+
+    def _remember(self, key: Tuple[str, int], score: float) -> None:
+        self._cache[key] = score
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _fallback(self, chunks: list, top_n: int, reason: str) -> list:
+        self.fallbacks += 1
+        rerank_fallbacks_total.inc(reason=reason)
+        return chunks[:top_n]
+
+    async def rerank(self, query: str, chunks: list, top_n: int) -> list:
+        """The `top_n` most relevant of `chunks` (DocumentChunk rows in first-stage order)"""
+        if len(chunks) <= 1:
+            return chunks[:top_n]
+        with span("rerank"):
+            query_hash = text_hash(query)
+            scores: Dict[int, float] = {}
+            missing = []
+            for chunk in chunks:
+                cached = self._cache.get((query_hash, chunk.id))
+                if cached is None:
+                    missing.append(chunk)
+                else:
+                    self._cache.move_to_end((query_hash, chunk.id))
+                    scores[chunk.id] = cached
+            self.cache_hits += len(chunks) - len(missing)
+            self.cache_misses += len(missing)
+
+            if missing:
+                batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+                tasks = [
+                    asyncio.create_task(self.score(query, [chunk.content[:PASSAGE_CHARS] for chunk in batch]))
+                    for batch in batches
+                ]
+                done, pending = await asyncio.wait(tasks, timeout=self.timeout)
+                for task in pending:
+                    task.cancel()
+                failed = False
+                # Keep what finished in the cache even when falling back, so a retry is cheaper
+                for batch, task in zip(batches, tasks):
+                    if task not in done:
+                        continue
+                    if task.exception() is not None:
+                        print(f"Error reranking: {task.exception()}")
+                        failed = True
+                        continue
+                    for chunk, score in zip(batch, task.result()):
+                        scores[chunk.id] = score
+                        self._remember((query_hash, chunk.id), score)
+                if pending:
+                    return self._fallback(chunks, top_n, "timeout")
+                if failed:
+                    return self._fallback(chunks, top_n, "error")
+
+            # Ties keep their first-stage order
+            order = sorted(range(len(chunks)), key=lambda index: (-scores[chunks[index].id], index))
+            return [chunks[index] for index in order[:top_n]]
+
+    def stats(self) -> dict:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "reranker": self.name,
+            "cache_entries": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "fallbacks": self.fallbacks,
+        }
+
+
+class NoopReranker(Reranker):
+    """Keeps the first-stage order"""
+
+    name = "none"
+
+    async def rerank(self, query: str, chunks: list, top_n: int) -> list:
+        return chunks[:top_n]
+
+
+class LLMReranker(Reranker):
+    """Asks the LLM provider to grade each passage 0-10, one request per batch"""
+
+    name = "llm"
+
+    async def score(self, query: str, passages: Sequence[str]) -> List[float]:
+        numbered = "\n\n".join(f"[{number}] {passage}" for number, passage in enumerate(passages, start=1))
+        prompt = f"""
+        다음 질문에 답하는 데 각 보험 약관 문서 조각이 얼마나 관련 있는지 0~10점으로 평가해주세요.
+
+        질문: {query}
+
+        {numbered}
+
+        다른 설명 없이 각 줄에 "번호: 점수" 형식으로만 답해주세요.
+        """
+        response = await provider.generate(prompt)
+        scores = [0.0] * len(passages)
+        parsed = 0
+        for number, score in _SCORE_LINE.findall(response):
+            index = int(number) - 1
+            if 0 <= index < len(passages):
+                scores[index] = float(score)
+                parsed += 1
+        if not parsed:
+            raise ValueError("Reranker response had no scores")
+        return scores
+
+
+def create_reranker(name: str) -> Reranker:
+    options = dict(
+        batch_size=settings.rerank_batch_size,
+        timeout=settings.rerank_timeout_seconds,
+        cache_size=settings.rerank_cache_size
+    )
+    if name == "none":
+        return NoopReranker(**options)
+    if name == "llm":
+        return LLMReranker(**options)
+    raise ValueError(f"Unknown RERANKER: {name}")
+
+
+reranker = create_reranker(settings.reranker)
@@ -0,0 +1,407 @@
+import asyncio
+import os
+import threading
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.database import DocumentChunk
+
+
+class RetrievalBackend:
+    """Base class for vector retrieval engines behind search_similar_chunks"""
+
+    name = "base"
+
+    def search(self, db: Session, query_embedding: Sequence[float], limit: int) -> List[DocumentChunk]:
+        raise NotImplementedError
+
+    async def asearch(self, db: AsyncSession, query_embedding: Sequence[float], limit: int) -> List[DocumentChunk]:
+        """Async variant of search() for the request path"""
+        return await db.run_sync(lambda session: self.search(session, query_embedding, limit))
+
+    def warm_up(self, db: Session) -> None:
+        """Prepare the backend at startup"""
+
+    def add_chunks(self, document_id: int, chunk_ids: Sequence[int], embeddings: Sequence[Sequence[float]]) -> None:
+        """Notify the backend that chunks were inserted"""
+
+    def remove_document(self, document_id: int) -> None:
+        """Notify the backend that a document's chunks were deleted"""
+
+    def remove_chunks(self, document_id: int, chunk_ids: Sequence[int]) -> None:
+        """Notify the backend that individual chunks of a document were deleted"""
+
+    def flush(self) -> None:
+        """Persist pending changes (at shutdown)"""
+
+
+class PgVectorBackend(RetrievalBackend):
+    """Cosine distance search in PostgreSQL through the pgvector HNSW index"""
+
+    name = "pgvector"
+
+    def search(self, db: Session, query_embedding: Sequence[float], limit: int) -> List[DocumentChunk]:
+        # Recall/latency trade-off of the HNSW scan, scoped to this transaction
+        db.execute(
+            text("SELECT set_config('hnsw.ef_search', :ef, true)"),
+            {"ef": str(settings.hnsw_ef_search)}
+        )
+
+        # ORDER BY embedding <=> :q LIMIT k
+        return db.query(DocumentChunk).order_by(
+            DocumentChunk.embedding.cosine_distance(query_embedding)
+        ).limit(limit).all()
+
+    async def asearch(self, db: AsyncSession, query_embedding: Sequence[float], limit: int) -> List[DocumentChunk]:
+        await db.execute(
+            text("SELECT set_config('hnsw.ef_search', :ef, true)"),
+            {"ef": str(settings.hnsw_ef_search)}
+        )
+        result = await db.execute(
+            select(DocumentChunk).order_by(
+                DocumentChunk.embedding.cosine_distance(query_embedding)
+            ).limit(limit)
+        )
+        return list(result.scalars().all())
+
+
+class NumpyVectorIndex(RetrievalBackend):
+    """In-process exact cosine search over a contiguous float32 matrix
+
+    Rows are L2-normalised on insert, so scoring is a single matrix-vector
+    product. The index keeps itself in sync with document_chunks (inserts are
+    appended incrementally, deletes trigger a rebuild) and can optionally be
+    persisted to .npy files that are memory-mapped at startup. Changes are
+    written at most every `save_delay` seconds rather than on every insert or
+    delete; a stale file is harmless, since startup syncs it with the
+    database anyway.
+    """
+
+    name = "numpy"
+
+    LOAD_BATCH_SIZE = 5000
+    SCORE_BLOCK_ROWS = 65536
+
+    def __init__(
+        self,
+        dimension: int,
+        persist_path: Optional[str] = None,
+        refresh_interval: float = 30.0,
+        save_delay: float = 10.0,
+    ):
+        self.dimension = dimension
+        self.persist_path = persist_path or None
+        self.refresh_interval = refresh_interval
+        self.save_delay = save_delay
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._save_timer: Optional[threading.Timer] = None
+        self._dirty = False
+        self._matrix = np.empty((0, dimension), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._document_ids = np.empty(0, dtype=np.int64)
+        self._loaded = False
+        self._last_sync = 0.0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # -- building ---------------------------------------------------------
+
+    def _normalize(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _load_rows(self, db: Session, after_id: int = 0):
+        """Read (id, document_id, embedding) rows with id > after_id from the database"""
+        ids, document_ids, vectors = [], [], []
+        query = db.query(
+            DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.embedding
+        ).filter(DocumentChunk.id > after_id).order_by(DocumentChunk.id)
+
+        for row in query.yield_per(self.LOAD_BATCH_SIZE):
+            ids.append(row.id)
+            document_ids.append(row.document_id)
+            vectors.append(np.asarray(row.embedding, dtype=np.float32))
+
+        if not ids:
+            return (
+                np.empty(0, dtype=np.int64),
+                np.empty(0, dtype=np.int64),
+                np.empty((0, self.dimension), dtype=np.float32),
+            )
+        return (
+            np.asarray(ids, dtype=np.int64),
+            np.asarray(document_ids, dtype=np.int64),
+            self._normalize(np.vstack(vectors)),
+        )
+
+    def _db_state(self, db: Session):
+        count, max_id = db.query(func.count(DocumentChunk.id), func.max(DocumentChunk.id)).one()
+        return count or 0, max_id or 0
+
+    def _max_id(self) -> int:
+        return int(self._ids.max()) if len(self._ids) else 0
+
+    def _rebuild(self, db: Session) -> None:
+        self._ids, self._document_ids, self._matrix = self._load_rows(db)
+        self._mark_dirty()
+
+    def _load_persisted(self) -> bool:
+        if not self.persist_path:
+            return False
+        matrix_path, ids_path = f"{self.persist_path}.npy", f"{self.persist_path}.ids.npy"
+        if not (os.path.exists(matrix_path) and os.path.exists(ids_path)):
+            return False
+        try:
+            matrix = np.load(matrix_path, mmap_mode="r")
+            ids = np.load(ids_path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"Error loading vector index from {self.persist_path}: {e}")
+            return False
+        if matrix.ndim != 2 or matrix.shape[1] != self.dimension or ids.shape != (2, matrix.shape[0]):
+            return False
+        self._matrix, self._ids, self._document_ids = matrix, ids[0], ids[1]
+        return True
+
+    def _mark_dirty(self) -> None:
+        """Schedule a save; changes made before it runs are written together"""
+        if not self.persist_path:
+            return
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self) -> None:
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                # Mutations replace these arrays rather than writing into them
+                matrix, ids, document_ids = self._matrix, self._ids, self._document_ids
+            try:
+                self._save(matrix, ids, document_ids)
+            except OSError as e:
+                print(f"Error saving vector index to {self.persist_path}: {e}")
+
+    def _save(self, matrix: np.ndarray, ids: np.ndarray, document_ids: np.ndarray) -> None:
+        directory = os.path.dirname(self.persist_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write to temp files and swap so a crash never leaves a torn index
+        for suffix, array in (
+            (".npy", matrix),
+            (".ids.npy", np.vstack([ids, document_ids])),
+        ):
+            tmp_path = f"{self.persist_path}.tmp{suffix}"
+            np.save(tmp_path, array)
+            os.replace(tmp_path, f"{self.persist_path}{suffix}")
+
+    def _sync(self, db: Session, force: bool = False) -> None:
+        """Bring the index up to date with document_chunks"""
+        now = time.monotonic()
+        if not force and self._loaded and now - self._last_sync < self.refresh_interval:
+            return
+
+        with self._lock:
+            if not self._loaded:
+                self._loaded = self._load_persisted()
+                if not self._loaded:
+                    self._rebuild(db)
+                    self._loaded = True
+
+            count, max_id = self._db_state(db)
+            if max_id > self._max_id():
+                # Rows inserted by other workers: append only the new ones
+                ids, document_ids, matrix = self._load_rows(db, after_id=self._max_id())
+                self._append(ids, document_ids, matrix)
+            if count != len(self._ids):
+                # Rows were deleted (or ids reused): fall back to a full rebuild
+                self._rebuild(db)
+            self._last_sync = now
+
+    def _append(self, ids: np.ndarray, document_ids: np.ndarray, matrix: np.ndarray) -> None:
+        if not len(ids):
+            return
+        self._matrix = np.concatenate([self._matrix, matrix])
+        self._ids = np.concatenate([self._ids, ids])
+        self._document_ids = np.concatenate([self._document_ids, document_ids])
+        self._mark_dirty()
+
+    # -- RetrievalBackend -------------------------------------------------
+
+    def warm_up(self, db: Session) -> None:
+        self._sync(db, force=True)
+        print(f"✅ NumPy vector index loaded ({len(self)} chunks)")
+
+    def add_chunks(self, document_id: int, chunk_ids: Sequence[int], embeddings: Sequence[Sequence[float]]) -> None:
+        if not self._loaded or not len(chunk_ids):
+            return
+        with self._lock:
+            ids = np.asarray(chunk_ids, dtype=np.int64)
+            new = ids > self._max_id()
+            if not new.all():
+                # Out-of-order ids: let the next sync rebuild from the database
+                self._last_sync = 0.0
+                return
+            self._append(
+                ids,
+                np.full(len(ids), document_id, dtype=np.int64),
+                self._normalize(np.asarray(embeddings, dtype=np.float32)),
+            )
+
+    def remove_document(self, document_id: int) -> None:
+        if not self._loaded:
+            return
+        with self._lock:
+            keep = self._document_ids != document_id
+            if keep.all():
+                return
+            self._matrix = np.ascontiguousarray(self._matrix[keep])
+            self._ids = self._ids[keep]
+            self._document_ids = self._document_ids[keep]
+            self._mark_dirty()
+
+    def remove_chunks(self, document_id: int, chunk_ids: Sequence[int]) -> None:
+        if not self._loaded or not len(chunk_ids):
+            return
+        with self._lock:
+            keep = ~np.isin(self._ids, np.asarray(chunk_ids, dtype=np.int64))
+            if keep.all():
+                return
+            self._matrix = np.ascontiguousarray(self._matrix[keep])
+            self._ids = self._ids[keep]
+            self._document_ids = self._document_ids[keep]
+            self._mark_dirty()
+
+    def top_k(self, query_embedding: Sequence[float], limit: int):
+        """Return (chunk_ids, scores) of the `limit` most similar rows, best first"""
+        query = self._normalize(np.asarray(query_embedding, dtype=np.float32))[0]
+        with self._lock:
+            matrix, ids = self._matrix, self._ids
+        if not len(ids) or limit <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # Score in row blocks to bound temporaries, keeping each block's top-k
+        candidate_rows, candidate_scores = [], []
+        for start in range(0, len(ids), self.SCORE_BLOCK_ROWS):
+            scores = matrix[start:start + self.SCORE_BLOCK_ROWS] @ query
+            if len(scores) > limit:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+            else:
+                top = np.arange(len(scores))
+            candidate_rows.append(top + start)
+            candidate_scores.append(scores[top])
+
+        rows = np.concatenate(candidate_rows)
+        scores = np.concatenate(candidate_scores)
+        if len(rows) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores)
+        return ids[rows[order]], scores[order]
+
+    def search(self, db: Session, query_embedding: Sequence[float], limit: int) -> List[DocumentChunk]:
+        self._sync(db)
+        chunk_ids, _ = self.top_k(query_embedding, limit)
+        if not len(chunk_ids):
+            return []
+
+        chunks = db.query(DocumentChunk).filter(DocumentChunk.id.in_(chunk_ids.tolist())).all()
+        return self._in_rank_order(chunks, chunk_ids)
+
+    async def asearch(self, db: AsyncSession, query_embedding: Sequence[float], limit: int) -> List[DocumentChunk]:
+        await db.run_sync(self._sync)
+        # Scoring is CPU-bound numpy work; keep it off the event loop
+        chunk_ids, _ = await asyncio.to_thread(self.top_k, query_embedding, limit)
+        if not len(chunk_ids):
+            return []
+
+        result = await db.execute(select(DocumentChunk).where(DocumentChunk.id.in_(chunk_ids.tolist())))
+        return self._in_rank_order(result.scalars().all(), chunk_ids)
+
+    def _in_rank_order(self, chunks, chunk_ids: np.ndarray) -> List[DocumentChunk]:
+        by_id = {chunk.id: chunk for chunk in chunks}
+        return [by_id[chunk_id] for chunk_id in chunk_ids.tolist() if chunk_id in by_id]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[int]:
+    """Merge ranked id lists by sum of 1 / (k + rank); ids ranked well by several lists rise to the top"""
+    scores = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+_backend: Optional[RetrievalBackend] = None
+_backend_lock = threading.Lock()
+
+
+def _has_pgvector(db: Session) -> bool:
+    if db.bind.dialect.name != "postgresql":
+        return False
+    try:
+        return db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'vector'")).scalar() is not None
+    except Exception as e:
+        print(f"Error checking pgvector extension: {e}")
+        return False
+
+
+async def aget_retrieval_backend(db: AsyncSession) -> RetrievalBackend:
+    """Async variant of get_retrieval_backend()"""
+    if _backend is not None:
+        return _backend
+    return await db.run_sync(get_retrieval_backend)
+
+
+def get_retrieval_backend(db: Session) -> RetrievalBackend:
+    """Return the process-wide retrieval backend, selecting it on first use"""
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    with _backend_lock:
+        if _backend is None:
+            choice = settings.retrieval_backend
+            if choice == "auto":
+                choice = "pgvector" if _has_pgvector(db) else "numpy"
+            if choice == "pgvector" and settings.embedding_storage == "int8":
+                # int8 embeddings are stored as bytes, which pgvector cannot search
+                if settings.retrieval_backend == "pgvector":
+                    print("⚠️ EMBEDDING_STORAGE=int8 is not searchable by pgvector; using the numpy backend")
+                choice = "numpy"
+            if choice == "pgvector":
+                _backend = PgVectorBackend()
+            elif choice == "numpy":
+                _backend = NumpyVectorIndex(
+                    settings.embedding_dimension,
+                    persist_path=settings.vector_index_path,
+                    refresh_interval=settings.vector_index_refresh_seconds,
+                    save_delay=settings.vector_index_save_delay_seconds
+                )
+            else:
+                raise ValueError(f"Unknown retrieval backend: {settings.retrieval_backend}")
+            print(f"🔎 Retrieval backend: {_backend.name}")
+    return _backend
+
+
+def flush_retrieval_backend() -> None:
+    """Persist pending index changes, if a backend was selected"""
+    if _backend is not None:
+        _backend.flush()
@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from core.config import settings
+from core.corpus import corpus_version
+from core.embeddings import text_hash
+
+
+@dataclass(frozen=True)
+class CachedChunk:
+    """Retrieved chunk without its embedding; read like a DocumentChunk row"""
+    id: int
+    document_id: int
+    content: str
+    content_hash: Optional[str] = None
+    page_number: Optional[int] = None
+    clause_id: Optional[str] = None
+    char_start: Optional[int] = None
+    char_end: Optional[int] = None
+
+
+CHUNK_FIELDS = tuple(CachedChunk.__dataclass_fields__)
+
+
+@dataclass
+class CachedRetrieval:
+    chunk_ids: Tuple[int, ...]
+    generation: int
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class RetrievalCache:
+    """Two-level cache of retrieval results
+
+    Normalized query text (and result size) maps to the ranked chunk ids, and
+    chunk id maps to the chunk's content, so different queries that retrieve
+    the same popular chunks share their entries. Both levels are LRU with a
+    TTL, and are emptied whenever the corpus generation changes (a document
+    is indexed or deleted).
+    """
+
+    def __init__(self, max_queries: int, max_chunks: int, ttl_seconds: float):
+        self.max_queries = max_queries
+        self.max_chunks = max_chunks
+        self.ttl_seconds = ttl_seconds
+        self._queries: "OrderedDict[Tuple[str, int], CachedRetrieval]" = OrderedDict()
+        self._chunks: "OrderedDict[int, Tuple[CachedChunk, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.query_hits = 0
+        self.query_misses = 0
+        self.chunk_hits = 0
+        self.chunk_misses = 0
+        corpus_version.subscribe(lambda generation: self.clear())
+
+    def _expired(self, created_at: float) -> bool:
+        return time.monotonic() - created_at >= self.ttl_seconds
+
+    def get_ids(self, query: str, limit: int) -> Optional[List[int]]:
+        """Ranked chunk ids last retrieved for this query, if still fresh"""
+        key = (text_hash(query), limit)
+        with self._lock:
+            entry = self._queries.get(key)
+            if entry is None or entry.generation != corpus_version.generation or self._expired(entry.created_at):
+                self.query_misses += 1
+                return None
+            self.query_hits += 1
+            self._queries.move_to_end(key)
+            return list(entry.chunk_ids)
+
+    def get_chunks(self, chunk_ids: Sequence[int]) -> Tuple[Dict[int, CachedChunk], List[int]]:
+        """(cached chunks by id, ids that must be loaded from the database)"""
+        found: Dict[int, CachedChunk] = {}
+        missing: List[int] = []
+        with self._lock:
+            for chunk_id in chunk_ids:
+                entry = self._chunks.get(chunk_id)
+                if entry is None or self._expired(entry[1]):
+                    missing.append(chunk_id)
+                    continue
+                self._chunks.move_to_end(chunk_id)
+                found[chunk_id] = entry[0]
+            self.chunk_hits += len(found)
+            self.chunk_misses += len(missing)
+        return found, missing
+
+    def put_chunks(self, chunks: Sequence, generation: int) -> Dict[int, CachedChunk]:
+        """Cache DocumentChunk rows; returns their cached copies by id"""
+        copies = {
+            chunk.id: CachedChunk(**{name: getattr(chunk, name) for name in CHUNK_FIELDS})
+            for chunk in chunks
+        }
+        if generation != corpus_version.generation:
+            return copies
+        now = time.monotonic()
+        with self._lock:
+            for chunk_id, copy in copies.items():
+                self._chunks[chunk_id] = (copy, now)
+                self._chunks.move_to_end(chunk_id)
+            while len(self._chunks) > self.max_chunks:
+                self._chunks.popitem(last=False)
+        return copies
+
+    def put(self, query: str, limit: int, chunks: Sequence, generation: int) -> None:
+        """Remember the ranked result of a search run against corpus `generation`"""
+        if generation != corpus_version.generation:
+            return
+        self.put_chunks(chunks, generation)
+        with self._lock:
+            key = (text_hash(query), limit)
+            self._queries[key] = CachedRetrieval(tuple(chunk.id for chunk in chunks), generation)
+            self._queries.move_to_end(key)
+            while len(self._queries) > self.max_queries:
+                self._queries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._queries.clear()
+            self._chunks.clear()
+
+    def stats(self) -> dict:
+        query_lookups = self.query_hits + self.query_misses
+        chunk_lookups = self.chunk_hits + self.chunk_misses
+        return {
+            "queries": len(self._queries),
+            "max_queries": self.max_queries,
+            "chunks": len(self._chunks),
+            "max_chunks": self.max_chunks,
+            "corpus_generation": corpus_version.generation,
+            "query_hits": self.query_hits,
+            "query_misses": self.query_misses,
+            "query_hit_rate": self.query_hits / query_lookups if query_lookups else 0.0,
+            "chunk_hits": self.chunk_hits,
+            "chunk_misses": self.chunk_misses,
+            "chunk_hit_rate": self.chunk_hits / chunk_lookups if chunk_lookups else 0.0,
+        }
+
+
+retrieval_cache = RetrievalCache(
+    max_queries=settings.retrieval_cache_max_queries,
+    max_chunks=settings.retrieval_cache_max_chunks,
+    ttl_seconds=settings.retrieval_cache_ttl_seconds
+)
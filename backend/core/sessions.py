@@ -0,0 +1,164 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.database import AsyncSessionLocal
+from core.metrics import span
+from core.providers import provider
+from models.database import ChatMessage, ChatSession
+
+ROLE_LABELS = {"user": "사용자", "ai": "상담원"}
+
+
+@dataclass
+class Turn:
+    message_id: Optional[int]
+    role: str
+    content: str
+    saved: Optional[asyncio.Future] = None  # pending write-behind insert resolving to the id
+
+    async def resolve_id(self) -> Optional[int]:
+        if self.message_id is None and self.saved is not None:
+            self.message_id = await self.saved
+        return self.message_id
+
+
+@dataclass
+class SessionState:
+    session_id: str
+    summary: str = ""
+    summarized_until: int = 0  # last message id folded into the summary
+    turns: List[Turn] = field(default_factory=list)  # messages after summarized_until, oldest first
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    @property
+    def has_history(self) -> bool:
+        return bool(self.summary or self.turns)
+
+
+class SessionStore:
+    """Conversation state per session: rolling summary plus the most recent turns
+
+    State is cached in an LRU so a turn only hits the database on a cache
+    miss (through the (session_id, created_at) index). Once more than twice
+    `recent_messages` messages accumulate, all but the last `recent_messages`
+    are folded into the summary in the background and persisted in
+    chat_sessions, so the history sent to the model stays bounded however
+    long the conversation runs while summaries are only generated every few
+    turns. At most `summary_concurrency` summaries are generated at once.
+    """
+
+    def __init__(self, max_sessions: int, recent_messages: int, summary_token_budget: int, summary_concurrency: int):
+        self.max_sessions = max_sessions
+        self.recent_messages = recent_messages
+        self.summary_token_budget = summary_token_budget
+        self._summary_slots = asyncio.Semaphore(summary_concurrency)
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._tasks = set()
+
+    @property
+    def max_turns(self) -> int:
+        """Unsummarized turns kept before compaction folds them back down to `recent_messages`"""
+        return self.recent_messages * 2
+
+    def _remember(self, state: SessionState) -> None:
+        self._sessions[state.session_id] = state
+        self._sessions.move_to_end(state.session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    async def load(self, db: AsyncSession, session_id: str) -> SessionState:
+        state = self._sessions.get(session_id)
+        if state is not None:
+            self._sessions.move_to_end(session_id)
+            return state
+
+        state = SessionState(session_id=session_id)
+        stored = await db.get(ChatSession, session_id)
+        if stored is not None:
+            state.summary, state.summarized_until = stored.summary, stored.summarized_until
+
+        # Newest unsummarized messages only; anything older is covered by (or dropped from) the summary
+        result = await db.execute(
+            select(ChatMessage.id, ChatMessage.role, ChatMessage.content).where(
+                ChatMessage.session_id == session_id,
+                ChatMessage.id > state.summarized_until
+            ).order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(self.max_turns)
+        )
+        state.turns = [Turn(row.id, row.role, row.content) for row in reversed(result.all())]
+        self._remember(state)
+        return state
+
+    def append(self, state: SessionState, saved: asyncio.Future, role: str, content: str) -> None:
+        state.turns.append(Turn(None, role, content, saved))
+        if len(state.turns) > self.max_turns and not state.lock.locked():
+            task = asyncio.create_task(self._compact(state))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def render_history(self, state: SessionState) -> str:
+        """History section of the prompt: the summary followed by the unsummarized turns"""
+        parts = []
+        if state.summary:
+            parts.append(f"이전 대화 요약: {state.summary}")
+        for turn in state.turns[-self.max_turns:]:
+            parts.append(f"{ROLE_LABELS.get(turn.role, turn.role)}: {turn.content}")
+        return "\n".join(parts)
+
+    async def _summarize(self, summary: str, turns: List[Turn]) -> str:
+        transcript = "\n".join(f"{ROLE_LABELS.get(turn.role, turn.role)}: {turn.content}" for turn in turns)
+        prompt = f"""
+        다음은 보험 약관 상담 대화의 기존 요약과 이어지는 대화입니다.
+
+        기존 요약: {summary or '없음'}
+
+        대화:
+        {transcript}
+
+        이후 질문에 답하는 데 필요한 내용(상품, 특약, 질병, 금액, 사용자가 확인한 사실)을
+        유지하여 {self.summary_token_budget}자 이내의 한국어 요약 하나로 작성해주세요.
+        """
+        summary = await provider.generate(prompt)
+        return summary.strip()[: self.summary_token_budget * 2]
+
+    async def _compact(self, state: SessionState) -> None:
+        """Fold all but the most recent messages into the summary and persist it"""
+        async with state.lock:
+            older = state.turns[:-self.recent_messages]
+            if not older:
+                return
+            try:
+                summarized_until = await older[-1].resolve_id()
+                if summarized_until is None:
+                    return
+                # Background summaries must not crowd out chat generations at the provider
+                async with self._summary_slots:
+                    with span("session_summary"):
+                        summary = await self._summarize(state.summary, older)
+                async with AsyncSessionLocal() as db:
+                    stored = await db.get(ChatSession, state.session_id)
+                    if stored is None:
+                        stored = ChatSession(session_id=state.session_id)
+                        db.add(stored)
+                    stored.summary = summary
+                    stored.summarized_until = summarized_until
+                    await db.commit()
+            except Exception as e:
+                # History stays bounded by render_history(); compaction is retried on the next turn
+                print(f"Error summarizing session {state.session_id}: {e}")
+                return
+            state.summary, state.summarized_until = summary, summarized_until
+            state.turns = state.turns[len(older):]
+
+
+session_store = SessionStore(
+    max_sessions=settings.session_cache_size,
+    recent_messages=settings.session_recent_messages,
+    summary_token_budget=settings.session_summary_token_budget,
+    summary_concurrency=settings.session_summary_concurrency
+)
@@ -0,0 +1,95 @@
+import json
+import struct
+
+import numpy as np
+from pgvector.sqlalchemy import HALFVEC, Vector
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+# 'vector': float32 (pgvector vector on PostgreSQL), 'halfvec': float16 (pgvector halfvec),
+# 'int8': scalar-quantized bytes with a per-vector float32 scale (bytea, no pgvector ANN index)
+EMBEDDING_STORAGE_FORMATS = ("vector", "halfvec", "int8")
+
+_BYTE_DTYPES = {"vector": np.dtype("<f4"), "halfvec": np.dtype("<f2")}
+_SCALE = struct.Struct("<f")
+
+
+def encode_embedding(value, storage: str) -> bytes:
+    """Compact little-endian bytes of an embedding in the given storage format"""
+    vector = np.asarray(value, dtype=np.float32)
+    if storage == "int8":
+        peak = float(np.abs(vector).max()) if vector.size else 0.0
+        scale = peak / 127.0 if peak else 1.0
+        quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+        return _SCALE.pack(scale) + quantized.tobytes()
+    return vector.astype(_BYTE_DTYPES[storage]).tobytes()
+
+
+def decode_embedding(data, dimension: int, storage: str) -> np.ndarray:
+    """Embedding bytes back to a float32 array
+
+    float32 bytes are wrapped without copying (the array is read-only). The
+    format is recognised by length, so rows written in another format (e.g.
+    halfway through a conversion) still decode.
+    """
+    size = len(data)
+    if size == dimension * 4 and storage != "int8":
+        return np.frombuffer(data, dtype="<f4")
+    if size == dimension * 2 and storage != "int8":
+        return np.frombuffer(data, dtype="<f2").astype(np.float32)
+    if size == dimension + _SCALE.size:
+        scale = _SCALE.unpack_from(data)[0]
+        return np.frombuffer(data, dtype=np.int8, offset=_SCALE.size).astype(np.float32) * np.float32(scale)
+    if size == dimension * 4:
+        return np.frombuffer(data, dtype="<f4")
+    if size == dimension * 2:
+        return np.frombuffer(data, dtype="<f2").astype(np.float32)
+    raise ValueError(f"Cannot decode a {size}-byte embedding of dimension {dimension}")
+
+
+def uses_pgvector(storage: str, dialect_name: str) -> bool:
+    return dialect_name == "postgresql" and storage in ("vector", "halfvec")
+
+
+class EmbeddingColumn(TypeDecorator):
+    """Embedding column in the configured storage format
+
+    On PostgreSQL 'vector' and 'halfvec' map to the pgvector types (so the
+    HNSW index and `<=>` search keep working); everything else is stored as
+    compact bytes. Values bind from lists or arrays and load as float32
+    NumPy arrays. Legacy rows stored as '[x, y, ...]' text still load.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+    comparator_factory = Vector.comparator_factory
+
+    def __init__(self, dimension: int, storage: str = "vector"):
+        if storage not in EMBEDDING_STORAGE_FORMATS:
+            raise ValueError(f"Unknown EMBEDDING_STORAGE: {storage}")
+        super().__init__()
+        self.dimension = dimension
+        self.storage = storage
+
+    def load_dialect_impl(self, dialect):
+        if uses_pgvector(self.storage, dialect.name):
+            column_type = Vector(self.dimension) if self.storage == "vector" else HALFVEC(self.dimension)
+            return dialect.type_descriptor(column_type)
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if uses_pgvector(self.storage, dialect.name):
+            return np.asarray(value, dtype=np.float32)
+        return encode_embedding(value, self.storage)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return decode_embedding(value, self.dimension, self.storage)
+        if isinstance(value, str):
+            return np.asarray(json.loads(value), dtype=np.float32)
+        if hasattr(value, "to_numpy"):  # pgvector HalfVector
+            return value.to_numpy().astype(np.float32)
+        return np.asarray(value, dtype=np.float32)
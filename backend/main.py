@@ -1,9 +1,28 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import exc as sa_exc
 from contextlib import asynccontextmanager
+import asyncio
+import hmac
+import time
 
 from core.config import settings
-from core.database import engine, vector_engine
+from core.database import (
+    engine, vector_engine, async_engine, async_vector_engine,
+    init_vector_extension, sync_schema, VectorSessionLocal, pool_status
+)
+from core.retrieval import get_retrieval_backend, flush_retrieval_backend
+from core.lexical import lexical_index
+from core.ingestion import ingestion_queue
+from core.message_writer import message_writer
+from core.partitions import init_chat_partitions, partition_maintenance_loop
+from core.embeddings import embedding_cache
+from core.answer_cache import answer_cache
+from core.retrieval_cache import retrieval_cache
+from core.admission import chat_admission, AdmissionRejected
+from core.rerank import reranker
+from core import metrics
 from models.database import Base
 from api.v1 import chat, auth, admin
 
@@ -12,16 +31,50 @@ from api.v1 import chat, auth, admin
 async def lifespan(app: FastAPI):
     # Startup
     try:
-        # Create tables
+        # Enable pgvector before creating the vector column / HNSW index
+        init_vector_extension(engine)
+        if vector_engine is not engine:
+            init_vector_extension(vector_engine)
+        
+        # Create tables (chat_messages is partitioned by month on PostgreSQL)
+        init_chat_partitions(engine)
         Base.metadata.create_all(bind=engine)
-        Base.metadata.create_all(bind=vector_engine)
+        sync_schema(engine, Base.metadata)
+        if vector_engine is not engine:
+            Base.metadata.create_all(bind=vector_engine)
+            sync_schema(vector_engine, Base.metadata)
         print("✅ Database tables created successfully")
     except Exception as e:
         print(f"⚠️  Warning: Database initialization error: {e}")
         # Continue anyway - tables might already exist
+    
+    try:
+        # Select the retrieval backend and load in-process indexes
+        vector_db = VectorSessionLocal()
+        try:
+            get_retrieval_backend(vector_db).warm_up(vector_db)
+            if settings.hybrid_search_enabled:
+                lexical_index.warm_up(vector_db)
+        finally:
+            vector_db.close()
+    except Exception as e:
+        print(f"⚠️  Warning: Retrieval backend initialization error: {e}")
+    
+    # Start background document ingestion (resumes queued uploads)
+    ingestion_queue.start()
+    # Batch chat message inserts off the request path
+    message_writer.start()
+    # Upcoming chat_messages partitions and retention/archival
+    maintenance = asyncio.create_task(partition_maintenance_loop(engine))
     yield
     # Shutdown
-    pass
+    maintenance.cancel()
+    await message_writer.shutdown()
+    ingestion_queue.shutdown()
+    flush_retrieval_backend()
+    await async_engine.dispose()
+    if async_vector_engine is not async_engine:
+        await async_vector_engine.dispose()
 
 
 app = FastAPI(
@@ -38,6 +91,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Session-Id", "Server-Timing", "Retry-After"],
 )
 
 # Include routers
@@ -45,6 +99,73 @@ app.include_router(chat.router, prefix="/api/v1", tags=["chat"])
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
 
+# Scrape-time gauges
+metrics.registry.register_stats("rag_embedding_cache", "Embedding cache statistics", embedding_cache.stats)
+metrics.registry.register_stats("rag_answer_cache", "Answer cache statistics", answer_cache.stats)
+metrics.registry.register_stats("rag_retrieval_cache", "Retrieval result cache statistics", retrieval_cache.stats)
+metrics.registry.register_stats("rag_db_pool", "Database connection pool statistics", pool_status, label="pool")
+metrics.registry.register_stats("rag_rerank", "Reranker score cache and fallbacks", reranker.stats)
+metrics.registry.register_stats("rag_chat_admission", "Chat admission control: in-flight generations, queue depth, rejections", chat_admission.stats)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Request count and latency per route, plus the optional Server-Timing header"""
+    token = metrics.start_request_timings()
+    started = time.perf_counter()
+
+    def record(status: int) -> None:
+        # Label by endpoint function, not raw path, to keep the series count bounded
+        handler = getattr(request.scope.get("endpoint"), "__name__", "unmatched")
+        metrics.http_requests_total.inc(method=request.method, handler=handler, status=status)
+        metrics.http_request_seconds.observe(time.perf_counter() - started, method=request.method, handler=handler)
+
+    try:
+        response = await call_next(request)
+    except BaseException:
+        metrics.finish_request_timings(token)
+        record(500)
+        raise
+    timings = metrics.finish_request_timings(token)
+    if settings.server_timing_enabled:
+        # Stages finished before the headers; a streamed body is not included
+        timings["total"] = time.perf_counter() - started
+        response.headers["Server-Timing"] = metrics.server_timing_header(timings)
+
+    # Observe the latency once the body has been sent, so streamed answers count in full
+    body = response.body_iterator
+
+    async def timed_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            record(response.status_code)
+
+    response.body_iterator = timed_body()
+    return response
+
+
+@app.exception_handler(sa_exc.TimeoutError)
+async def pool_timeout_handler(request: Request, exc: sa_exc.TimeoutError):
+    """Connection pool exhausted: ask the client to retry instead of failing with a 500"""
+    print(f"⚠️  Database pool timeout on {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database is busy, please retry shortly"},
+        headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Chat over its rate limit or generation queue full: fail fast with a retry hint"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many chat requests, please retry shortly", "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 
 @app.get("/")
 async def root():
@@ -55,3 +176,14 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(request: Request):
+    """Prometheus text-format metrics: stage latencies, request counts, cache and pool gauges"""
+    if not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("authorization", "")
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {settings.metrics_token}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
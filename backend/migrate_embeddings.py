@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+document_chunks.embedding 컬럼 마이그레이션 스크립트
+문자열(str(list))로 저장된 기존 임베딩을 pgvector vector(n) 컬럼으로 변환하고 HNSW 인덱스를 생성합니다.
+"""
+
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from core.config import settings
+from core.database import vector_engine, init_vector_extension
+from core.providers import provider
+
+BATCH_SIZE = 500
+
+
+def get_column_type(conn) -> str:
+    """Return the current data type of document_chunks.embedding"""
+    return conn.execute(text("""
+        SELECT udt_name FROM information_schema.columns
+        WHERE table_name = 'document_chunks' AND column_name = 'embedding'
+    """)).scalar()
+
+
+def is_valid_embedding(value: str) -> bool:
+    """Check that a stored string parses to a vector of the configured dimension"""
+    try:
+        parsed = json.loads(value)
+    except (TypeError, ValueError):
+        return False
+    return isinstance(parsed, list) and len(parsed) == settings.embedding_dimension
+
+
+def repair_invalid_rows(conn) -> int:
+    """Re-embed rows whose stored embedding is empty or malformed"""
+    repaired = 0
+    last_id = 0
+
+    while True:
+        rows = conn.execute(
+            text("""
+                SELECT id, content, embedding FROM document_chunks
+                WHERE id > :last_id ORDER BY id LIMIT :limit
+            """),
+            {"last_id": last_id, "limit": BATCH_SIZE}
+        ).fetchall()
+        if not rows:
+            break
+
+        for row in rows:
+            if is_valid_embedding(row.embedding):
+                continue
+            embedding = provider.embed([row.content], "retrieval_document")[0]
+            conn.execute(
+                text("UPDATE document_chunks SET embedding = :embedding WHERE id = :id"),
+                {"embedding": json.dumps(embedding), "id": row.id}
+            )
+            repaired += 1
+
+        last_id = rows[-1].id
+
+    return repaired
+
+
+def migrate_embeddings():
+    """임베딩 컬럼을 vector(n)으로 변환"""
+    if vector_engine.dialect.name != "postgresql":
+        print("❌ pgvector 마이그레이션은 PostgreSQL에서만 실행할 수 있습니다.")
+        return
+
+    init_vector_extension(vector_engine)
+    dimension = settings.embedding_dimension
+
+    with vector_engine.begin() as conn:
+        column_type = get_column_type(conn)
+        if column_type is None:
+            print("ℹ️  document_chunks 테이블이 없습니다. 서버 시작 시 vector 컬럼으로 생성됩니다.")
+            return
+
+        if column_type != "vector":
+            print(f"🔄 embedding 컬럼 변환 중 ({column_type} → vector({dimension}))...")
+            repaired = repair_invalid_rows(conn)
+            print(f"   재임베딩된 청크: {repaired}개")
+            conn.execute(text(f"""
+                ALTER TABLE document_chunks
+                ALTER COLUMN embedding TYPE vector({dimension})
+                USING embedding::vector({dimension})
+            """))
+            print("✅ embedding 컬럼이 vector 타입으로 변환되었습니다.")
+        else:
+            print("✅ embedding 컬럼이 이미 vector 타입입니다.")
+
+        print("🔄 HNSW 인덱스 생성 중...")
+        conn.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS idx_chunk_embedding_hnsw
+            ON document_chunks USING hnsw (embedding vector_cosine_ops)
+            WITH (m = {settings.hnsw_m}, ef_construction = {settings.hnsw_ef_construction})
+        """))
+        print("✅ HNSW 인덱스가 준비되었습니다.")
+
+
+if __name__ == "__main__":
+    migrate_embeddings()
@@ -1,7 +1,12 @@
 from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from core.config import settings
 from core.database import Base
+from core.vector_storage import EmbeddingColumn
+
+# HNSW operator class per embedding storage; int8 rows are bytea and searched in NumPy instead
+HNSW_OPS = {'vector': 'vector_cosine_ops', 'halfvec': 'halfvec_cosine_ops'}
 
 
 class AdminUser(Base):
@@ -19,23 +24,50 @@ class ChatMessage(Base):
     session_id = Column(String(255), index=True, nullable=False)
     role = Column(String(10), nullable=False)  # 'user' or 'ai'
     content = Column(Text, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Partition key on PostgreSQL (monthly ranges, see core/partitions.py)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     
     __table_args__ = (
         Index('idx_session_role', 'session_id', 'role'),
+        Index('idx_session_created', 'session_id', 'created_at', 'id'),
+        Index('idx_chat_created', 'created_at', 'id'),  # Keyset pagination of chat history
     )
 
 
+class ChatSession(Base):
+    __tablename__ = "chat_sessions"
+    
+    session_id = Column(String(255), primary_key=True)
+    summary = Column(Text, nullable=False, server_default='')  # Rolling summary of compacted turns
+    summarized_until = Column(Integer, nullable=False, server_default='0')  # Last ChatMessage.id folded into the summary
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
 class IndexedDocument(Base):
     __tablename__ = "indexed_documents"
     
     id = Column(Integer, primary_key=True, index=True)
     file_name = Column(String(255), nullable=False)
-    status = Column(String(20), nullable=False, default='indexing')  # 'indexing', 'ready', 'error'
+    status = Column(String(20), nullable=False, default='queued')  # 'queued', 'indexing', 'ready', 'error', 'deleting'
+    file_path = Column(String(500), nullable=True)  # Stored upload awaiting ingestion
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the uploaded file
+    pages_total = Column(Integer, server_default='0')
+    pages_parsed = Column(Integer, server_default='0')
+    chunks_total = Column(Integer, server_default='0')
+    chunks_embedded = Column(Integer, server_default='0')
+    chunks_reused = Column(Integer, server_default='0')  # Unchanged chunks kept from the previous version
+    chunks_failed = Column(Integer, server_default='0')
+    error_message = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationship to document chunks
     chunks = relationship("DocumentChunk", back_populates="document", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index('idx_document_created', 'created_at', 'id'),  # Keyset pagination of the document list
+    )
 
 
 class DocumentChunk(Base):
@@ -44,12 +76,40 @@ class DocumentChunk(Base):
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("indexed_documents.id"), nullable=False, index=True)
     content = Column(Text, nullable=False)
-    embedding = Column(String, nullable=False)  # Will store vector as string for pgvector
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the normalized content
+    embedding = Column(EmbeddingColumn(settings.embedding_dimension, settings.embedding_storage), nullable=False)
+    page_number = Column(Integer, nullable=True)  # Page the chunk starts on (1-based)
+    clause_id = Column(String(100), nullable=True)  # e.g. '제3조 제2항'
+    char_start = Column(Integer, nullable=True)  # Offsets in the extracted document text
+    char_end = Column(Integer, nullable=True)
     
     # Relationship to parent document
     document = relationship("IndexedDocument", back_populates="chunks")
     
     __table_args__ = (
         Index('idx_document_id', 'document_id'),
-    )
+        Index('idx_document_content_hash', 'document_id', 'content_hash'),
+    ) + ((
+        # ANN index for cosine distance search (PostgreSQL + pgvector only)
+        Index(
+            'idx_chunk_embedding_hnsw',
+            'embedding',
+            postgresql_using='hnsw',
+            postgresql_with={'m': settings.hnsw_m, 'ef_construction': settings.hnsw_ef_construction},
+            postgresql_ops={'embedding': HNSW_OPS[settings.embedding_storage]},
+        ).ddl_if(dialect='postgresql'),
+    ) if settings.embedding_storage in HNSW_OPS else ())
+
 
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+    
+    # Content-addressed: model (incl. task type) + SHA-256 of the normalized text
+    model = Column(String(100), primary_key=True)
+    text_hash = Column(String(64), primary_key=True)
+    embedding = Column(EmbeddingColumn(settings.embedding_dimension, settings.embedding_storage), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Refreshed (at most hourly) when read back from the table; rows beyond EMBEDDING_CACHE_MAX_ROWS are
+    # evicted oldest first, starting with rows from before this column (NULL)
+    last_used_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+chat_messages 파티셔닝 마이그레이션 스크립트
+기존 단일 chat_messages 테이블을 created_at 기준 월별 RANGE 파티션 테이블로 변환합니다.
+기존 메시지는 해당 월 파티션으로 옮겨지고, id 시퀀스는 그대로 이어서 사용됩니다.
+"""
+
+import sys
+import os
+from datetime import datetime, timezone
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from core.config import settings
+from core.database import engine
+from core.partitions import (
+    TABLE, create_partitioned_table, ensure_partitions, is_partitioned, add_months, month_start
+)
+
+
+def partition_chat_messages():
+    """chat_messages 테이블을 월별 파티션 테이블로 변환"""
+    if engine.dialect.name != "postgresql":
+        print("❌ 파티셔닝은 PostgreSQL에서만 사용할 수 있습니다.")
+        return
+
+    this_month = month_start(datetime.now(timezone.utc).date())
+    last_month = add_months(this_month, settings.chat_partition_months_ahead)
+
+    with engine.begin() as conn:
+        exists = conn.execute(text("SELECT to_regclass(:table)"), {"table": TABLE}).scalar()
+        if exists is None:
+            print("ℹ️  chat_messages 테이블이 없습니다. 서버 시작 시 파티션 테이블로 생성됩니다.")
+            return
+        if is_partitioned(conn):
+            created = ensure_partitions(conn, this_month, last_month)
+            print(f"✅ chat_messages는 이미 파티션 테이블입니다. (새 파티션 {created}개)")
+            return
+
+        # 변환 중 새 메시지가 들어오지 않도록 잠금
+        conn.execute(text(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE"))
+        oldest = conn.execute(text(f"SELECT min(created_at) FROM {TABLE}")).scalar()
+        total = conn.execute(text(f"SELECT count(*) FROM {TABLE}")).scalar()
+
+        print(f"🔄 chat_messages 변환 중 ({total}개 메시지)...")
+        conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_legacy"))
+        # 기존 시퀀스를 새 테이블이 이어받도록 소유 관계를 먼저 해제
+        conn.execute(text(f"ALTER SEQUENCE IF EXISTS {TABLE}_id_seq OWNED BY NONE"))
+        for (index_name,) in conn.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = :table"
+        ), {"table": f"{TABLE}_legacy"}).all():
+            conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_legacy"'))
+
+        create_partitioned_table(conn)
+        first_month = month_start(oldest.date()) if oldest else this_month
+        created = ensure_partitions(conn, min(first_month, this_month), last_month)
+        print(f"   월별 파티션 {created}개 생성")
+
+        conn.execute(text(f"""
+            INSERT INTO {TABLE} (id, session_id, role, content, created_at)
+            SELECT id, session_id, role, content, COALESCE(created_at, now())
+            FROM {TABLE}_legacy
+        """))
+        conn.execute(text(f"""
+            SELECT setval('{TABLE}_id_seq', GREATEST((SELECT COALESCE(max(id), 0) FROM {TABLE}), 1))
+        """))
+        conn.execute(text(f"DROP TABLE {TABLE}_legacy"))
+        print("✅ chat_messages가 월별 파티션 테이블로 변환되었습니다.")
+
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text(f"ANALYZE {TABLE}"))
+
+
+if __name__ == "__main__":
+    partition_chat_messages()
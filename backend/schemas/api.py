@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -6,6 +6,7 @@ from datetime import datetime
 # Chat schemas
 class ChatRequest(BaseModel):
     message: str
+    session_id: Optional[str] = Field(None, max_length=255)  # Omit to start a new conversation
 
 
 class ChatMessageResponse(BaseModel):
@@ -46,16 +47,31 @@ class DocumentResponse(BaseModel):
         from_attributes = True
 
 
+class DocumentStatusResponse(DocumentResponse):
+    pages_total: Optional[int] = None
+    pages_parsed: Optional[int] = None
+    chunks_total: Optional[int] = None
+    chunks_embedded: Optional[int] = None
+    chunks_reused: Optional[int] = None
+    chunks_failed: Optional[int] = None
+    error_message: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+
 class DocumentListResponse(BaseModel):
     documents: List[DocumentResponse]
     total: int
+    total_is_estimate: bool = False  # True when total comes from planner statistics
     page: int
     size: int
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch the next page
 
 
 class ChatHistoryResponse(BaseModel):
     messages: List[ChatMessageResponse]
     total: int
+    total_is_estimate: bool = False  # True when total comes from planner statistics
     page: int
     size: int
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch the next page
 
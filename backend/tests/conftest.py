@@ -0,0 +1,39 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings are read from the environment at import time, so point the app at a throwaway
+# SQLite database and the deterministic fake LLM before any app module is imported
+_scratch = tempfile.mkdtemp(prefix="rag-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_scratch}/test.db"
+os.environ["VECTOR_DATABASE_URL"] = os.environ["DATABASE_URL"]
+os.environ["UPLOAD_DIR"] = os.path.join(_scratch, "uploads")
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ.setdefault("FAKE_LLM_LATENCY_MS", "0")
+os.environ.setdefault("FAKE_LLM_TOKENS_PER_SECOND", "10000")
+os.environ.setdefault("EMBEDDING_CACHE_PERSIST", "false")
+os.environ.setdefault("CHAT_CLIENT_RATE_PER_MINUTE", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def tables():
+    """Empty application tables in the test database"""
+    from core.database import Base, engine
+    import models.database  # noqa: F401  (registers the tables)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield engine
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from core import admission
+from core.admission import AdmissionController, AdmissionRejected, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", fake)
+    return fake
+
+
+def controller(**overrides) -> AdmissionController:
+    options = dict(
+        max_concurrent=1, queue_size=1, queue_timeout=0.05,
+        client_rate_per_minute=60, client_burst=2, max_clients=100,
+    )
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+def test_token_bucket_refills_at_rate(clock):
+    bucket = TokenBucket(rate_per_minute=60, burst=2)
+    bucket.take()
+    bucket.take()
+    assert bucket.wait_time() == pytest.approx(1.0)
+
+    clock.now += 0.5
+    assert bucket.wait_time() == pytest.approx(0.5)
+    clock.now += 10
+    assert bucket.wait_time() == 0.0
+    assert bucket.tokens == 2  # capped at the burst size
+
+
+def test_rate_limit_rejects_after_burst_with_retry_after(clock):
+    limiter = controller()
+    limiter.check_rate("10.0.0.1")
+    limiter.check_rate("10.0.0.1")
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        limiter.check_rate("10.0.0.1")
+    assert rejected.value.reason == "rate_limited"
+    assert rejected.value.retry_after == 1
+
+    # Other clients have their own bucket
+    limiter.check_rate("10.0.0.2")
+    clock.now += 1
+    limiter.check_rate("10.0.0.1")
+
+
+def test_rejected_request_spends_no_tokens(clock):
+    limiter = controller()
+    limiter.check_rate("10.0.0.1", "session-a")
+    limiter.check_rate("10.0.0.1", "session-a")
+    # The IP bucket is empty, so the fresh session bucket must not be charged either
+    with pytest.raises(AdmissionRejected):
+        limiter.check_rate("10.0.0.1", "session-b")
+    assert limiter._buckets["session:session-b"].tokens == 2
+
+
+def test_zero_rate_disables_client_limits():
+    limiter = controller(client_rate_per_minute=0)
+    for _ in range(100):
+        limiter.check_rate("10.0.0.1", "session-a")
+
+
+def test_queue_full_and_queue_timeout():
+    async def scenario():
+        limiter = controller()
+        slot = await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as full:
+            await limiter.acquire()
+        assert full.value.reason == "queue_full"
+
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await waiting
+        assert timed_out.value.reason == "queue_timeout"
+
+        slot.release()
+        slot.release()  # idempotent
+        assert limiter.in_flight == 0
+        second = await limiter.acquire()
+        second.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["admitted"] == 2
+    assert stats["rejected_queue_full"] == 1
+    assert stats["rejected_queue_timeout"] == 1
+
+
+def test_client_ip_ignores_client_supplied_forwarded_entries():
+    # Without trusted proxies the header is ignored
+    assert admission.client_ip("10.0.0.5", "1.2.3.4", 0) == "10.0.0.5"
+    # One proxy appended the real client; the spoofed leftmost entries are skipped
+    assert admission.client_ip("10.0.0.5", "6.6.6.6, 7.7.7.7, 203.0.113.9", 1) == "203.0.113.9"
+    assert admission.client_ip("10.0.0.5", "6.6.6.6, 203.0.113.9, 10.1.1.1", 2) == "203.0.113.9"
+    assert admission.client_ip("10.0.0.5", "203.0.113.9", 2) == "203.0.113.9"
+    assert admission.client_ip("10.0.0.5", None, 1) == "10.0.0.5"
@@ -0,0 +1,30 @@
+from core.answer_cache import AnswerCache
+from core.corpus import corpus_version
+
+
+def make_cache() -> AnswerCache:
+    return AnswerCache(threshold=0.95, max_entries=10, ttl_seconds=3600)
+
+
+def test_exact_and_semantic_hits():
+    cache = make_cache()
+    cache.put("보험금 청구 방법", [1.0, 0.0], "답변", corpus_version.generation, latency=1.5)
+
+    assert cache.get("보험금 청구 방법", [0.0, 1.0]).answer == "답변"
+    assert cache.get("보험금은 어떻게 청구하나요", [0.99, 0.05]).answer == "답변"
+    assert cache.get("해지 환급금", [0.0, 1.0]) is None
+    assert (cache.exact_hits, cache.semantic_hits, cache.misses) == (1, 1, 1)
+
+
+def test_corpus_bump_invalidates_answers():
+    cache = make_cache()
+    generation = corpus_version.generation
+    cache.put("보험금 청구 방법", [1.0, 0.0], "답변", generation, latency=1.0)
+
+    corpus_version.bump()
+    assert cache.get("보험금 청구 방법", [1.0, 0.0]) is None
+    assert cache.stats()["entries"] == 0
+
+    # An answer generated against the old corpus is not stored after the bump
+    cache.put("보험금 청구 방법", [1.0, 0.0], "답변", generation, latency=1.0)
+    assert cache.get("보험금 청구 방법", [1.0, 0.0]) is None
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import pytest
+
+import api.v1.chat as chat_api
+from core import metrics
+from core.answer_cache import answer_cache
+from core.retrieval_cache import CachedChunk
+
+CHUNKS = [CachedChunk(id=1, document_id=1, content="제1조 (목적) 회사는 보험금을 지급합니다.")]
+
+
+@pytest.fixture(autouse=True)
+def fixed_retrieval(monkeypatch):
+    async def search(query, db, limit=5, query_embedding=None):
+        return list(CHUNKS)
+
+    monkeypatch.setattr(chat_api, "search_similar_chunks", search)
+    answer_cache.clear()
+    yield
+    answer_cache.clear()
+
+
+def events(response) -> list:
+    return [
+        json.loads(line[6:]) for line in response.text.splitlines()
+        if line.startswith("data: ") and line != "data: [DONE]"
+    ]
+
+
+def test_complete_answer_is_cached(client):
+    response = client.post("/api/v1/chat", json={"message": "보험금은 언제 지급되나요?"})
+
+    assert response.status_code == 200
+    assert not any(event.get("error") for event in events(response))
+    assert answer_cache.stats()["entries"] == 1
+
+
+def test_answer_failing_mid_stream_is_not_cached(client, monkeypatch):
+    async def failing_stream(prompt):
+        yield "보험금은 "
+        raise RuntimeError("provider disconnected")
+
+    monkeypatch.setattr(chat_api.provider, "stream", failing_stream)
+    response = client.post("/api/v1/chat", json={"message": "보험금은 언제 지급되나요?"})
+
+    received = events(response)
+    assert received[0]["content"] == "보험금은 "
+    assert received[-1] == {"content": chat_api.ERROR_MESSAGE, "error": True}
+    assert answer_cache.stats()["entries"] == 0
+
+
+def test_request_latency_covers_the_streamed_answer(client, monkeypatch):
+    async def slow_stream(prompt):
+        yield "보험금은 "
+        await asyncio.sleep(0.3)
+        yield "지급됩니다."
+
+    monkeypatch.setattr(chat_api.provider, "stream", slow_stream)
+    series = metrics.http_request_seconds._series
+    before = list(series.get(("POST", "chat"), [0.0, 0]))[-2:]
+    response = client.post("/api/v1/chat", json={"message": "보험금은 언제 지급되나요?"})
+
+    assert response.status_code == 200
+    total, count = series[("POST", "chat")][-2:]
+    assert count == before[1] + 1
+    assert total - before[0] >= 0.3
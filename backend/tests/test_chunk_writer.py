@@ -0,0 +1,138 @@
+import struct
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from core import chunk_writer
+from core.chunk_writer import CHUNK_COLUMNS, write_chunks
+from core.database import VectorSessionLocal
+from core.vector_storage import decode_embedding
+from models.database import DocumentChunk, IndexedDocument
+
+
+def read_pgcopy(data: bytes):
+    """Independent decoder of PostgreSQL binary COPY data; returns rows of raw field bytes (None for NULL)"""
+    assert data[:11] == b"PGCOPY\n\xff\r\n\x00"
+    flags, extension = struct.unpack_from("!ii", data, 11)
+    assert (flags, extension) == (0, 0)
+    offset, rows = 19, []
+    while True:
+        (fields,) = struct.unpack_from("!h", data, offset)
+        offset += 2
+        if fields == -1:
+            assert offset == len(data), "bytes after the trailer"
+            return rows
+        row = []
+        for _ in range(fields):
+            (size,) = struct.unpack_from("!i", data, offset)
+            offset += 4
+            if size == -1:
+                row.append(None)
+                continue
+            row.append(data[offset:offset + size])
+            offset += size
+        rows.append(row)
+
+
+def read_pgvector(field: bytes, dtype: str) -> np.ndarray:
+    dimension, unused = struct.unpack_from("!hh", field)
+    assert unused == 0
+    values = np.frombuffer(field, dtype=dtype, offset=4)
+    assert len(values) == dimension
+    return values
+
+
+def test_vector_and_halfvec_wire_layout():
+    vector = chunk_writer._encode_vector([1.0, -2.5, 0.125])
+    (size,) = struct.unpack_from("!i", vector)
+    assert size == 4 + 3 * 4 == len(vector) - 4
+    assert read_pgvector(vector[4:], ">f4").tolist() == [1.0, -2.5, 0.125]
+
+    halfvec = chunk_writer._encode_halfvec([1.0, -2.5, 0.125])
+    (size,) = struct.unpack_from("!i", halfvec)
+    assert size == 4 + 3 * 2 == len(halfvec) - 4
+    assert read_pgvector(halfvec[4:], ">f2").tolist() == [1.0, -2.5, 0.125]
+
+
+def test_int8_embeddings_are_sent_as_length_prefixed_bytea(monkeypatch):
+    monkeypatch.setattr(chunk_writer.settings, "embedding_storage", "int8")
+    field = chunk_writer._encode_bytea([1.0, -0.5, 0.0])
+    (size,) = struct.unpack_from("!i", field)
+    assert size == len(field) - 4 == 4 + 3
+    assert decode_embedding(field[4:], 3, "int8") == pytest.approx([1.0, -0.5, 0.0], abs=1 / 127)
+
+
+class FakeCopySession:
+    """Stands in for a psycopg2-backed session: allocates ids and captures the COPY stream"""
+
+    def __init__(self, first_id: int):
+        self.first_id = first_id
+        self.statement = self.data = None
+
+    def execute(self, statement, params):
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(
+            all=lambda: list(range(self.first_id, self.first_id + params["n"]))
+        ))
+
+    def connection(self):
+        cursor = SimpleNamespace(copy_expert=self._copy_expert, close=lambda: None)
+        return SimpleNamespace(connection=SimpleNamespace(cursor=lambda: cursor))
+
+    def _copy_expert(self, statement, buffer):
+        self.statement, self.data = statement, buffer.read()
+
+
+def test_copy_batch_produces_valid_binary_copy(monkeypatch):
+    monkeypatch.setitem(chunk_writer.COPY_ENCODERS, "embedding", chunk_writer._encode_vector)
+    db = FakeCopySession(first_id=41)
+    rows = [
+        {"document_id": 7, "content": "제1조 (목적)\n보험계약", "content_hash": "ab" * 32,
+         "embedding": [0.5, -1.0], "page_number": 1, "clause_id": "제1조", "char_start": 0, "char_end": 14},
+        {"document_id": 7, "content": "부칙", "content_hash": None,
+         "embedding": [0.25, 2.0], "page_number": None, "clause_id": None, "char_start": None, "char_end": None},
+    ]
+
+    assert chunk_writer._copy_batch(db, rows) == [41, 42]
+    assert db.statement == (
+        f"COPY document_chunks (id, {', '.join(CHUNK_COLUMNS)}) FROM STDIN WITH (FORMAT binary)"
+    )
+    decoded = read_pgcopy(db.data)
+    assert len(decoded) == 2 and all(len(row) == 1 + len(CHUNK_COLUMNS) for row in decoded)
+
+    first, second = decoded
+    int4 = lambda field: struct.unpack("!i", field)[0]
+    assert [int4(first[0]), int4(first[1])] == [41, 7]
+    assert first[2].decode("utf-8") == "제1조 (목적)\n보험계약"
+    assert first[3].decode("utf-8") == "ab" * 32
+    assert read_pgvector(first[4], ">f4").tolist() == [0.5, -1.0]
+    assert [int4(first[5]), first[6].decode("utf-8"), int4(first[7]), int4(first[8])] == [1, "제1조", 0, 14]
+
+    assert int4(second[0]) == 42
+    assert second[3] is None and second[5:] == [None, None, None, None]
+    assert read_pgvector(second[4], ">f4").tolist() == [0.25, 2.0]
+
+
+def test_auto_falls_back_to_insert_off_postgresql(tables, monkeypatch):
+    monkeypatch.setattr(chunk_writer.settings, "chunk_write_method", "auto")
+    db = VectorSessionLocal()
+    try:
+        assert not chunk_writer._use_copy(db)
+        monkeypatch.setattr(chunk_writer, "_copy_batch", pytest.fail)
+        db.add(IndexedDocument(id=1, file_name="policy.pdf"))
+        db.commit()
+
+        dimension = chunk_writer.settings.embedding_dimension
+        rows = [
+            {"document_id": 1, "content": f"청크 {i}", "content_hash": None,
+             "embedding": [float(i)] * dimension, "page_number": i, "clause_id": None,
+             "char_start": None, "char_end": None}
+            for i in range(5)
+        ]
+        ids = write_chunks(db, rows, batch_size=2)
+        assert len(ids) == 5
+        stored = {chunk.id: chunk for chunk in db.query(DocumentChunk)}
+        assert [stored[chunk_id].content for chunk_id in ids] == [f"청크 {i}" for i in range(5)]
+        assert stored[ids[3]].embedding[0] == 3.0
+    finally:
+        db.close()
@@ -0,0 +1,57 @@
+from core.chunking import chunk_document, estimate_tokens
+
+PAGES = [
+    (1, "제1장 총칙\n제1조 (목적) 이 약관은 보험계약에 관한 사항을 정합니다.\n"
+        "제2조 (용어의 정의) ① 보험기간이란 계약이 유효한 기간입니다.\n② 제1조에 따라 정합니다."),
+    (2, "제2조의2 (보험금의 지급사유) 회사는 다음의 사유가 생기면 보험금을 지급합니다.\n"
+        "1. 사망한 경우\n2. 장해상태가 된 경우"),
+]
+
+
+def source_text(pages):
+    return "".join(text + "\n" for _, text in pages)
+
+
+def test_articles_never_share_a_chunk():
+    chunks = list(chunk_document(PAGES, token_budget=500))
+    assert [chunk.clause_id for chunk in chunks] == ["제1조", "제2조", "제2조의2"]
+    # The lone chapter heading joins the first article; references like "제1조에 따라" are not headings
+    assert chunks[0].content.startswith("제1장 총칙\n제1조")
+    assert "② 제1조에 따라" in chunks[1].content
+    assert chunks[2].page_number == 2
+
+
+def test_offsets_point_into_the_document_text():
+    text = source_text(PAGES)
+    chunks = list(chunk_document(PAGES, token_budget=500))
+    for chunk in chunks:
+        assert text[chunk.char_start:chunk.char_end].strip() == chunk.content
+    # Chunks do not overlap
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous.char_end <= current.char_start
+
+
+def test_small_budget_splits_within_an_article_and_keeps_clause_ids():
+    chunks = list(chunk_document(PAGES, token_budget=20))
+    assert len(chunks) > 3
+    text = source_text(PAGES)
+    for chunk in chunks:
+        assert text[chunk.char_start:chunk.char_end].strip() == chunk.content
+        assert estimate_tokens(chunk.content) <= 20
+    # A chunk spanning several items keeps the clause id they share
+    assert chunks[-1].content == "1. 사망한 경우\n2. 장해상태가 된 경우"
+    assert chunks[-1].clause_id == "제2조의2"
+
+
+def test_single_paragraph_chunk_keeps_the_full_clause_id():
+    pages = [(1, "제3조 (지급) ① 회사는 보험금을 지급합니다.\n② 회사는 보험료를 돌려드립니다.")]
+    chunks = list(chunk_document(pages, token_budget=15))
+    assert [chunk.clause_id for chunk in chunks][-1] == "제3조 제2항"
+
+
+def test_oversized_sentence_is_cut_to_the_budget():
+    pages = [(1, "제1조 (목적) " + "가" * 95)]
+    chunks = list(chunk_document(pages, token_budget=30))
+    assert len(chunks) > 1
+    assert "".join(chunk.content for chunk in chunks).replace(" ", "") == pages[0][1].replace(" ", "")
+    assert all(chunk.clause_id == "제1조" for chunk in chunks)
@@ -0,0 +1,59 @@
+from core.chunking import estimate_tokens
+from core.context import build_context
+from core.retrieval_cache import CachedChunk
+
+
+def chunk(id, content, document_id=1, char_start=None, clause_id=None):
+    char_end = char_start + len(content) if char_start is not None else None
+    return CachedChunk(id=id, document_id=document_id, content=content, clause_id=clause_id,
+                       char_start=char_start, char_end=char_end)
+
+
+def test_chunks_are_taken_in_order_while_they_fit():
+    chunks = [
+        chunk(1, "가" * 40, document_id=1),
+        chunk(2, "나" * 40, document_id=2),
+        chunk(3, "다" * 10, document_id=3),
+    ]
+    # The second chunk does not fit, but the smaller third one still does
+    assert build_context(chunks, token_budget=55) == "가" * 40 + "\n\n" + "다" * 10
+
+
+def test_best_chunk_is_truncated_when_nothing_fits():
+    context = build_context([chunk(1, "가" * 100), chunk(2, "나" * 10, document_id=2)], token_budget=30)
+    assert context == "가" * 30
+    assert estimate_tokens(context) <= 30
+
+
+def test_duplicates_and_contained_chunks_are_dropped():
+    chunks = [
+        chunk(1, "가나다라마바사", char_start=0),
+        chunk(2, "가나다라마바사", document_id=2),
+        chunk(3, "나다라", char_start=1),
+    ]
+    assert build_context(chunks, token_budget=100) == "가나다라마바사"
+
+
+def test_adjacent_chunks_merge_and_overlap_is_counted_once():
+    shared = "보" * 30
+    first = chunk(1, "가" * 20 + shared, char_start=0, clause_id="제1조")
+    second = chunk(2, shared + "나" * 20, char_start=20, clause_id="제1조")
+    # 70 tokens of text in two chunks (100 with the overlap counted twice), plus 3 for the
+    # "[제1조]" header and 4 for the second chunk's header and separator
+    context = build_context([first, second], token_budget=77)
+    assert context == "[제1조]\n" + "가" * 20 + shared + "나" * 20
+    assert build_context([first, second], token_budget=76) == "[제1조]\n" + "가" * 20 + shared
+
+
+def test_clause_headers_count_against_the_budget():
+    chunks = [
+        chunk(i, syllable * 20, document_id=i, clause_id=f"제{i}조의{i} 제{i}항 제{i}호")
+        for i, syllable in enumerate("가나다라", start=1)
+    ]
+    for budget in (25, 60, 80, 200):
+        context = build_context(chunks, token_budget=budget)
+        assert estimate_tokens(context) <= budget
+    # 20 tokens of text per chunk would fit four into 80; their 9-10 token headers leave room for two
+    assert build_context(chunks, token_budget=80) == (
+        "[제1조의1 제1항 제1호]\n" + "가" * 20 + "\n\n[제2조의2 제2항 제2호]\n" + "나" * 20
+    )
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from core import embeddings
+from core.config import settings
+from core.database import VectorSessionLocal
+from core.embeddings import EmbeddingCache, EmbeddingPipeline, RateLimiter, embedding_rate_limiter
+from models.database import EmbeddingCacheEntry
+
+
+def test_rate_limiter_reserves_future_start_times(monkeypatch):
+    monkeypatch.setattr(embeddings.time, "monotonic", lambda: 100.0)
+    limiter = RateLimiter(rate_per_minute=60, burst=2)
+
+    assert [limiter.reserve() for _ in range(4)] == [0.0, 0.0, pytest.approx(1.0), pytest.approx(2.0)]
+
+
+def test_pipelines_share_the_process_limiter():
+    assert EmbeddingPipeline().limiter is embedding_rate_limiter
+    assert EmbeddingPipeline().limiter is EmbeddingPipeline().limiter
+
+
+def test_rate_limit_holds_across_threads_with_their_own_event_loops():
+    limiter = RateLimiter(rate_per_minute=1200, burst=1)  # one start every 50 ms
+
+    async def three_requests():
+        for _ in range(3):
+            await limiter.acquire()
+
+    started = time.monotonic()
+    workers = [threading.Thread(target=asyncio.run, args=(three_requests(),)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    # Six starts with a burst of one take at least five intervals in total
+    assert time.monotonic() - started >= 0.25 - 0.01
+
+
+def vector(seed: int) -> np.ndarray:
+    return np.full(settings.embedding_dimension, seed / 10, dtype=np.float32)
+
+
+def persisted_hashes() -> set:
+    db = VectorSessionLocal()
+    try:
+        return {row.text_hash for row in db.query(EmbeddingCacheEntry.text_hash)}
+    finally:
+        db.close()
+
+
+def test_persistent_cache_evicts_least_recently_used_rows(tables):
+    cache = EmbeddingCache(max_bytes=10 * 1024 * 1024, persist=True, max_rows=3)
+    cache.prune_every = 1
+    keys = [("model", f"hash{i}") for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put_many({key: vector(i)})
+
+    # Read hash0 back from the table (not memory) so it becomes the most recently used row
+    db = VectorSessionLocal()
+    db.query(EmbeddingCacheEntry).update({"last_used_at": datetime(2026, 1, 1, tzinfo=timezone.utc)})
+    db.commit()
+    db.close()
+    cache.clear()
+    assert keys[0] in cache.get_many([keys[0]])
+
+    cache.put_many({("model", "hash3"): vector(3)})
+    assert persisted_hashes() == {"hash0", "hash2", "hash3"}
+    assert cache.stats()["db_evictions"] == 1
+
+
+def test_unbounded_persistent_cache_keeps_every_row(tables):
+    cache = EmbeddingCache(max_bytes=10 * 1024 * 1024, persist=True, max_rows=0)
+    cache.put_many({("model", f"hash{i}"): vector(i) for i in range(5)})
+    assert len(persisted_hashes()) == 5
+
+
+def test_lookup_counters_are_exact_under_concurrency():
+    cache = EmbeddingCache(max_bytes=10 * 1024 * 1024, persist=False)
+    cache.put_many({("model", "hit"): vector(1)})
+
+    def lookups():
+        for _ in range(2000):
+            cache.get_many([("model", "hit"), ("model", "miss")])
+
+    workers = [threading.Thread(target=lookups) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"]) == (8000, 8000)
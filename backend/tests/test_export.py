@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from core.auth import get_current_admin
+from core.database import SessionLocal
+from core.export import EXPORT_COLUMNS, export_csv, export_ndjson
+from models.database import AdminUser, ChatMessage
+
+MULTILINE = '제1조 (목적)\n보험금은 "사망", 장해 시 지급합니다.\r\n쉼표, 따옴표 "포함"'
+
+
+@pytest.fixture
+def messages(tables):
+    db = SessionLocal()
+    # Ids are out of creation order: the export must sort by created_at, then id
+    db.add_all([
+        ChatMessage(id=3, session_id="a", role="user", content="첫 질문", created_at=datetime(2026, 1, 1, 9)),
+        ChatMessage(id=1, session_id="a", role="ai", content=MULTILINE, created_at=datetime(2026, 1, 1, 9, 1)),
+        ChatMessage(id=2, session_id="b", role="user", content="다른 세션", created_at=datetime(2026, 1, 1, 9, 1)),
+        ChatMessage(id=4, session_id="a", role="user", content="이월", created_at=datetime(2026, 2, 1)),
+    ])
+    db.commit()
+    db.close()
+
+
+def read_csv(chunks) -> list:
+    text = "".join(chunks)
+    assert text.startswith("\ufeff")
+    return list(csv.reader(io.StringIO(text[1:], newline="")))
+
+
+def read_ndjson(chunks) -> list:
+    return [json.loads(line) for line in "".join(chunks).split("\n") if line]
+
+
+def test_csv_round_trips_multiline_korean_content(messages):
+    header, *rows = read_csv(export_csv())
+    assert tuple(header) == EXPORT_COLUMNS
+    assert [row[0] for row in rows] == ["3", "1", "2", "4"]
+    assert rows[1][3] == MULTILINE
+    assert rows[0][4] == "2026-01-01T09:00:00"
+
+
+def test_ndjson_keeps_order_and_unicode(messages):
+    records = read_ndjson(export_ndjson())
+    assert [record["id"] for record in records] == [3, 1, 2, 4]
+    assert records[1]["content"] == MULTILINE
+    assert "보험금" in "".join(export_ndjson())  # not \u-escaped
+
+
+def test_filters_are_applied(messages):
+    january = dict(since=datetime(2026, 1, 1, 9, 1), until=datetime(2026, 2, 1))
+    assert [record["id"] for record in read_ndjson(export_ndjson(**january))] == [1, 2]
+    assert [row[0] for row in read_csv(export_csv(session_id="a"))[1:]] == ["3", "1", "4"]
+    assert [record["id"] for record in read_ndjson(export_ndjson(session_id="a", **january))] == [1]
+
+
+def test_empty_result(tables):
+    assert list(export_ndjson()) == []
+    assert read_csv(export_csv()) == [list(EXPORT_COLUMNS)]
+
+
+@pytest.fixture
+def admin_client(client):
+    client.app.dependency_overrides[get_current_admin] = lambda: AdminUser(id=1, username="admin")
+    yield client
+    client.app.dependency_overrides.pop(get_current_admin, None)
+
+
+def test_export_endpoint_streams_csv(messages, admin_client):
+    response = admin_client.get(
+        "/api/v1/admin/chat-history/export",
+        params={"format": "csv", "session_id": "a", "until": "2026-02-01T00:00:00"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert 'filename="chat_messages.csv"' in response.headers["content-disposition"]
+    assert [row[0] for row in read_csv([response.text])[1:]] == ["3", "1"]
+
+    assert admin_client.get("/api/v1/admin/chat-history/export", params={"format": "xml"}).status_code == 422
+
+
+def test_export_endpoint_requires_an_admin(messages, client):
+    assert client.get("/api/v1/admin/chat-history/export").status_code in (401, 403)
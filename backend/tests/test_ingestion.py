@@ -0,0 +1,153 @@
+import pytest
+
+from core import ingestion
+from core.auth import get_current_admin
+from core.config import settings
+from core.corpus import corpus_version
+from core.database import SessionLocal, VectorSessionLocal
+from core.ingestion import IngestionQueue
+from models.database import AdminUser, DocumentChunk, IndexedDocument
+
+ARTICLE_1 = "제1조 (목적) 이 약관은 보험계약에 관한 사항을 정합니다."
+ARTICLE_2 = "제2조 (보험금의 지급) 회사는 사망한 경우 보험금을 지급합니다."
+ARTICLE_2_REVISED = "제2조 (보험금의 지급) 회사는 사망하거나 장해상태가 된 경우 보험금을 지급합니다."
+ARTICLE_3 = "제3조 (해지) 계약자는 언제든지 계약을 해지할 수 있습니다."
+
+
+@pytest.fixture
+def pdf_pages(monkeypatch):
+    """Serve fake PDFs: file path -> page texts"""
+    files = {}
+    monkeypatch.setattr(ingestion, "count_pdf_pages", lambda path: len(files[path]))
+
+    def iter_pages(path, page_count=None):
+        for number, text in enumerate(files[path], start=1):
+            if text is None:
+                raise RuntimeError("corrupt page")
+            yield number, text
+
+    monkeypatch.setattr(ingestion, "iter_pdf_pages", iter_pages)
+    monkeypatch.setattr(settings, "ingestion_window_chunks", 1)
+    return files
+
+
+@pytest.fixture
+def dbs(tables):
+    db, vector_db = SessionLocal(), VectorSessionLocal()
+    yield db, vector_db
+    vector_db.close()
+    db.close()
+
+
+def index(dbs, document, path):
+    db, vector_db = dbs
+    document.file_path = path
+    document.status = "indexing"
+    db.commit()
+    IngestionQueue(workers=1)._process(db, vector_db, document)
+
+
+def stored_chunks(vector_db, document_id):
+    vector_db.expire_all()
+    rows = vector_db.query(DocumentChunk).filter(DocumentChunk.document_id == document_id).order_by(DocumentChunk.id)
+    return {row.content: row.id for row in rows}
+
+
+def test_reindex_reuses_unchanged_chunks(dbs, pdf_pages):
+    db, vector_db = dbs
+    document = IndexedDocument(file_name="policy.pdf", status="queued")
+    db.add(document)
+    db.commit()
+
+    pdf_pages["v1.pdf"] = [ARTICLE_1, ARTICLE_2]
+    index(dbs, document, "v1.pdf")
+    first = stored_chunks(vector_db, document.id)
+    assert list(first) == [ARTICLE_1, ARTICLE_2]
+
+    pdf_pages["v2.pdf"] = [ARTICLE_2_REVISED, ARTICLE_1]
+    index(dbs, document, "v2.pdf")
+    second = stored_chunks(vector_db, document.id)
+    # The unchanged article keeps its row (and embedding); the revised one replaces the old text
+    assert second[ARTICLE_1] == first[ARTICLE_1]
+    assert set(second) == {ARTICLE_1, ARTICLE_2_REVISED}
+    assert (document.status, document.chunks_reused, document.chunks_embedded) == ("ready", 1, 1)
+    # Position metadata of the reused chunk follows the new layout
+    reused = vector_db.get(DocumentChunk, first[ARTICLE_1])
+    assert reused.page_number == 2
+
+
+def test_failed_reindex_keeps_the_previous_version(dbs, pdf_pages):
+    db, vector_db = dbs
+    document = IndexedDocument(file_name="policy.pdf", status="queued")
+    db.add(document)
+    db.commit()
+
+    pdf_pages["v1.pdf"] = [ARTICLE_1, ARTICLE_2]
+    index(dbs, document, "v1.pdf")
+    first = stored_chunks(vector_db, document.id)
+
+    # The new article is inserted before a later page fails to extract
+    pdf_pages["v2.pdf"] = [ARTICLE_3, ARTICLE_1, None]
+    generation = corpus_version.generation
+    with pytest.raises(RuntimeError):
+        index(dbs, document, "v2.pdf")
+
+    assert stored_chunks(vector_db, document.id) == first
+    assert corpus_version.generation == generation + 1
+
+
+def test_reindex_without_text_fails_and_keeps_the_previous_version(dbs, pdf_pages):
+    db, vector_db = dbs
+    document = IndexedDocument(file_name="policy.pdf", status="queued")
+    db.add(document)
+    db.commit()
+
+    pdf_pages["v1.pdf"] = [ARTICLE_1, ARTICLE_2]
+    index(dbs, document, "v1.pdf")
+    first = stored_chunks(vector_db, document.id)
+
+    # A scanned PDF: pages without extractable text
+    pdf_pages["scan.pdf"] = ["", "  \n"]
+    document.file_path = "scan.pdf"
+    document.status = "queued"
+    db.commit()
+    IngestionQueue(workers=1)._run(document.id)
+
+    db.expire_all()
+    assert document.status == "error"
+    assert document.error_message == "No text could be extracted from the PDF (previous version kept)"
+    assert stored_chunks(vector_db, document.id) == first
+
+
+@pytest.fixture
+def admin_client(client):
+    client.app.dependency_overrides[get_current_admin] = lambda: AdminUser(id=1, username="admin")
+    yield client
+    client.app.dependency_overrides.pop(get_current_admin, None)
+
+
+def test_delete_claims_a_queued_document_before_a_worker_can(dbs, admin_client):
+    db, _ = dbs
+    document = IndexedDocument(file_name="policy.pdf", status="queued")
+    db.add(document)
+    db.commit()
+    document_id = document.id
+
+    assert admin_client.delete(f"/api/v1/admin/documents/{document_id}").status_code == 200
+    # The worker's conditional claim finds nothing to index
+    assert not IngestionQueue(workers=1)._claim(db, document_id)
+    db.expunge_all()
+    assert db.get(IndexedDocument, document_id) is None
+
+
+def test_delete_is_rejected_while_a_worker_holds_the_document(dbs, admin_client):
+    db, _ = dbs
+    document = IndexedDocument(file_name="policy.pdf", status="queued")
+    db.add(document)
+    db.commit()
+
+    assert IngestionQueue(workers=1)._claim(db, document.id)
+    assert admin_client.delete(f"/api/v1/admin/documents/{document.id}").status_code == 409
+    db.expire_all()
+    assert db.get(IndexedDocument, document.id).status == "indexing"
+    assert admin_client.delete("/api/v1/admin/documents/999").status_code == 404
@@ -0,0 +1,68 @@
+import math
+
+import pytest
+
+from core.lexical import LexicalIndex, tokenize
+
+
+def loaded_index(syllable_max_df: float = 1.0) -> LexicalIndex:
+    index = LexicalIndex(k1=1.2, b=0.75, syllable_max_df=syllable_max_df)
+    index._loaded = True
+    return index
+
+
+def test_tokenize_uses_hangul_bigrams_and_lowercase_ascii():
+    assert tokenize("암진단금은 CI보험") == ["암", "암진", "진단", "단금", "금은", "ci", "보", "보험"]
+
+
+def test_bm25_score_matches_the_formula():
+    index = loaded_index()
+    index.add_chunks(1, [1, 2], ["암 진단", "보험 보험료"])
+    # "암" appears once in chunk 1 (3 tokens: 암, 진, 진단); chunk 2 has 5, so the average length is 4
+    idf = math.log(1 + (2 - 1 + 0.5) / (1 + 0.5))
+    norm = 1.2 * (1 - 0.75 + 0.75 * 3 / 4)
+    [(chunk_id, score)] = index.top_k("암", 5)
+    assert chunk_id == 1
+    assert score == pytest.approx(idf * 1 * 2.2 / (1 + norm))
+
+
+def test_rare_terms_and_short_chunks_rank_first():
+    index = loaded_index()
+    index.add_chunks(1, [1, 2, 3], [
+        "보험금 지급 사유 암",
+        "보험금 지급 사유",
+        "보험금 지급 사유 " + "기타 " * 20,
+    ])
+    ranked = [chunk_id for chunk_id, _ in index.top_k("보험금 암", 3)]
+    # Only chunk 1 matches the rare "암"; the long chunk 3 is penalised for its length
+    assert ranked == [1, 2, 3]
+
+
+def test_removed_chunks_no_longer_match():
+    index = loaded_index()
+    index.add_chunks(1, [1], ["해지 환급금"])
+    index.add_chunks(2, [2, 3], ["해지 환급금", "납입 면제"])
+    index.remove_document(1)
+    assert [chunk_id for chunk_id, _ in index.top_k("환급금", 5)] == [2]
+    index.remove_chunks(2, [2])
+    assert index.top_k("환급금", 5) == []
+    assert len(index) == 1 and index._total_length == len(tokenize("납입 면제"))
+
+
+def test_common_single_syllables_are_skipped():
+    index = loaded_index(syllable_max_df=0.5)
+    index.add_chunks(1, [1, 2, 3, 4], ["암 보장", "보험 기간", "보험료 납입", "보상 한도"])
+    # "보" starts a word in three of four chunks; the rare "암" still matches
+    assert index.top_k("보", 5) == []
+    assert [chunk_id for chunk_id, _ in index.top_k("암", 5)] == [1]
+    assert [chunk_id for chunk_id, _ in index.top_k("보험", 5)] == [2, 3]
+
+
+def test_slots_of_removed_chunks_are_reused():
+    index = loaded_index()
+    index.add_chunks(1, [1, 2], ["해지 환급금", "납입 면제"])
+    index.remove_chunks(1, [1])
+    index.add_chunks(1, [3], ["환급금 지급"])
+    assert index._slot_count == 2
+    assert [chunk_id for chunk_id, _ in index.top_k("환급금", 5)] == [3]
+    assert [chunk_id for chunk_id, _ in index.top_k("면제", 5)] == [2]
@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import pytest
+
+from core import message_writer as writer_module
+from core.database import SessionLocal
+from core.message_writer import ChatMessageWriter
+from models.database import ChatMessage
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(writer_module, "RETRY_BACKOFF_SECONDS", 0)
+
+
+def stored_messages():
+    db = SessionLocal()
+    try:
+        return [(row.id, row.content) for row in db.query(ChatMessage).order_by(ChatMessage.id)]
+    finally:
+        db.close()
+
+
+real_sessions = writer_module.AsyncSessionLocal
+
+
+class FlakySessions:
+    """AsyncSessionLocal stand-in whose first `failures` sessions fail on execute"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.attempts = 0
+
+    def __call__(self):
+        self.attempts += 1
+        session = real_sessions()
+        if self.attempts <= self.failures:
+            async def fail(*args, **kwargs):
+                raise ConnectionError("database unavailable")
+            session.execute = fail
+        return session
+
+
+def test_full_batch_flushes_without_waiting_for_the_interval(tables):
+    async def scenario():
+        writer = ChatMessageWriter(batch_size=3, flush_interval=30, max_pending=100)
+        writer.start()
+        started = time.perf_counter()
+        futures = [await writer.add("s", "user", f"m{i}") for i in range(3)]
+        ids = await asyncio.wait_for(asyncio.gather(*futures), 5)
+        elapsed = time.perf_counter() - started
+        await writer.shutdown()
+        return writer, ids, elapsed
+
+    writer, ids, elapsed = asyncio.run(scenario())
+    assert elapsed < 5 and writer.flushes == 1
+    assert stored_messages() == list(zip(ids, ["m0", "m1", "m2"]))
+
+
+def test_partial_batch_flushes_after_the_interval(tables):
+    async def scenario():
+        writer = ChatMessageWriter(batch_size=100, flush_interval=0.1, max_pending=100)
+        writer.start()
+        futures = [await writer.add("s", "user", "질문"), await writer.add("s", "ai", "답변")]
+        await asyncio.sleep(0.02)
+        pending = not any(future.done() for future in futures)
+        ids = await asyncio.wait_for(asyncio.gather(*futures), 5)
+        flushes = writer.flushes
+        await writer.shutdown()
+        return pending, ids, flushes
+
+    pending, ids, flushes = asyncio.run(scenario())
+    assert pending and flushes == 1
+    assert [content for _, content in stored_messages()] == ["질문", "답변"]
+
+
+def test_shutdown_drains_buffered_messages(tables):
+    async def scenario():
+        writer = ChatMessageWriter(batch_size=2, flush_interval=60, max_pending=100)
+        writer.start()
+        futures = [await writer.add("s", "user", f"m{i}") for i in range(5)]
+        await writer.shutdown()
+        return writer, futures
+
+    writer, futures = asyncio.run(scenario())
+    assert all(future.done() and future.result() for future in futures)
+    assert writer.written == 5
+    assert [content for _, content in stored_messages()] == [f"m{i}" for i in range(5)]
+
+
+def test_failed_flush_is_retried(tables, monkeypatch):
+    sessions = FlakySessions(failures=writer_module.FLUSH_RETRIES - 1)
+    monkeypatch.setattr(writer_module, "AsyncSessionLocal", sessions)
+
+    async def scenario():
+        writer = ChatMessageWriter(batch_size=10, flush_interval=0.01, max_pending=100)
+        writer.start()
+        future = await writer.add("s", "user", "재시도")
+        await writer.shutdown()
+        return writer, future.result()
+
+    writer, message_id = asyncio.run(scenario())
+    assert sessions.attempts == writer_module.FLUSH_RETRIES
+    assert (writer.written, writer.failed) == (1, 0)
+    assert stored_messages() == [(message_id, "재시도")]
+
+
+def test_batch_is_dropped_after_the_last_retry(tables, monkeypatch):
+    monkeypatch.setattr(writer_module, "AsyncSessionLocal", FlakySessions(failures=writer_module.FLUSH_RETRIES))
+
+    async def scenario():
+        writer = ChatMessageWriter(batch_size=10, flush_interval=0.01, max_pending=100)
+        writer.start()
+        futures = [await writer.add("s", "user", "유실"), await writer.add("s", "ai", "유실")]
+        await writer.shutdown()
+        return writer, [future.result() for future in futures]
+
+    writer, results = asyncio.run(scenario())
+    assert results == [None, None]
+    assert (writer.written, writer.failed) == (0, 2)
+    assert stored_messages() == []
+
+
+def test_add_blocks_when_max_pending_messages_are_waiting(tables):
+    async def scenario():
+        writer = ChatMessageWriter(batch_size=1, flush_interval=0.01, max_pending=2)
+        release = asyncio.Event()
+        flush = writer._flush
+
+        async def stalled_flush(batch):
+            await release.wait()
+            await flush(batch)
+
+        writer._flush = stalled_flush
+        writer.start()
+        futures = [await writer.add("s", "user", "m0")]
+        await asyncio.sleep(0.02)  # m0 is taken by the stalled flush
+        futures += [await writer.add("s", "user", "m1"), await writer.add("s", "user", "m2")]
+
+        blocked = asyncio.create_task(writer.add("s", "user", "m3"))
+        await asyncio.sleep(0.05)
+        was_blocked = not blocked.done()
+        release.set()
+        futures.append(await asyncio.wait_for(blocked, 5))
+        await writer.shutdown()
+        return was_blocked, futures
+
+    was_blocked, futures = asyncio.run(scenario())
+    assert was_blocked
+    assert all(future.result() for future in futures)
+    assert [content for _, content in stored_messages()] == ["m0", "m1", "m2", "m3"]
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from core.database import SessionLocal
+from core.pagination import decode_cursor, encode_cursor, estimate_count, keyset_page
+from models.database import ChatMessage
+
+START = datetime(2026, 1, 1, 9, 0, 0)
+
+
+@pytest.fixture
+def db(tables):
+    session = SessionLocal()
+    # Pairs of messages share a timestamp, so ordering must fall back to the id
+    session.add_all([
+        ChatMessage(id=i, session_id="s", role="user", content=f"m{i}", created_at=START + timedelta(minutes=i // 2))
+        for i in range(1, 8)
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 3, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+    with pytest.raises(HTTPException):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_pages_cover_every_row_once_with_ties_on_created_at(db):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = keyset_page(db.query(ChatMessage), ChatMessage, 2, cursor)
+        seen.extend(row.id for row in rows)
+        if cursor is None:
+            break
+    assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+
+def test_count_respects_filters(db):
+    assert estimate_count(db.query(ChatMessage), ChatMessage) == (7, False)
+    since = db.query(ChatMessage).filter(ChatMessage.created_at >= START + timedelta(minutes=2))
+    assert estimate_count(since, ChatMessage) == (4, False)
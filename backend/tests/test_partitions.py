@@ -0,0 +1,70 @@
+"""chat_messages monthly partitions; the database tests need TEST_POSTGRES_URL (see test_pgvector.py)"""
+
+import os
+import uuid
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from core.partitions import (
+    DEFAULT_PARTITION, TABLE, add_months, create_partitioned_table, drain_default_partition, ensure_partitions,
+    partition_name,
+)
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+requires_postgres = pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+
+def test_month_arithmetic():
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+
+@pytest.fixture
+def conn():
+    engine = create_engine(POSTGRES_URL)
+    schema = f"partitions_{uuid.uuid4().hex[:8]}"
+    with engine.connect() as connection:
+        connection.execute(text(f"CREATE SCHEMA {schema}"))
+        connection.execute(text(f"SET search_path TO {schema}"))
+        create_partitioned_table(connection)
+        yield connection
+        connection.rollback()
+        connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        connection.commit()
+    engine.dispose()
+
+
+def insert_message(conn, created_at: datetime) -> None:
+    conn.execute(
+        text(f"INSERT INTO {TABLE} (session_id, role, content, created_at) VALUES ('s', 'user', 'hi', :at)"),
+        {"at": created_at},
+    )
+
+
+def rows_in(conn, table: str) -> int:
+    return conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+
+@requires_postgres
+def test_new_partition_takes_over_rows_from_the_default_partition(conn):
+    insert_message(conn, datetime(2026, 3, 15, tzinfo=timezone.utc))
+    assert rows_in(conn, DEFAULT_PARTITION) == 1
+
+    assert ensure_partitions(conn, date(2026, 3, 1), date(2026, 4, 1)) == 2
+    assert rows_in(conn, DEFAULT_PARTITION) == 0
+    assert rows_in(conn, partition_name(date(2026, 3, 1))) == 1
+    assert rows_in(conn, TABLE) == 1
+
+
+@requires_postgres
+def test_drain_gives_stranded_months_their_own_partition(conn):
+    insert_message(conn, datetime(2025, 1, 10, tzinfo=timezone.utc))
+    insert_message(conn, datetime(2025, 2, 10, tzinfo=timezone.utc))
+
+    assert drain_default_partition(conn) == 2
+    assert rows_in(conn, DEFAULT_PARTITION) == 0
+    assert rows_in(conn, partition_name(date(2025, 1, 1))) == 1
+    assert rows_in(conn, partition_name(date(2025, 2, 1))) == 1
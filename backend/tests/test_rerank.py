@@ -0,0 +1,99 @@
+import asyncio
+import time
+from typing import List, Sequence
+
+import pytest
+
+from core import rerank
+from core.providers import FakeProvider
+from core.rerank import LLMReranker, Reranker
+from core.retrieval_cache import CachedChunk
+
+CHUNKS = [CachedChunk(id=i, document_id=1, content=f"청크 {chr(0xAC00 + i)}") for i in range(1, 6)]
+
+
+class ScriptedReranker(Reranker):
+    """Scores passages from a table and records each scoring request"""
+
+    name = "scripted"
+
+    def __init__(self, scores, fail_batches=(), **options):
+        super().__init__(**options)
+        self.scores = scores
+        self.fail_batches = set(fail_batches)
+        self.batches: List[List[str]] = []
+
+    async def score(self, query: str, passages: Sequence[str]) -> List[float]:
+        self.batches.append(list(passages))
+        if len(self.batches) in self.fail_batches:
+            raise RuntimeError("scorer unavailable")
+        return [self.scores[passage] for passage in passages]
+
+
+def ids(chunks):
+    return [chunk.id for chunk in chunks]
+
+
+def test_scores_in_batches_and_keeps_first_stage_order_on_ties():
+    scores = {chunk.content: score for chunk, score in zip(CHUNKS, [1, 5, 3, 5, 0])}
+    reranker = ScriptedReranker(scores, batch_size=2)
+    ranked = asyncio.run(reranker.rerank("보험금 청구", CHUNKS, 3))
+    assert ids(ranked) == [2, 4, 3]
+    assert [len(batch) for batch in reranker.batches] == [2, 2, 1]
+
+
+def test_repeated_query_is_served_from_the_score_cache():
+    scores = {chunk.content: float(chunk.id) for chunk in CHUNKS}
+    reranker = ScriptedReranker(scores, batch_size=10)
+    first = asyncio.run(reranker.rerank("보험금 청구", CHUNKS, 2))
+    second = asyncio.run(reranker.rerank("보험금   청구", CHUNKS, 2))
+    assert ids(first) == ids(second) == [5, 4]
+    assert len(reranker.batches) == 1
+    stats = reranker.stats()
+    assert (stats["cache_hits"], stats["cache_misses"], stats["cache_entries"]) == (5, 5, 5)
+    assert stats["cache_hit_rate"] == 0.5
+
+
+def test_scorer_error_falls_back_but_keeps_finished_scores():
+    scores = {chunk.content: float(chunk.id) for chunk in CHUNKS}
+    reranker = ScriptedReranker(scores, fail_batches={2}, batch_size=3)
+    assert ids(asyncio.run(reranker.rerank("해지", CHUNKS, 2))) == [1, 2]
+    assert reranker.stats()["fallbacks"] == 1
+    # The first batch was cached, so the retry only scores the two that failed
+    assert ids(asyncio.run(reranker.rerank("해지", CHUNKS, 2))) == [5, 4]
+    assert reranker.batches[-1] == [CHUNKS[3].content, CHUNKS[4].content]
+
+
+def test_slow_scorer_returns_first_stage_order_within_the_timeout(monkeypatch):
+    monkeypatch.setattr(rerank, "provider", FakeProvider(dimension=8, latency=5.0))
+    reranker = LLMReranker(batch_size=2, timeout=0.1)
+    started = time.perf_counter()
+    ranked = asyncio.run(reranker.rerank("보험금 청구", CHUNKS, 3))
+    assert time.perf_counter() - started < 1.0
+    assert ids(ranked) == [1, 2, 3]
+    assert reranker.stats()["fallbacks"] == 1
+
+
+def test_unparseable_llm_response_falls_back(monkeypatch):
+    # The fake model echoes prompt words, which contain no "number: score" lines
+    monkeypatch.setattr(rerank, "provider", FakeProvider(dimension=8, latency=0, tokens_per_second=1e6))
+    reranker = LLMReranker(batch_size=10, timeout=1.0)
+    assert ids(asyncio.run(reranker.rerank("보험금 청구", CHUNKS, 2))) == [1, 2]
+    assert reranker.stats()["fallbacks"] == 1
+
+
+def test_llm_scores_are_parsed_per_passage(monkeypatch):
+    class GradingProvider:
+        async def generate(self, prompt: str) -> str:
+            return "[1]: 2\n2: 9\n3：7.5\n"
+
+    monkeypatch.setattr(rerank, "provider", GradingProvider())
+    reranker = LLMReranker(batch_size=3, timeout=1.0)
+    assert ids(asyncio.run(reranker.rerank("보험금 청구", CHUNKS[:3], 3))) == [2, 3, 1]
+
+
+@pytest.mark.parametrize("name", ["none", "llm"])
+def test_create_reranker(name):
+    assert rerank.create_reranker(name).name == name
+    with pytest.raises(ValueError):
+        rerank.create_reranker("cross-encoder")
@@ -0,0 +1,55 @@
+import time
+
+import numpy as np
+import pytest
+
+from core.retrieval import NumpyVectorIndex, reciprocal_rank_fusion
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    # 2 is second in both lists and beats 1 and 3, each first in only one
+    assert reciprocal_rank_fusion([[1, 2, 4], [3, 2]], k=60)[:1] == [2]
+    assert reciprocal_rank_fusion([[1, 2], [1, 3]], k=60) == [1, 2, 3]
+    assert reciprocal_rank_fusion([[], []]) == []
+
+
+def loaded_index(tmp_path, save_delay: float = 3600) -> NumpyVectorIndex:
+    index = NumpyVectorIndex(dimension=3, persist_path=str(tmp_path / "chunks"), save_delay=save_delay)
+    index._loaded = True
+    return index
+
+
+def test_numpy_index_ranks_by_cosine_similarity(tmp_path):
+    index = loaded_index(tmp_path)
+    index.add_chunks(1, [1, 2, 3], [[1, 0, 0], [0, 1, 0], [1, 1, 0]])
+
+    chunk_ids, scores = index.top_k([2, 0, 0], 2)
+    assert chunk_ids.tolist() == [1, 3]
+    assert scores[0] == pytest.approx(1.0)
+    index.flush()
+
+
+def test_numpy_index_batches_saves_until_flush(tmp_path):
+    index = loaded_index(tmp_path)
+    for chunk_id in range(1, 6):
+        index.add_chunks(1, [chunk_id], [[chunk_id, 1, 0]])
+    index.remove_chunks(1, [2])
+    # Nothing is rewritten per window; one pending save covers all changes
+    assert not (tmp_path / "chunks.npy").exists()
+
+    index.flush()
+    ids = np.load(tmp_path / "chunks.ids.npy")
+    assert ids[0].tolist() == [1, 3, 4, 5]
+    assert np.load(tmp_path / "chunks.npy").shape == (4, 3)
+
+
+def test_numpy_index_saves_after_delay(tmp_path):
+    index = loaded_index(tmp_path, save_delay=0.01)
+    index.add_chunks(7, [1], [[0, 0, 1]])
+    deadline = time.monotonic() + 5
+    while (index._dirty or index._save_timer is not None) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    reloaded = NumpyVectorIndex(dimension=3, persist_path=str(tmp_path / "chunks"))
+    assert reloaded._load_persisted()
+    assert reloaded._ids.tolist() == [1] and reloaded._document_ids.tolist() == [7]
@@ -0,0 +1,47 @@
+from core.corpus import corpus_version
+from core.retrieval_cache import CachedChunk, RetrievalCache
+
+
+def make_cache() -> RetrievalCache:
+    return RetrievalCache(max_queries=2, max_chunks=10, ttl_seconds=3600)
+
+
+def chunks(*ids):
+    return [CachedChunk(id=i, document_id=1, content=f"청크 {i}") for i in ids]
+
+
+def test_queries_map_to_ranked_ids_and_share_chunks():
+    cache = make_cache()
+    generation = corpus_version.generation
+    cache.put("보험금 청구", 5, chunks(3, 1), generation)
+    cache.put("청구 서류", 5, chunks(1, 2), generation)
+
+    # Queries are normalized before lookup
+    assert cache.get_ids("  보험금   청구 ", 5) == [3, 1]
+    assert cache.get_ids("보험금 청구", 3) is None
+    found, missing = cache.get_chunks([1, 2, 4])
+    assert sorted(found) == [1, 2] and missing == [4]
+
+
+def test_least_recently_used_query_is_evicted():
+    cache = make_cache()
+    generation = corpus_version.generation
+    for query in ("가", "나", "다"):
+        cache.put(query, 5, chunks(1), generation)
+    assert cache.get_ids("가", 5) is None
+    assert cache.get_ids("다", 5) == [1]
+
+
+def test_corpus_bump_invalidates_results():
+    cache = make_cache()
+    generation = corpus_version.generation
+    cache.put("보험금 청구", 5, chunks(1, 2), generation)
+
+    corpus_version.bump()
+    assert cache.get_ids("보험금 청구", 5) is None
+    assert cache.get_chunks([1, 2]) == ({}, [1, 2])
+
+    # Results of a search that ran against the old corpus are not stored
+    cache.put("보험금 청구", 5, chunks(1, 2), generation)
+    assert cache.get_ids("보험금 청구", 5) is None
+    assert cache.stats()["chunks"] == 0
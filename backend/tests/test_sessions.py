@@ -0,0 +1,37 @@
+import asyncio
+
+from core import sessions
+from core.sessions import SessionStore
+
+
+def test_compaction_runs_every_few_turns_and_keeps_unsummarized_history(tables, monkeypatch):
+    calls = []
+
+    async def generate(prompt):
+        calls.append(prompt)
+        return f"요약 {len(calls)}"
+
+    monkeypatch.setattr(sessions.provider, "generate", generate)
+    store = SessionStore(max_sessions=10, recent_messages=2, summary_token_budget=100, summary_concurrency=1)
+
+    async def conversation():
+        async with sessions.AsyncSessionLocal() as db:
+            state = await store.load(db, "session-a")
+        for message_id in range(1, 11):
+            saved = asyncio.get_running_loop().create_future()
+            saved.set_result(message_id)
+            store.append(state, saved, "user" if message_id % 2 else "ai", f"메시지 {message_id}")
+            await asyncio.gather(*store._tasks)
+        return state
+
+    state = asyncio.run(conversation())
+
+    # Compacted after messages 5 and 8 (more than 2 * recent_messages unsummarized), not on every message
+    assert len(calls) == 2
+    assert state.summary == "요약 2"
+    assert state.summarized_until == 6
+    assert [turn.content for turn in state.turns] == ["메시지 7", "메시지 8", "메시지 9", "메시지 10"]
+    # Turns not yet folded into the summary are still sent verbatim
+    history = store.render_history(state)
+    assert history.startswith("이전 대화 요약: 요약 2")
+    assert all(f"메시지 {n}" in history for n in range(7, 11))
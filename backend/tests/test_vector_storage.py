@@ -0,0 +1,96 @@
+import json
+
+import numpy as np
+import pytest
+from sqlalchemy.dialects import postgresql, sqlite
+
+from convert_embeddings import to_array
+from core.config import settings
+from core.vector_storage import EmbeddingColumn, decode_embedding, encode_embedding
+
+DIMENSION = 64
+
+
+@pytest.fixture
+def vector():
+    return np.random.default_rng(0).standard_normal(DIMENSION).astype(np.float32)
+
+
+def test_float32_round_trip_is_exact(vector):
+    data = encode_embedding(vector, "vector")
+    assert len(data) == DIMENSION * 4
+    np.testing.assert_array_equal(decode_embedding(data, DIMENSION, "vector"), vector)
+
+
+def test_halfvec_round_trip_within_float16_precision(vector):
+    data = encode_embedding(vector, "halfvec")
+    assert len(data) == DIMENSION * 2
+    np.testing.assert_allclose(decode_embedding(data, DIMENSION, "halfvec"), vector, rtol=1e-3, atol=1e-4)
+
+
+def test_int8_scale_and_error_bound(vector):
+    data = encode_embedding(vector, "int8")
+    assert len(data) == DIMENSION + 4
+    scale = np.frombuffer(data[:4], dtype="<f4")[0]
+    assert scale == pytest.approx(np.abs(vector).max() / 127)
+
+    decoded = decode_embedding(data, DIMENSION, "int8")
+    # Rounding to the nearest step: every value is off by at most half a step
+    assert np.abs(decoded - vector).max() <= scale / 2 + 1e-6
+    # The largest component maps exactly to ±127 steps
+    peak = np.argmax(np.abs(vector))
+    assert decoded[peak] == pytest.approx(vector[peak], rel=1e-6)
+    cosine = decoded @ vector / (np.linalg.norm(decoded) * np.linalg.norm(vector))
+    assert cosine > 0.999
+
+
+def test_int8_zero_vector():
+    decoded = decode_embedding(encode_embedding(np.zeros(DIMENSION), "int8"), DIMENSION, "int8")
+    np.testing.assert_array_equal(decoded, np.zeros(DIMENSION))
+
+
+@pytest.mark.parametrize("storage", ["vector", "halfvec", "int8"])
+@pytest.mark.parametrize("written", ["vector", "halfvec", "int8"])
+def test_rows_in_another_format_decode_by_length(vector, storage, written):
+    # Mid-conversion tables hold rows of several formats at once
+    decoded = decode_embedding(encode_embedding(vector, written), DIMENSION, storage)
+    np.testing.assert_allclose(decoded, vector, atol=np.abs(vector).max() / 127)
+
+
+def test_unknown_length_is_rejected():
+    with pytest.raises(ValueError):
+        decode_embedding(b"\x00" * 10, DIMENSION, "vector")
+    with pytest.raises(ValueError):
+        EmbeddingColumn(DIMENSION, "float64")
+
+
+@pytest.mark.parametrize("storage", ["vector", "halfvec", "int8"])
+def test_column_binds_bytes_off_postgresql_and_loads_legacy_text(vector, storage):
+    column = EmbeddingColumn(DIMENSION, storage)
+    dialect = sqlite.dialect()
+    stored = column.process_bind_param(vector.tolist(), dialect)
+    assert stored == encode_embedding(vector, storage)
+    loaded = column.process_result_value(stored, dialect)
+    assert loaded.dtype == np.float32
+    np.testing.assert_allclose(loaded, vector, atol=np.abs(vector).max() / 127)
+
+    legacy = column.process_result_value(json.dumps(vector.tolist()), dialect)
+    np.testing.assert_allclose(legacy, vector, rtol=1e-6)
+    assert column.process_bind_param(None, dialect) is None
+    assert column.process_result_value(None, dialect) is None
+
+
+def test_column_uses_pgvector_types_on_postgresql(vector):
+    dialect = postgresql.dialect()
+    assert type(EmbeddingColumn(DIMENSION, "vector").load_dialect_impl(dialect)).__name__ == "VECTOR"
+    assert type(EmbeddingColumn(DIMENSION, "halfvec").load_dialect_impl(dialect)).__name__ == "HALFVEC"
+    assert type(EmbeddingColumn(DIMENSION, "int8").load_dialect_impl(dialect)).__name__ == "LargeBinary"
+    bound = EmbeddingColumn(DIMENSION, "halfvec").process_bind_param(vector.tolist(), dialect)
+    np.testing.assert_array_equal(bound, vector)
+
+
+@pytest.mark.parametrize("stored", ["text", "vector", "halfvec", "int8"])
+def test_conversion_reads_every_stored_format(stored):
+    vector = np.random.default_rng(1).standard_normal(settings.embedding_dimension).astype(np.float32)
+    value = json.dumps(vector.tolist()) if stored == "text" else memoryview(encode_embedding(vector, stored))
+    np.testing.assert_allclose(to_array(value), vector, atol=np.abs(vector).max() / 127)